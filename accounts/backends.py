@@ -0,0 +1,36 @@
+# accounts/backends.py
+"""Backend de autenticación que cachea el usuario de ``request.user``.
+
+Con ``ModelBackend`` cada petición autenticada hace un SELECT de
+``auth_user``. Acá el usuario se guarda en la cache ``USUARIOS_CACHE``
+(por defecto la misma que usan las sesiones, compartida entre workers) y
+las señales de ``accounts.signals`` lo borran cuando el usuario cambia, así
+un cambio de contraseña o un ``is_active=False`` se aplica enseguida.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+USUARIOS_CACHE = getattr(settings, 'ACCOUNTS_USUARIOS_CACHE', 'sesiones')
+USUARIOS_TTL = getattr(settings, 'ACCOUNTS_USUARIOS_TTL', 300)
+
+
+def clave_usuario(user_id):
+    return f'accounts:usuario:{user_id}'
+
+
+def invalidar_usuario(user_id):
+    caches[USUARIOS_CACHE].delete(clave_usuario(user_id))
+
+
+class BackendCacheado(ModelBackend):
+    def get_user(self, user_id):
+        cache = caches[USUARIOS_CACHE]
+        clave = clave_usuario(user_id)
+        usuario = cache.get(clave)
+        if usuario is None:
+            usuario = super().get_user(user_id)
+            if usuario is None:
+                return None
+            cache.set(clave, usuario, USUARIOS_TTL)
+        return usuario if self.user_can_authenticate(usuario) else None
@@ -0,0 +1,18 @@
+# accounts/hashers.py
+"""Hasher de contraseñas con parámetros de Argon2 ajustables.
+
+Los valores por defecto de Django (100 MiB y paralelismo 8 por hash) hacen
+que unos pocos logins simultáneos ocupen toda la memoria y los núcleos de un
+worker. Acá se usa el perfil recomendado por OWASP (19 MiB, 2 pasadas, 1
+hilo), configurable desde settings. El algoritmo sigue siendo ``argon2``: si
+se cambian los parámetros, ``must_update`` lo detecta y la contraseña se
+vuelve a hashear en el próximo login, igual que las PBKDF2 existentes.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class Argon2Ajustado(Argon2PasswordHasher):
+    time_cost = getattr(settings, 'ARGON2_TIME_COST', 2)
+    memory_cost = getattr(settings, 'ARGON2_MEMORY_COST', 19 * 1024)  # KiB
+    parallelism = getattr(settings, 'ARGON2_PARALLELISM', 1)
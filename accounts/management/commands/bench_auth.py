@@ -0,0 +1,138 @@
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher, make_password
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, RequestFactory, override_settings
+from django.urls import reverse
+
+from accounts.hashers import Argon2Ajustado
+from core.management.commands.bench_endpoints import base_temporal
+from core.management.commands.prueba_carga import percentil
+
+CLAVE = 'clave-de-prueba-1234'
+MOTORES = ('db', 'cached_db', 'signed_cookies')
+BACKENDS = {
+    'ModelBackend': 'django.contrib.auth.backends.ModelBackend',
+    'BackendCacheado': 'accounts.backends.BackendCacheado',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Throughput de autenticación: costo de verificar contraseñas con cada hasher (secuencial y con N hilos), "
+        "logins por segundo con rehash a Argon2 y costo de cargar sesión + request.user según el backend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificaciones', type=int, default=10, help="Verificaciones por hasher y por hilo.")
+        parser.add_argument('--hilos', type=int, default=4, help="Hilos para simular un pico de logins.")
+        parser.add_argument('--logins', type=int, default=20)
+        parser.add_argument('--peticiones', type=int, default=2000, help="Cargas de sesión + usuario por variante.")
+        parser.add_argument('--json', action='store_true', help="Imprime el resultado como JSON.")
+
+    def handle(self, *args, **options):
+        resultados = {'hashers': self._hashers(options['verificaciones'], options['hilos'])}
+        with base_temporal():
+            resultados['login'] = self._logins(options['logins'])
+            resultados['sesion_y_usuario'] = self._ruta_caliente(options['peticiones'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultados, indent=2))
+            return
+        for nombre, r in resultados['hashers'].items():
+            self.stdout.write(
+                f"{nombre:16s} {r['ms_por_verificacion']:7.1f} ms/verificación | "
+                f"{r['verificaciones_s']:6.1f} verificaciones/s con {r['hilos']} hilos"
+            )
+        login = resultados['login']
+        self.stdout.write(
+            f"login            rehash {login['hash_antes']} -> {login['hash_despues']} | "
+            f"p50 {login['p50_ms']:.1f} ms | {login['logins_s']:.1f} logins/s"
+        )
+        for nombre, r in resultados['sesion_y_usuario'].items():
+            self.stdout.write(
+                f"{nombre:32s} p50 {r['p50_us']:7.1f} µs | p95 {r['p95_us']:7.1f} µs | "
+                f"{r['consultas_por_peticion']:.2f} consultas/petición"
+            )
+
+    def _hashers(self, verificaciones, hilos):
+        resultados = {}
+        for nombre, hasher in (
+            ('pbkdf2 (django)', PBKDF2PasswordHasher()),
+            ('argon2 (django)', Argon2PasswordHasher()),
+            ('argon2 ajustado', Argon2Ajustado()),
+        ):
+            codificado = hasher.encode(CLAVE, hasher.salt())
+            inicio = time.perf_counter()
+            for _ in range(verificaciones):
+                hasher.verify(CLAVE, codificado)
+            secuencial = (time.perf_counter() - inicio) / verificaciones
+
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=hilos) as pool:
+                list(pool.map(lambda _: hasher.verify(CLAVE, codificado), range(verificaciones * hilos)))
+            concurrente = time.perf_counter() - inicio
+            resultados[nombre] = {
+                'ms_por_verificacion': secuencial * 1000,
+                'verificaciones_s': verificaciones * hilos / concurrente,
+                'hilos': hilos,
+            }
+        return resultados
+
+    def _logins(self, cantidad):
+        # Hash PBKDF2 como el de los usuarios existentes: el primer login lo pasa a Argon2
+        usuario = User.objects.create(username='bench_auth', password=make_password(CLAVE, hasher='pbkdf2_sha256'))
+        antes = usuario.password.split('$', 1)[0]
+        url = reverse(settings.LOGIN_URL)
+        latencias = []
+        for _ in range(cantidad):
+            cliente = Client()
+            inicio = time.perf_counter()
+            respuesta = cliente.post(url, {'username': 'bench_auth', 'password': CLAVE})
+            latencias.append(time.perf_counter() - inicio)
+            assert respuesta.status_code == 302, respuesta.status_code
+        usuario.refresh_from_db()
+        return {
+            'hash_antes': antes,
+            'hash_despues': usuario.password.split('$', 1)[0],
+            'p50_ms': percentil(latencias, 50) * 1000,
+            'logins_s': cantidad / sum(latencias),
+        }
+
+    def _ruta_caliente(self, peticiones):
+        usuario = User.objects.get(username='bench_auth')
+        fabrica = RequestFactory()
+        resultados = {}
+        for motor in MOTORES:
+            for nombre_backend, backend in BACKENDS.items():
+                with override_settings(SESSION_ENGINE=settings.MOTORES_SESION[motor], AUTHENTICATION_BACKENDS=[backend]):
+                    for cache in caches.all():
+                        cache.clear()
+                    cliente = Client()
+                    cliente.force_login(usuario, backend=backend)
+                    clave_sesion = cliente.cookies[settings.SESSION_COOKIE_NAME].value
+                    almacen = import_module(settings.SESSION_ENGINE).SessionStore
+                    latencias, consultas = [], []
+                    with connection.execute_wrapper(lambda execute, *a: consultas.append(1) or execute(*a)):
+                        for _ in range(peticiones):
+                            request = fabrica.get('/')
+                            inicio = time.perf_counter()
+                            request.session = almacen(clave_sesion)
+                            assert get_user(request).pk == usuario.pk
+                            latencias.append(time.perf_counter() - inicio)
+                resultados[f'{motor} + {nombre_backend}'] = {
+                    'p50_us': percentil(latencias, 50) * 1e6,
+                    'p95_us': percentil(latencias, 95) * 1e6,
+                    'media_us': statistics.mean(latencias) * 1e6,
+                    'consultas_por_peticion': len(consultas) / peticiones,
+                }
+        return resultados
@@ -0,0 +1,12 @@
+# accounts/signals.py
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import invalidar_usuario
+
+
+@receiver(post_save, sender=User, dispatch_uid='usuario_invalidar_cache_save')
+@receiver(post_delete, sender=User, dispatch_uid='usuario_invalidar_cache_delete')
+def invalidar_usuario_cacheado(sender, instance, **kwargs):
+    invalidar_usuario(instance.pk)
@@ -0,0 +1,311 @@
+# alumnos/api.py
+"""API JSON de alumnos para integraciones.
+
+- ``GET alumnos/api/``: listado paginado por cursor (mismos filtros y
+  ``orden`` que gestion_alumnos, más ``limite`` y ``cursor``). ``?fields=``
+  elige las columnas: la consulta trae sólo esas (más ``id`` y la de orden,
+  que hacen falta para el cursor). Se serializa desde ``values()``, sin
+  instanciar modelos. La respuesta lleva ETag y un ``If-None-Match`` igual
+  devuelve 304 sin cuerpo.
+- ``POST``: alta de un lote (lista de objetos). ``PATCH``: actualización de un
+  lote (cada objeto con ``id`` y sólo los campos a cambiar). ``DELETE``:
+  baja de un lote (lista de ids). Cada lote se valida completo antes de
+  escribir y se aplica en una transacción con ``bulk_create`` /
+  ``bulk_update`` / ``delete()`` del queryset: o se aplica todo o nada. El
+  documento no se repite para el mismo usuario (ni en el alta ni al
+  cambiarlo). El alta responde también los posibles duplicados de cada
+  elemento (ver ``duplicados``); no la impiden.
+- ``alumnos/api/<pk>/``: lo mismo para un solo alumno.
+
+Usa la sesión de Django: las escrituras necesitan el header ``X-CSRFToken``.
+Como ``bulk_create`` y ``bulk_update`` no disparan señales (y en la baja se
+desactivan con ``signals.en_lote``), el índice de búsqueda, las claves de
+duplicados, la cache de fichas PDF y las métricas se actualizan a mano, una
+vez por lote, igual que en la importación.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.db import transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_http_methods
+
+from . import busqueda, cache_pdf, duplicados, metricas, signals
+from .importacion import CAMPOS as EDITABLES, validar_fila
+from .models import Alumno
+from .pagination import CAMPOS_NULOS, CursorInvalido, normalizar_orden, pagina_desde_request
+
+CAMPOS = ('id',) + tuple(EDITABLES) + ('created_at', 'updated_at')
+MAX_LOTE = getattr(settings, 'ALUMNOS_API_MAX_LOTE', 5000)
+TAMANO_LOTE = 1000
+
+
+class ErrorAPI(Exception):
+    def __init__(self, mensaje, status=400, errores=None):
+        super().__init__(mensaje)
+        self.status = status
+        self.errores = errores
+
+
+def _respuesta_error(error):
+    datos = {'error': str(error)}
+    if error.errores:
+        datos['errores'] = error.errores
+    return JsonResponse(datos, status=error.status)
+
+
+def vista_api(*metodos):
+    """Métodos permitidos, 401 en JSON sin sesión y ``ErrorAPI`` como respuesta de error."""
+    def decorador(vista):
+        @require_http_methods(metodos)
+        @wraps(vista)
+        def envuelta(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return JsonResponse({'error': 'Autenticación requerida.'}, status=401)
+            try:
+                return vista(request, *args, **kwargs)
+            except ErrorAPI as e:
+                return _respuesta_error(e)
+        return envuelta
+    return decorador
+
+
+def _campos_pedidos(params):
+    pedidos = [c.strip() for c in params.get('fields', '').split(',') if c.strip()]
+    if not pedidos:
+        return CAMPOS
+    desconocidos = [c for c in pedidos if c not in CAMPOS]
+    if desconocidos:
+        raise ErrorAPI(f"Campos desconocidos en fields: {', '.join(desconocidos)}.")
+    return tuple(dict.fromkeys(pedidos))
+
+
+def _leer_json(request):
+    try:
+        return json.loads(request.body or b'null')
+    except RequestDataTooBig:
+        raise ErrorAPI("El cuerpo de la petición es demasiado grande.", status=413)
+    except ValueError:
+        raise ErrorAPI("El cuerpo no es JSON válido.")
+
+
+def _leer_lote(request):
+    lote = _leer_json(request)
+    if not isinstance(lote, list) or not lote:
+        raise ErrorAPI("Se esperaba una lista no vacía.")
+    if len(lote) > MAX_LOTE:
+        raise ErrorAPI(f"Como máximo {MAX_LOTE} elementos por petición.", status=413)
+    return lote
+
+
+def _id(valor):
+    if isinstance(valor, bool) or not isinstance(valor, int):
+        raise ValueError(valor)
+    return valor
+
+
+def _validar(item, campos):
+    if not isinstance(item, dict):
+        return None, {'__all__': ['Se esperaba un objeto.']}
+    limpios, errores = validar_fila(item, campos)
+    for campo in item.keys() - set(EDITABLES) - {'id'}:
+        errores[campo] = ['Campo desconocido o de sólo lectura.']
+    return limpios, errores
+
+
+def _serializar(items, campos):
+    return [{campo: item[campo] for campo in campos} for item in items]
+
+
+def _respuesta_condicional(request, datos):
+    """JsonResponse con ETag del contenido, o 304 si el cliente ya lo tiene."""
+    respuesta = JsonResponse(datos)
+    etag = f'"{hashlib.sha256(respuesta.content).hexdigest()[:32]}"'
+    no_modificado = get_conditional_response(request, etag=etag)
+    if no_modificado is not None:
+        return no_modificado
+    respuesta['ETag'] = etag
+    return respuesta
+
+
+def listar(request):
+    campos = _campos_pedidos(request.GET)
+    campo_orden = normalizar_orden(request.GET.get('orden')).lstrip('-')
+    # id y el campo de orden arman el cursor; los nulos se ordenan por una anotación aparte
+    consulta = set(campos) | {'id'}
+    if campo_orden not in CAMPOS_NULOS:
+        consulta.add(campo_orden)
+    base = Alumno.objects.filter(usuario=request.user).values(*consulta)
+    try:
+        _, items, siguiente, _, _ = pagina_desde_request(base, request.GET)
+    except CursorInvalido:
+        raise ErrorAPI("Cursor inválido.")
+    return _respuesta_condicional(request, {'resultados': _serializar(items, campos), 'siguiente_cursor': siguiente})
+
+
+def _actualizar_derivados(usuario, alumnos=(), eliminados=()):
+    """Lo que harían las señales de post_save/post_delete, una vez por lote."""
+    busqueda.indexar(alumnos)
+    busqueda.desindexar(*eliminados)
+    duplicados.indexar(alumnos)
+    for pk in [a.pk for a in alumnos] + list(eliminados):
+        cache_pdf.invalidar(pk)
+    metricas.invalidar(usuario.pk)
+
+
+def crear(request, lote):
+    nuevos, errores = [], {}
+    for i, item in enumerate(lote):
+        limpios, errores_item = _validar(item, EDITABLES)
+        if errores_item:
+            errores[i] = errores_item
+        else:
+            nuevos.append(Alumno(usuario=request.user, **limpios))
+
+    # Como en la importación: un documento no se repite para el mismo usuario
+    documentos = [a.documento for a in nuevos if a.documento]
+    existentes = set(
+        Alumno.objects.filter(usuario=request.user, documento__in=documentos).values_list('documento', flat=True)
+    ) if documentos else set()
+    vistos = set()
+    for i, alumno in zip([i for i in range(len(lote)) if i not in errores], nuevos):
+        if alumno.documento and (alumno.documento in existentes or alumno.documento in vistos):
+            errores[i] = {'documento': [f"El documento {alumno.documento} ya está registrado."]}
+        vistos.add(alumno.documento)
+    if errores:
+        raise ErrorAPI("Hay elementos inválidos; no se creó ninguno.", errores=errores)
+
+    with transaction.atomic():
+        Alumno.objects.bulk_create(nuevos, batch_size=TAMANO_LOTE)
+        busqueda.indexar(nuevos)
+        # Antes de guardar sus claves, para no encontrarse entre sí dos veces
+        posibles = duplicados.posibles_duplicados(nuevos, request.user.pk)
+        duplicados.indexar(nuevos, nuevos=True)
+    metricas.invalidar(request.user.pk)
+    return JsonResponse({
+        'creados': len(nuevos),
+        'ids': [a.pk for a in nuevos],
+        # {posición en el lote: [ids de alumnos que podrían ser la misma persona]}
+        'posibles_duplicados': {
+            i: [otro['id'] for otro, _ in encontrados] for i, encontrados in enumerate(posibles) if encontrados
+        },
+    }, status=201)
+
+
+def _validar_documentos(usuario, lote, cambios, errores):
+    """Como en ``crear``: un documento no se repite para el mismo usuario."""
+    documentos = {pk: limpios['documento'] for pk, limpios in cambios.items() if limpios.get('documento')}
+    if not documentos:
+        return
+    # Un alumno que cambia de documento en el mismo lote libera el suyo
+    liberados = {pk for pk, limpios in cambios.items() if 'documento' in limpios}
+    ocupados = {
+        documento for pk, documento in Alumno.objects.filter(
+            usuario=usuario, documento__in=set(documentos.values()),
+        ).values_list('pk', 'documento') if pk not in liberados
+    }
+    vistos = set()
+    for i, item in enumerate(lote):
+        documento = documentos.get(item['id']) if i not in errores else None
+        if documento and (documento in ocupados or documento in vistos):
+            errores[i] = {'documento': [f"El documento {documento} ya está registrado."]}
+        vistos.add(documento)
+
+
+def actualizar(request, lote):
+    cambios, errores = {}, {}
+    for i, item in enumerate(lote):
+        try:
+            pk = _id(item.get('id')) if isinstance(item, dict) else None
+        except ValueError:
+            pk = None
+        if pk is None:
+            errores[i] = {'id': ['Se requiere un id entero.']}
+            continue
+        campos = [c for c in EDITABLES if c in item]
+        limpios, errores_item = _validar(item, campos)
+        if errores_item:
+            errores[i] = errores_item
+        elif pk in cambios:
+            errores[i] = {'id': ['El id está repetido en el lote.']}
+        else:
+            cambios[pk] = limpios
+
+    with transaction.atomic():
+        alumnos = Alumno.objects.select_for_update().filter(usuario=request.user, pk__in=list(cambios)).in_bulk()
+        for i, item in enumerate(lote):
+            if i not in errores and item['id'] not in alumnos:
+                errores[i] = {'id': ['No existe un alumno con ese id.']}
+        _validar_documentos(request.user, lote, cambios, errores)
+        if errores:
+            raise ErrorAPI("Hay elementos inválidos; no se actualizó ninguno.", errores=errores)
+
+        ahora = timezone.now()
+        campos = set()
+        for pk, limpios in cambios.items():
+            alumno = alumnos[pk]
+            for campo, valor in limpios.items():
+                setattr(alumno, campo, valor)
+            # bulk_update no aplica auto_now; el sello invalida la fila cacheada del listado
+            alumno.updated_at = ahora
+            campos.update(limpios)
+        modificados = list(alumnos.values())
+        if campos:
+            Alumno.objects.bulk_update(modificados, [*campos, 'updated_at'], batch_size=TAMANO_LOTE)
+            _actualizar_derivados(request.user, alumnos=modificados)
+    return JsonResponse({'actualizados': len(modificados) if campos else 0})
+
+
+def eliminar(request, lote):
+    try:
+        ids = {_id(pk) for pk in lote}
+    except ValueError:
+        raise ErrorAPI("Se esperaba una lista de ids enteros.")
+    with transaction.atomic():
+        existentes = Alumno.objects.filter(usuario=request.user, pk__in=ids)
+        encontrados = set(existentes.values_list('pk', flat=True))
+        faltantes = ids - encontrados
+        if faltantes:
+            raise ErrorAPI(
+                "Hay ids inexistentes; no se eliminó ninguno.",
+                status=404, errores={'ids': sorted(faltantes)},
+            )
+        # Las claves de duplicados caen en cascada; lo que hacen las señales
+        # de post_delete se aplica después, una vez por lote
+        with signals.en_lote():
+            existentes.delete()
+        _actualizar_derivados(request.user, eliminados=encontrados)
+    return JsonResponse({'eliminados': len(encontrados)})
+
+
+@vista_api('GET', 'POST', 'PATCH', 'DELETE')
+def alumnos(request):
+    if request.method == 'GET':
+        return listar(request)
+    lote = _leer_lote(request)
+    if request.method == 'POST':
+        return crear(request, lote)
+    if request.method == 'PATCH':
+        return actualizar(request, lote)
+    return eliminar(request, lote)
+
+
+@vista_api('GET', 'PATCH', 'DELETE')
+def alumno(request, pk):
+    if request.method == 'GET':
+        campos = _campos_pedidos(request.GET)
+        datos = Alumno.objects.filter(usuario=request.user, pk=pk).values(*campos).first()
+        if datos is None:
+            raise ErrorAPI("No existe un alumno con ese id.", status=404)
+        return _respuesta_condicional(request, datos)
+    if request.method == 'PATCH':
+        datos = _leer_json(request)
+        if not isinstance(datos, dict):
+            raise ErrorAPI("Se esperaba un objeto.")
+        return actualizar(request, [{**datos, 'id': pk}])
+    return eliminar(request, [pk])
@@ -0,0 +1,209 @@
+# alumnos/busqueda.py
+"""Índice de búsqueda de alumnos sobre SQLite FTS5 (tokenizer trigram).
+
+Cada alumno tiene una fila en la tabla virtual ``alumnos_busqueda`` (rowid =
+id del alumno) con nombre, apellido, documento y email normalizados en
+Python: minúsculas y sin tildes, así la búsqueda no distingue acentos aunque
+la versión de SQLite no soporte ``remove_diacritics`` en el tokenizer trigram.
+
+- Coincidencia por subcadena (y por lo tanto por prefijo): cada término se
+  busca como frase trigram, sin recorrer la tabla como ``LIKE '%x%'``.
+- Tolerancia a errores de tipeo: si no hay resultados exactos, se piden
+  candidatos que contengan alguna mitad de cada término y se filtran por
+  similitud (Jaccard de trigramas) contra cada palabra.
+
+Las señales de ``Alumno`` mantienen el índice al día; la importación masiva
+lo actualiza por lote. Con otro motor de base la búsqueda cae a ``icontains``.
+"""
+import unicodedata
+
+from django.db import connection
+
+TABLA = 'alumnos_busqueda'
+MIN_CARACTERES = 3
+LIMITE = 10
+# Candidatos que se traen de FTS antes de puntuar en Python
+CANDIDATOS = 200
+# Similitud mínima (0-1) para aceptar un término con errores de tipeo
+UMBRAL_SIMILITUD = 0.35
+
+
+def disponible():
+    return connection.vendor == 'sqlite'
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes ('Gómez' -> 'gomez')."""
+    texto = texto or ''
+    if texto.isascii():
+        return texto.lower()
+    descompuesto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def terminos(consulta):
+    return [t for t in normalizar(consulta).split() if t]
+
+
+def texto_alumno(alumno):
+    return normalizar(' '.join(filter(None, (alumno.nombre, alumno.apellido, alumno.documento, alumno.email))))
+
+
+def _frase(termino):
+    return '"' + termino.replace('"', '""') + '"'
+
+
+def expresion_match(consulta):
+    """Expresión FTS5 que exige todos los términos como subcadena, o None si
+    algún término es demasiado corto para el tokenizer trigram."""
+    lista = terminos(consulta)
+    if not lista or any(len(t) < MIN_CARACTERES for t in lista):
+        return None
+    return ' '.join(_frase(t) for t in lista)
+
+
+def trigramas(palabra):
+    relleno = f"  {palabra} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def similitud(a, b, ta=None):
+    """Jaccard de trigramas; ``ta`` permite reutilizar los trigramas de ``a``."""
+    ta, tb = ta or trigramas(a), trigramas(b)
+    return len(ta & tb) / len(ta | tb) if ta and tb else 0.0
+
+
+# --- Mantenimiento del índice -------------------------------------------------
+
+def crear_tabla(cursor):
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA} USING fts5("
+        f"texto, usuario_id UNINDEXED, tokenize='trigram')"
+    )
+
+
+def indexar(alumnos):
+    """Inserta o reemplaza la fila de índice de cada alumno (con pk)."""
+    if not disponible():
+        return
+    filas = [(a.pk, texto_alumno(a), a.usuario_id) for a in alumnos]
+    if not filas:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {TABLA} WHERE rowid = %s", [(pk,) for pk, _, _ in filas])
+        cursor.executemany(f"INSERT INTO {TABLA} (rowid, texto, usuario_id) VALUES (%s, %s, %s)", filas)
+
+
+def desindexar(*pks):
+    if not disponible() or not pks:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {TABLA} WHERE rowid = %s", [(pk,) for pk in pks])
+
+
+def reconstruir(queryset, tamano_lote=2000):
+    """Vacía el índice y lo vuelve a llenar desde ``queryset``. Devuelve la cantidad indexada."""
+    with connection.cursor() as cursor:
+        crear_tabla(cursor)
+        cursor.execute(f"DELETE FROM {TABLA}")
+    total = 0
+    lote = []
+    for alumno in queryset.only('id', 'usuario_id', 'nombre', 'apellido', 'documento', 'email').iterator(
+        chunk_size=tamano_lote
+    ):
+        lote.append(alumno)
+        if len(lote) >= tamano_lote:
+            indexar(lote)
+            total += len(lote)
+            lote = []
+    indexar(lote)
+    return total + len(lote)
+
+
+# --- Consultas ----------------------------------------------------------------
+
+def sql_coincidencias(consulta):
+    """(sql, params) de un subquery con los ids que contienen todos los
+    términos, para ``pk__in=RawSQL(...)``; None si no se puede usar el índice."""
+    expresion = expresion_match(consulta) if disponible() else None
+    if expresion is None:
+        return None
+    return f"SELECT rowid FROM {TABLA} WHERE {TABLA} MATCH %s", (expresion,)
+
+
+def _candidatos(expresion, usuario_id, limite):
+    # Sin ORDER BY rank: calcular bm25 sobre miles de coincidencias cuesta más
+    # que puntuar en Python los primeros ``limite`` candidatos.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, texto FROM {TABLA} WHERE {TABLA} MATCH %s AND usuario_id = %s LIMIT %s",
+            [expresion, usuario_id, limite],
+        )
+        return cursor.fetchall()
+
+
+def _puntaje(lista, texto, tri_terminos):
+    """Similitud media de los términos contra su mejor palabra, o None si alguno no llega al umbral."""
+    palabras = texto.split()
+    total = 0.0
+    for termino, tri in zip(lista, tri_terminos):
+        if any(p.startswith(termino) for p in palabras):
+            mejor = 1.0
+        elif termino in texto:
+            mejor = 0.9
+        else:
+            mejor = max((similitud(termino, p, tri) for p in palabras), default=0.0)
+            if mejor < UMBRAL_SIMILITUD:
+                return None
+        total += mejor
+    return total / len(lista)
+
+
+def _piezas(termino):
+    """Mitades (de 3+ caracteres) del término: con un solo error de tipeo al
+    menos una queda intacta y sirve para traer candidatos de FTS."""
+    if len(termino) < 2 * MIN_CARACTERES:
+        return {termino[:MIN_CARACTERES], termino[-MIN_CARACTERES:]}
+    mitad = len(termino) // 2
+    return {termino[:mitad], termino[mitad:]}
+
+
+def expresion_difusa(lista):
+    """Expresión FTS5 para candidatos con errores de tipeo, o None.
+
+    Los términos numéricos (documentos) no se buscan de forma aproximada.
+    """
+    grupos = []
+    for termino in lista:
+        if len(termino) < MIN_CARACTERES or termino.isdigit():
+            continue
+        grupos.append('(' + ' OR '.join(_frase(p) for p in sorted(_piezas(termino))) + ')')
+    return ' AND '.join(grupos) or None
+
+
+def buscar_ids(usuario_id, consulta, limite=LIMITE):
+    """Ids de alumnos del usuario que coinciden con ``consulta``, mejores primero.
+
+    Primero busca los términos exactos (como subcadena); sólo si no hay
+    ninguna coincidencia recurre a la búsqueda aproximada.
+    """
+    lista = terminos(consulta)
+    if not disponible() or not lista or sum(len(t) for t in lista) < MIN_CARACTERES:
+        return []
+
+    tri_terminos = [trigramas(t) for t in lista]
+    puntajes = {}
+    expresion = expresion_match(consulta)
+    if expresion:
+        for pk, texto in _candidatos(expresion, usuario_id, CANDIDATOS):
+            puntajes[pk] = _puntaje(lista, texto, tri_terminos) or 0.9
+
+    if not puntajes:
+        difusa = expresion_difusa(lista)
+        if difusa:
+            for pk, texto in _candidatos(difusa, usuario_id, CANDIDATOS):
+                puntaje = _puntaje(lista, texto, tri_terminos)
+                if puntaje is not None:
+                    puntajes[pk] = puntaje
+
+    return sorted(puntajes, key=lambda pk: -puntajes[pk])[:limite]
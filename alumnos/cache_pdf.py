@@ -0,0 +1,151 @@
+# alumnos/cache_pdf.py
+"""Cache en disco de las fichas PDF, direccionada por contenido.
+
+La clave es un hash de los datos que aparecen en la ficha más
+``FICHA_VERSION``: si el alumno no cambió, el PDF se sirve desde
+``MEDIA_ROOT/fichas_cache`` sin volver a pasar por ReportLab. Los archivos se
+guardan como ``<alumno_pk>/<hash>.pdf`` para que las señales de ``Alumno``
+puedan borrar un alumno sin recorrer toda la cache, y el directorio se mantiene bajo ``FICHAS_CACHE_MAX_BYTES``
+eliminando los menos usados (LRU por mtime, que se actualiza en cada hit).
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+from .pdf import FICHA_VERSION, generar_ficha_pdf, generar_fichas_pdf
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(getattr(settings, 'FICHAS_CACHE_DIR', Path(settings.MEDIA_ROOT) / 'fichas_cache'))
+MAX_BYTES = getattr(settings, 'FICHAS_CACHE_MAX_BYTES', 200 * 1024 * 1024)
+# Cada cuántas escrituras se revisa el tamaño total del directorio
+ESCRITURAS_POR_REVISION = 50
+
+_lock = threading.Lock()
+_escrituras = 0
+
+
+def clave_ficha(alumno, usuario):
+    """Hash de todo lo que se dibuja en la ficha (sirve también como ETag)."""
+    datos = [
+        FICHA_VERSION,
+        alumno.nombre,
+        alumno.apellido,
+        alumno.email,
+        alumno.documento,
+        alumno.fecha_nacimiento.isoformat() if alumno.fecha_nacimiento else None,
+        usuario.username,
+    ]
+    return hashlib.sha256(json.dumps(datos).encode()).hexdigest()[:32]
+
+
+def _ruta(alumno_pk, clave):
+    return CACHE_DIR / str(alumno_pk) / f"{clave}.pdf"
+
+
+def _leer(ruta):
+    try:
+        pdf_bytes = ruta.read_bytes()
+    except FileNotFoundError:
+        return None
+    try:
+        os.utime(ruta)  # marca el uso para el LRU
+    except OSError:
+        pass
+    return pdf_bytes
+
+
+def ficha_pdf_cacheada(alumno, usuario, clave=None):
+    """Devuelve los bytes de la ficha, generándola sólo si no está en cache."""
+    clave = clave or clave_ficha(alumno, usuario)
+    ruta = _ruta(alumno.pk, clave)
+    pdf_bytes = _leer(ruta)
+    if pdf_bytes is None:
+        pdf_bytes = generar_ficha_pdf(alumno, usuario)
+        _guardar(ruta, pdf_bytes)
+    return pdf_bytes
+
+
+def fichas_pdf_cacheadas(alumnos, usuario):
+    """Bytes de la ficha de cada alumno, en el mismo orden.
+
+    Las que no están en cache se generan juntas con ``generar_fichas_pdf``
+    (en un pool de procesos si son muchas y el proceso lo habilitó).
+    """
+    rutas = [_ruta(a.pk, clave_ficha(a, usuario)) for a in alumnos]
+    pdfs = [_leer(ruta) for ruta in rutas]
+    faltan = [i for i, pdf in enumerate(pdfs) if pdf is None]
+    if faltan:
+        for i, pdf_bytes in zip(faltan, generar_fichas_pdf([alumnos[i] for i in faltan], usuario)):
+            pdfs[i] = pdf_bytes
+            _guardar(rutas[i], pdf_bytes)
+    return pdfs
+
+
+def _guardar(ruta, pdf_bytes):
+    global _escrituras
+    try:
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        # Escritura atómica: otro worker nunca lee un PDF a medio escribir
+        fd, tmp = tempfile.mkstemp(dir=ruta.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(pdf_bytes)
+        os.replace(tmp, ruta)
+    except OSError as e:
+        logger.warning("No se pudo guardar la ficha en cache (%s): %s", ruta, e)
+        return
+
+    with _lock:
+        _escrituras += 1
+        revisar = _escrituras % ESCRITURAS_POR_REVISION == 1
+    if revisar:
+        evictar()
+
+
+def _entradas():
+    """(mtime, tamaño, ruta) de cada PDF en la cache."""
+    try:
+        directorios = [d.path for d in os.scandir(CACHE_DIR) if d.is_dir()]
+    except FileNotFoundError:
+        return []
+    entradas = []
+    for directorio in directorios:
+        try:
+            for e in os.scandir(directorio):
+                if e.name.endswith('.pdf'):
+                    st = e.stat()
+                    entradas.append((st.st_mtime, st.st_size, e.path))
+        except FileNotFoundError:
+            continue
+    return entradas
+
+
+def evictar(max_bytes=None):
+    """Borra los PDFs menos usados hasta que la cache quede bajo el límite."""
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    entradas = _entradas()
+    total = sum(tamano for _, tamano, _ in entradas)
+    borrados = 0
+    for _, tamano, ruta in sorted(entradas):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(ruta)
+            os.rmdir(os.path.dirname(ruta))  # sólo si quedó vacío
+        except OSError:
+            pass
+        total -= tamano
+        borrados += 1
+    return borrados
+
+
+def invalidar(alumno_pk):
+    """Elimina todas las versiones cacheadas de la ficha de un alumno."""
+    shutil.rmtree(CACHE_DIR / str(alumno_pk), ignore_errors=True)
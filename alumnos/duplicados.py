@@ -0,0 +1,346 @@
+# alumnos/duplicados.py
+"""Detección de alumnos duplicados por claves de bloqueo.
+
+Comparar cada alumno con todos los del usuario es cuadrático. En cambio, cada
+alumno guarda en ``ClaveDuplicado`` unas pocas claves normalizadas (bloques)
+y sólo se comparan alumnos que comparten alguna:
+
+- ``d:`` documento sin puntos, guiones ni ceros a la izquierda.
+- ``e:`` email en minúsculas y sin ``+etiqueta``.
+- ``n:`` nombre y apellido completos en clave fonética (``fonetica``), sin
+  importar el orden de las palabras, y también sólo el primer nombre y el
+  primer apellido: segundos nombres o apellidos de más.
+- ``f:`` fecha de nacimiento e iniciales fonéticas de nombre y apellido:
+  errores de tipeo que la clave fonética no absorbe.
+
+Dentro de un bloque decide ``comparar``: el mismo documento o email es
+duplicado; documentos o fechas de nacimiento distintos lo descartan; si no,
+las palabras fonéticas de un nombre tienen que estar contenidas en las del
+otro, o los nombres parecerse por similitud de trigramas.
+
+Las señales de ``Alumno`` mantienen las claves al guardar; las altas y
+cambios por lote (importación, API) las actualizan a mano, como el índice de
+búsqueda.
+"""
+import csv
+import re
+from collections import defaultdict
+from functools import lru_cache
+from itertools import chain, combinations, product
+
+from django.db import connection, transaction
+from django.db.models import Count, Q
+
+from .busqueda import normalizar, similitud
+from .models import ClaveDuplicado
+
+# Similitud mínima de trigramas entre nombres completos sin coincidencia fonética
+UMBRAL_NOMBRE = 0.6
+# Bloques más grandes no se comparan (una clave demasiado común no sirve para bloquear);
+# el reporte los informa aparte
+MAX_BLOQUE = 500
+# Claves por consulta con IN
+TAMANO_CONSULTA = 2000
+MOTIVOS = {'documento': 'mismo documento', 'email': 'mismo email', 'nombre': 'nombre parecido'}
+CAMPOS = ('id', 'nombre', 'apellido', 'documento', 'email', 'fecha_nacimiento')
+
+# Grafías del español que suenan igual, en orden: 'gue' -> 'ge' después de 'ge' -> 'je'
+REGLAS_FONETICAS = [(re.compile(patron), reemplazo) for patron, reemplazo in (
+    (r'[^a-z]', ''),
+    (r'g(?=[ei])', 'j'),
+    (r'gu(?=[ei])', 'g'),
+    (r'ch', 'x'),
+    (r'qu', 'k'),
+    (r'c(?=[ei])', 's'),
+    (r'c', 'k'),
+    (r'z', 's'),
+    (r'h', ''),
+    (r'll', 'y'),
+    (r'y(?![aeiou])', 'i'),
+    (r'[vw]', 'b'),
+    (r'nb', 'mb'),
+    (r'(.)\1+', r'\1'),
+)]
+
+
+def fonetica(palabra):
+    """Clave fonética de una palabra ya normalizada ('gonzalez' -> 'gonsales')."""
+    for patron, reemplazo in REGLAS_FONETICAS:
+        palabra = patron.sub(reemplazo, palabra)
+    return palabra
+
+
+@lru_cache(maxsize=50_000)
+def _nombre(texto):
+    """(texto normalizado, claves fonéticas de sus palabras). Los nombres y
+    apellidos se repiten mucho: la cache evita recalcularlos en cada ficha."""
+    normalizado = normalizar(texto)
+    return normalizado, tuple(fonetica(p) for p in normalizado.split())
+
+
+def normalizar_documento(documento):
+    documento = documento or ''
+    if not documento.isdigit():
+        documento = re.sub(r'[^0-9A-Z]', '', documento.upper())
+    return documento.lstrip('0')
+
+
+def normalizar_email(email):
+    usuario, _, dominio = (email or '').strip().lower().partition('@')
+    return f"{usuario.split('+', 1)[0]}@{dominio}" if dominio else usuario
+
+
+def ficha(alumno):
+    """Datos normalizados para comparar, desde un ``Alumno`` o un dict de ``values(*CAMPOS)``."""
+    if not isinstance(alumno, dict):
+        alumno = {campo: getattr(alumno, campo) for campo in CAMPOS}
+    nombre, nombres = _nombre(alumno['nombre'])
+    apellido, apellidos = _nombre(alumno['apellido'])
+    return {
+        **alumno,
+        'clave_documento': normalizar_documento(alumno['documento']),
+        'clave_email': normalizar_email(alumno['email']),
+        'texto': f'{nombre} {apellido}',
+        'nombres': nombres,
+        'apellidos': apellidos,
+        'palabras': frozenset(filter(None, nombres + apellidos)),
+    }
+
+
+def claves(datos):
+    """Claves de bloqueo de una ficha."""
+    resultado = set()
+    nombres, apellidos = datos['nombres'], datos['apellidos']
+    if datos['palabras']:
+        resultado.add('n:' + ' '.join(sorted(datos['palabras'])))
+    if nombres and apellidos:
+        # Coincide con la clave completa de quien no tiene segundo nombre ni apellido
+        resultado.add('n:' + ' '.join(sorted({nombres[0], apellidos[0]})))
+    if datos['clave_documento']:
+        resultado.add('d:' + datos['clave_documento'])
+    if datos['clave_email']:
+        resultado.add('e:' + datos['clave_email'])
+    if datos['fecha_nacimiento']:
+        iniciales = ''.join(sorted(p[:1] for p in nombres[:1] + apellidos[:1]))
+        resultado.add(f"f:{datos['fecha_nacimiento'].isoformat()}:{iniciales}")
+    return {c[:200] for c in resultado}
+
+
+def comparar(a, b):
+    """Motivo por el que dos fichas serían el mismo alumno, o None."""
+    if a['clave_documento'] and a['clave_documento'] == b['clave_documento']:
+        return 'documento'
+    if a['clave_documento'] and b['clave_documento']:
+        return None
+    if a['clave_email'] and a['clave_email'] == b['clave_email']:
+        return 'email'
+    if a['fecha_nacimiento'] and b['fecha_nacimiento'] and a['fecha_nacimiento'] != b['fecha_nacimiento']:
+        return None
+    # Mismas palabras fonéticas, o las de uno contenidas en las del otro (segundo nombre o apellido de más)
+    if a['palabras'] and b['palabras'] and (a['palabras'] <= b['palabras'] or b['palabras'] <= a['palabras']):
+        return 'nombre'
+    if similitud(a['texto'], b['texto']) >= UMBRAL_NOMBRE:
+        return 'nombre'
+    return None
+
+
+# --- Mantenimiento de las claves ----------------------------------------------
+
+def filas_claves(alumnos):
+    """(alumno_id, usuario_id, clave) de cada alumno (con pk)."""
+    return [(a.pk, a.usuario_id, clave) for a in alumnos for clave in claves(ficha(a))]
+
+
+def indexar(alumnos, nuevos=False):
+    """Reemplaza las claves de cada alumno; con ``nuevos`` no hay claves previas que borrar."""
+    alumnos = list(alumnos)
+    if not alumnos:
+        return
+    if nuevos:
+        _insertar(alumnos)
+        return
+    # Sin savepoint: dentro de una transacción (lotes, API) no agrega consultas;
+    # suelto (post_save) el DELETE y el INSERT se aplican juntos
+    with transaction.atomic(savepoint=False):
+        desindexar(*(a.pk for a in alumnos))
+        _insertar(alumnos)
+
+
+def _insertar(alumnos):
+    # executemany y no bulk_create: sin RETURNING ni una transacción propia por llamada
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {ClaveDuplicado._meta.db_table} (alumno_id, usuario_id, clave) VALUES (%s, %s, %s)",
+            filas_claves(alumnos),
+        )
+
+
+def desindexar(*pks):
+    if pks:
+        # SQL directo como el INSERT de indexar: QuerySet.delete() abre su propia
+        # transacción (BEGIN/COMMIT de más en cada post_save en autocommit)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {ClaveDuplicado._meta.db_table} WHERE alumno_id IN ({', '.join(['%s'] * len(pks))})",
+                pks,
+            )
+
+
+def reconstruir(queryset, usuario_id=None, tamano_lote=2000):
+    """Vacía las claves y las vuelve a calcular desde ``queryset``. Devuelve la cantidad de alumnos.
+
+    Con ``usuario_id`` sólo se borran las claves de ese usuario y ``queryset``
+    tiene que ser sus alumnos; sin él, las de todos.
+    """
+    claves_previas = ClaveDuplicado.objects.all()
+    if usuario_id is not None:
+        claves_previas = claves_previas.filter(usuario_id=usuario_id)
+    claves_previas.delete()
+    total = 0
+    lote = []
+    for alumno in queryset.only('usuario_id', *CAMPOS).iterator(chunk_size=tamano_lote):
+        lote.append(alumno)
+        if len(lote) >= tamano_lote:
+            # Una transacción por lote: en autocommit cada INSERT sería un commit
+            with transaction.atomic():
+                indexar(lote, nuevos=True)
+            total += len(lote)
+            lote = []
+    with transaction.atomic():
+        indexar(lote, nuevos=True)
+    return total + len(lote)
+
+
+# --- Consultas ----------------------------------------------------------------
+
+CAMPOS_ALUMNO = [f'alumno__{campo}' for campo in CAMPOS]
+
+
+def _agregar_bloques(filas, bloques, fichas):
+    """Agrega a ``bloques`` las filas ``(clave, *CAMPOS del alumno)``; ``fichas`` reúsa una ficha por alumno."""
+    for clave, *valores in filas:
+        if valores[0] not in fichas:
+            fichas[valores[0]] = ficha(dict(zip(CAMPOS, valores)))
+        bloques[clave].append(fichas[valores[0]])
+
+
+def _por_clave(usuario_id, abiertas, sin_documento=()):
+    """{clave: [fichas de alumnos guardados con esa clave]}.
+
+    Para las claves de ``sin_documento`` sólo se traen alumnos sin documento:
+    a quien tiene documento, otro con un documento distinto no le puede ser
+    duplicado (y el mismo documento ya sale por su clave ``d:``). Los bloques
+    de más de MAX_BLOQUE alumnos se descartan en la misma consulta (se cuentan
+    sobre el índice, sin traer las filas). Una consulta por cada
+    TAMANO_CONSULTA claves de cada lista.
+    """
+    bloques, fichas = defaultdict(list), {}
+    abiertas, sin_documento = list(abiertas), list(sin_documento)
+    for i in range(0, max(len(abiertas), len(sin_documento)), TAMANO_CONSULTA):
+        parte_abiertas, parte_sin_documento = abiertas[i:i + TAMANO_CONSULTA], sin_documento[i:i + TAMANO_CONSULTA]
+        # El IN con todas las claves es el que recorre el índice; el OR sólo filtra esas filas
+        de_parte = ClaveDuplicado.objects.filter(usuario_id=usuario_id, clave__in=parte_abiertas + parte_sin_documento)
+        grandes = de_parte.values('clave').annotate(n=Count('id')).filter(n__gt=MAX_BLOQUE).values('clave')
+        filas = de_parte.filter(
+            Q(clave__in=parte_abiertas) | Q(alumno__documento__isnull=True) | Q(alumno__documento='')
+        ).exclude(clave__in=grandes)
+        _agregar_bloques(filas.values_list('clave', *CAMPOS_ALUMNO), bloques, fichas)
+    return bloques
+
+
+def posibles_duplicados(alumnos, usuario_id):
+    """Para cada alumno (aún sin claves guardadas), la lista de ``(ficha del otro, motivo)``.
+
+    Se compara con los alumnos guardados que comparten alguna clave y con los
+    anteriores de la misma lista.
+    """
+    fichas = [ficha(a) for a in alumnos]
+    claves_por_alumno = [claves(f) for f in fichas]
+    abiertas, sin_documento = set(), set()
+    for datos, claves_alumno in zip(fichas, claves_por_alumno):
+        if datos['clave_documento']:
+            sin_documento.update(c for c in claves_alumno if not c.startswith('d:'))
+            abiertas.update(c for c in claves_alumno if c.startswith('d:'))
+        else:
+            abiertas.update(claves_alumno)
+    guardados = _por_clave(usuario_id, sorted(abiertas), sorted(sin_documento - abiertas))
+    propios = {a.pk for a in alumnos if a.pk is not None}
+
+    anteriores = defaultdict(list)
+    resultado = []
+    for i, claves_alumno in enumerate(claves_por_alumno):
+        candidatos = {}
+        for clave in claves_alumno:
+            for otro in guardados.get(clave, ()):
+                if otro['id'] not in propios:
+                    candidatos[otro['id']] = otro
+            if len(anteriores[clave]) < MAX_BLOQUE:
+                for j in anteriores[clave]:
+                    candidatos[('lista', j)] = fichas[j]
+                anteriores[clave].append(i)
+        encontrados = []
+        for otro in candidatos.values():
+            motivo = comparar(fichas[i], otro)
+            if motivo:
+                encontrados.append((otro, motivo))
+        resultado.append(encontrados)
+    return resultado
+
+
+def _pares(clave, miembros):
+    """Pares de un bloque que vale la pena comparar.
+
+    Fuera de los bloques ``d:``, dos alumnos con documento sólo pueden ser
+    duplicados si el documento es el mismo, y ese par ya sale de su bloque
+    ``d:``: alcanza con los pares en los que al menos uno no tiene documento.
+    """
+    if clave.startswith('d:'):
+        return combinations(miembros, 2)
+    sin_documento = [m for m in miembros if not m['clave_documento']]
+    con_documento = [m for m in miembros if m['clave_documento']]
+    return chain(combinations(sin_documento, 2), product(sin_documento, con_documento))
+
+
+def reporte(usuario_id):
+    """Pares de posibles duplicados del usuario y los bloques omitidos por grandes.
+
+    Sólo se leen las claves que comparten dos o más alumnos (GROUP BY sobre el
+    índice) y se compara dentro de cada bloque. Devuelve ``(pares, omitidos)``:
+    ``pares`` es una lista de ``(ficha, ficha, motivo)`` y ``omitidos`` una de
+    ``(clave, tamaño)``. No se agrupa por transitividad: A parecido a B y B a
+    C no dice nada de A y C.
+    """
+    repetidas = (
+        ClaveDuplicado.objects.filter(usuario_id=usuario_id)
+        .values('clave').annotate(n=Count('id')).filter(n__gt=1).values('clave')
+    )
+    bloques, fichas = defaultdict(list), {}
+    _agregar_bloques(
+        ClaveDuplicado.objects.filter(usuario_id=usuario_id, clave__in=repetidas)
+        .values_list('clave', *CAMPOS_ALUMNO).iterator(chunk_size=5000),
+        bloques, fichas,
+    )
+
+    pares = {}
+    omitidos = []
+    for clave, miembros in bloques.items():
+        if len(miembros) > MAX_BLOQUE:
+            omitidos.append((clave, len(miembros)))
+            continue
+        for a, b in _pares(clave, miembros):
+            par = (a['id'], b['id']) if a['id'] < b['id'] else (b['id'], a['id'])
+            if par in pares:
+                continue
+            pares[par] = comparar(a, b)
+    resultado = [(fichas[a], fichas[b], motivo) for (a, b), motivo in sorted((p, m) for p, m in pares.items() if m)]
+    return resultado, sorted(omitidos, key=lambda o: -o[1])
+
+
+def escribir_reporte(pares, destino):
+    """Escribe los pares como CSV (motivo y los datos de cada alumno) en un archivo de texto."""
+    escritor = csv.writer(destino)
+    escritor.writerow(['motivo', *(f'{campo}_1' for campo in CAMPOS), *(f'{campo}_2' for campo in CAMPOS)])
+    for a, b, motivo in pares:
+        escritor.writerow([
+            MOTIVOS[motivo], *(a[campo] or '' for campo in CAMPOS), *(b[campo] or '' for campo in CAMPOS),
+        ])
@@ -0,0 +1,72 @@
+# alumnos/envios.py
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage
+from django.urls import reverse
+
+from core.envios import ErrorPermanente, registrar, renovar_bloqueo
+from .cache_pdf import ficha_pdf_cacheada
+from .lotes import guardar_pdf_fichas_combinado, limpiar_pdfs_combinados, mensajes_fichas
+from .models import Alumno
+from .pagination import filtrar_alumnos
+
+
+def _obtener(modelo, pk):
+    """Un objeto borrado después de encolar no vuelve: el trabajo falla sin reintentos."""
+    try:
+        return modelo.objects.get(pk=pk)
+    except modelo.DoesNotExist:
+        raise ErrorPermanente(f"{modelo._meta.verbose_name.capitalize()} #{pk} ya no existe.")
+
+
+@registrar('ficha_alumno')
+def mensaje_ficha(trabajo):
+    """Arma el email con la ficha en PDF de un alumno."""
+    datos = trabajo.payload
+    alumno = _obtener(Alumno, datos['alumno_id'])
+    usuario = _obtener(User, datos['usuario_id'])
+
+    email = EmailMessage(
+        subject=f"Ficha del Alumno - {alumno.nombre} {alumno.apellido}",
+        body=f"Adjunto PDF con la ficha del alumno {alumno.nombre} {alumno.apellido}.",
+        from_email=None,
+        to=datos['destinatarios'],
+    )
+    email.attach("alumno.pdf", ficha_pdf_cacheada(alumno, usuario), "application/pdf")
+    return email
+
+
+@registrar('fichas_lote')
+def mensajes_fichas_lote(trabajo):
+    """Emails con la ficha de cada alumno que cumple los filtros (envío masivo).
+
+    Recorre los alumnos por id y usa el id como progreso: un reintento sigue
+    después del último alumno al que ya se le envió la ficha.
+    """
+    datos = trabajo.payload
+    usuario = _obtener(User, datos['usuario_id'])
+    alumnos = filtrar_alumnos(Alumno.objects.filter(usuario=usuario), **datos.get('filtros', {}))
+    if trabajo.progreso:
+        alumnos = alumnos.filter(pk__gt=int(trabajo.progreso))
+    return ((alumno.pk, mensaje) for alumno, mensaje in mensajes_fichas(alumnos.order_by('pk'), usuario))
+
+
+@registrar('fichas_combinado')
+def pdf_fichas_combinado(trabajo):
+    """Genera el PDF combinado de un listado filtrado; no manda emails.
+
+    El archivo queda en ``COMBINADOS_DIR`` y la URL para bajarlo en el payload
+    (``descarga``), que la UI muestra al terminar el trabajo. Mientras lo arma
+    renueva el bloqueo: no hay envíos que lo renueven y otro worker lo
+    retomaría pasado ``BLOQUEO_SEGUNDOS``.
+    """
+    datos = trabajo.payload
+    usuario = _obtener(User, datos['usuario_id'])
+    alumnos = filtrar_alumnos(Alumno.objects.filter(usuario=usuario), **datos.get('filtros', {}))
+    limpiar_pdfs_combinados()
+    guardar_pdf_fichas_combinado(
+        trabajo.token, alumnos.order_by('apellido', 'nombre', 'id'), usuario,
+        al_avanzar=lambda: renovar_bloqueo(trabajo),
+    )
+    trabajo.payload['descarga'] = reverse('alumnos:descargar_fichas_combinado', args=[trabajo.token])
+    trabajo.save(update_fields=['payload', 'updated_at'])
+    return None
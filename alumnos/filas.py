@@ -0,0 +1,64 @@
+# alumnos/filas.py
+"""Render de las filas del listado de alumnos con cache por fila.
+
+Cada fila se renderiza una sola vez y se guarda en la cache de Django bajo
+``(pk, updated_at)``: editar un alumno cambia su sello y con eso la clave,
+así que no hace falta invalidar nada (las claves viejas vencen por TTL).
+Las filas no llevan nada propio de la petición (el token CSRF del botón
+Eliminar está en un único formulario fuera de la tabla), por eso se pueden
+compartir entre peticiones y workers que usen la misma cache.
+
+Las URLs de cada fila no pasan por ``reverse()``: se resuelven una vez con
+un pk de marcador y después sólo se reemplaza el pk.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.urls import get_script_prefix, reverse
+from django.utils.safestring import mark_safe
+
+FILAS_TTL = getattr(settings, 'ALUMNOS_FILAS_TTL', 24 * 3600)
+# Subir al cambiar el HTML de fila_alumno.html
+VERSION = 1
+PLANTILLA = 'alumnos/fila_alumno.html'
+ACCIONES = ('editar', 'descargar_pdf', 'enviar_pdf', 'eliminar')
+_MARCADOR = 987654321
+
+
+@lru_cache(maxsize=None)
+def _patrones(prefijo):
+    # Un juego por prefijo de script (SCRIPT_NAME), que cambia el resultado de reverse()
+    patrones = {}
+    for accion in ACCIONES:
+        antes, despues = reverse(f'alumnos:{accion}', args=[_MARCADOR]).split(str(_MARCADOR))
+        patrones[accion] = (antes, despues)
+    return patrones
+
+
+def urls_fila(pk):
+    """URLs de las acciones de un alumno, sin resolver la URLconf."""
+    return {accion: f'{antes}{pk}{despues}' for accion, (antes, despues) in _patrones(get_script_prefix()).items()}
+
+
+def clave_fila(alumno):
+    return f'alumnos:fila:v{VERSION}:{alumno.pk}:{alumno.updated_at.timestamp():.6f}'
+
+
+def filas_html(alumnos):
+    """HTML de cada fila, en el mismo orden; sólo renderiza las que no están en cache."""
+    claves = [clave_fila(a) for a in alumnos]
+    en_cache = cache.get_many(claves)
+    nuevas = {}
+    plantilla = None
+    filas = []
+    for alumno, clave in zip(alumnos, claves):
+        html = en_cache.get(clave)
+        if html is None:
+            plantilla = plantilla or get_template(PLANTILLA)
+            html = nuevas[clave] = plantilla.render({'a': alumno, 'urls': urls_fila(alumno.pk)})
+        filas.append(mark_safe(html))
+    if nuevas:
+        cache.set_many(nuevas, FILAS_TTL)
+    return filas
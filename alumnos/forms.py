@@ -6,4 +6,17 @@ class AlumnoForm(forms.ModelForm):
 
     class Meta:
         model = Alumno
-        fields = ['nombre', 'apellido', 'documento', 'email', 'fecha_nacimiento']
\ No newline at end of file
+        fields = ['nombre', 'apellido', 'documento', 'email', 'fecha_nacimiento']
+
+class ImportarAlumnosForm(forms.Form):
+    archivo = forms.FileField(
+        label="Archivo",
+        help_text="CSV (separado por coma o punto y coma) o XLSX, con columnas nombre, apellido, documento, email y fecha_nacimiento.",
+        widget=forms.ClearableFileInput(attrs={'accept': '.csv,.xlsx', 'class': 'form-control'}),
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError("El archivo debe ser CSV o XLSX.")
+        return archivo
@@ -0,0 +1,302 @@
+# alumnos/importacion.py
+"""Importación masiva de alumnos desde CSV o XLSX.
+
+El archivo se lee en streaming (``csv.reader`` sobre el archivo subido,
+``openpyxl`` en modo ``read_only``), cada fila se valida con los mismos
+campos de ``AlumnoForm`` y las válidas se insertan con ``bulk_create`` por
+lotes, cada lote en su propia transacción. Se descartan los documentos que
+el usuario ya tiene o que se repiten dentro del archivo. Las filas con
+errores no detienen la importación: quedan en ``ResultadoImportacion.errores``.
+
+``bulk_create`` no dispara ``post_save``: cada lote se agrega al índice de
+búsqueda y a las claves de duplicados en la misma transacción, y al terminar
+se invalidan a mano las métricas del dashboard. Las filas que se parecen a
+un alumno ya guardado o a otra fila del archivo (ver ``duplicados``) se
+importan igual y quedan en ``ResultadoImportacion.posibles_duplicados``.
+
+Los CSV se recorren una vez antes de importar para elegir la codificación
+(UTF-8, o la de Excel en Windows si no lo es) y rechazar los que tienen
+bytes nulos, así esos errores aparecen antes de guardar el primer lote.
+"""
+import codecs
+import csv
+import io
+import itertools
+import logging
+import unicodedata
+import zipfile
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from . import busqueda, duplicados, metricas
+from .forms import AlumnoForm
+from .models import Alumno
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 1000
+# Se prueban en orden; latin-1 decodifica cualquier byte y queda como último recurso
+CODIFICACIONES = ('utf-8-sig', 'cp1252')
+CAMPOS = AlumnoForm._meta.fields
+REQUERIDOS = ('nombre', 'apellido')
+# Encabezados alternativos (ya normalizados) que se aceptan en el archivo
+ALIAS = {
+    'dni': 'documento',
+    'correo': 'email',
+    'e_mail': 'email',
+    'fecha_de_nacimiento': 'fecha_nacimiento',
+    'nacimiento': 'fecha_nacimiento',
+}
+
+
+class ImportacionError(ValueError):
+    """El archivo no se puede importar (formato o encabezados inválidos)."""
+
+
+class ResultadoImportacion:
+    def __init__(self):
+        self.procesadas = 0
+        self.importadas = 0
+        self.duplicadas = 0
+        # (número de fila en el archivo, {campo: [mensajes]})
+        self.errores = []
+        # (número de fila, ficha del alumno parecido, motivo)
+        self.posibles_duplicados = []
+
+    @property
+    def con_error(self):
+        return len(self.errores)
+
+    def escribir_reporte(self, destino):
+        """Escribe los errores y los posibles duplicados como CSV (fila, campo, error) en un archivo de texto."""
+        escritor = csv.writer(destino)
+        escritor.writerow(['fila', 'campo', 'error'])
+        for fila, errores in self.errores:
+            for campo, mensajes in errores.items():
+                for mensaje in mensajes:
+                    escritor.writerow([fila, campo, mensaje])
+        for fila, otro, motivo in self.posibles_duplicados:
+            escritor.writerow([
+                fila, 'posible_duplicado',
+                f"Parecido a #{otro['id']} {otro['nombre']} {otro['apellido']} ({duplicados.MOTIVOS[motivo]}).",
+            ])
+
+
+def _normalizar_encabezado(valor):
+    texto = unicodedata.normalize('NFKD', str(valor or '')).encode('ascii', 'ignore').decode()
+    clave = '_'.join(texto.lower().replace('-', ' ').split())
+    return ALIAS.get(clave, clave)
+
+
+def _texto(valor):
+    """Celdas de XLSX: los documentos numéricos llegan como int/float."""
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    if isinstance(valor, (int, float)):
+        return str(valor)
+    return valor
+
+
+def _codificacion(archivo, tamano_bloque=64 * 1024):
+    """Elige la codificación del CSV recorriéndolo por bloques, sin cargarlo entero."""
+    if not archivo.seekable():
+        return CODIFICACIONES[0]
+    decodificadores = {c: codecs.getincrementaldecoder(c)() for c in CODIFICACIONES}
+    inicio = archivo.tell()
+    try:
+        for bloque in iter(lambda: archivo.read(tamano_bloque), b''):
+            if b'\x00' in bloque:
+                raise ImportacionError("El archivo tiene bytes nulos: guardarlo como CSV UTF-8.")
+            for codificacion, decodificador in list(decodificadores.items()):
+                try:
+                    decodificador.decode(bloque)
+                except UnicodeDecodeError:
+                    del decodificadores[codificacion]
+    finally:
+        archivo.seek(inicio)
+    for codificacion, decodificador in decodificadores.items():
+        try:
+            decodificador.decode(b'', final=True)
+            return codificacion
+        except UnicodeDecodeError:
+            pass
+    return 'latin-1'
+
+
+def _filas_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding=_codificacion(archivo), newline='')
+    primera = texto.readline()
+    # Excel en español exporta con ';'
+    delimitador = ';' if primera.count(';') > primera.count(',') else ','
+    try:
+        yield from csv.reader(itertools.chain([primera], texto), delimiter=delimitador)
+    finally:
+        texto.detach()
+
+
+def _filas_xlsx(archivo):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportacionError("Para importar XLSX hace falta instalar openpyxl.")
+    from openpyxl.utils.exceptions import InvalidFileException
+    try:
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+    except InvalidFileException as e:
+        raise ImportacionError(f"No se pudo leer el archivo XLSX: {e}")
+    try:
+        for fila in libro.active.iter_rows(values_only=True):
+            yield fila
+    finally:
+        libro.close()
+
+
+def _leyendo(filas):
+    """Convierte los errores de los lectores (archivo dañado o mal codificado) en ``ImportacionError``."""
+    try:
+        yield from filas
+    except ImportacionError:
+        raise
+    except (csv.Error, ValueError, KeyError, EOFError, zipfile.BadZipFile) as e:
+        raise ImportacionError(f"No se pudo leer el archivo: {e}")
+
+
+def leer_filas(archivo, nombre='', formato=None):
+    """Itera ``(número de fila, {campo: valor})`` leyendo el archivo en streaming.
+
+    Propaga ``ImportacionError`` si el archivo no se puede leer, también a mitad de camino.
+    """
+    formato = (formato or nombre.rsplit('.', 1)[-1]).lower()
+    if formato == 'xlsx':
+        filas = _leyendo(_filas_xlsx(archivo))
+    elif formato == 'csv':
+        filas = _leyendo(_filas_csv(archivo))
+    else:
+        raise ImportacionError(f"Formato no soportado: {formato!r} (usar CSV o XLSX).")
+
+    encabezado = next(filas, None)
+    if not encabezado:
+        raise ImportacionError("El archivo está vacío.")
+    columnas = [_normalizar_encabezado(c) for c in encabezado]
+    faltantes = [c for c in REQUERIDOS if c not in columnas]
+    if faltantes:
+        raise ImportacionError(f"Faltan columnas obligatorias: {', '.join(faltantes)}.")
+    indices = [(i, c) for i, c in enumerate(columnas) if c in CAMPOS]
+
+    for numero, fila in enumerate(filas, start=2):
+        if not any(v not in (None, '') for v in fila):
+            continue
+        yield numero, {campo: _texto(fila[i]) if i < len(fila) else '' for i, campo in indices}
+
+
+def _fecha_iso(valor):
+    """Atajo para fechas AAAA-MM-DD (o ya convertidas por openpyxl): evita
+    probar todos los ``DATE_INPUT_FORMATS`` con strptime en cada fila."""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    if isinstance(valor, str) and len(valor) == 10:
+        try:
+            return date.fromisoformat(valor)
+        except ValueError:
+            pass
+    return None
+
+
+def validar_fila(datos, campos=CAMPOS):
+    """Aplica las reglas de los campos de ``AlumnoForm``; devuelve (limpios, errores).
+
+    ``campos`` limita la validación a un subconjunto (actualizaciones parciales).
+    """
+    limpios, errores = {}, {}
+    for nombre in campos:
+        campo = AlumnoForm.base_fields[nombre]
+        if nombre == 'fecha_nacimiento':
+            fecha = _fecha_iso(datos.get(nombre))
+            if fecha is not None:
+                limpios[nombre] = fecha
+                continue
+        try:
+            limpios[nombre] = campo.clean(datos.get(nombre, ''))
+        except ValidationError as e:
+            errores[nombre] = list(e.messages)
+    return limpios, errores
+
+
+def _documentos_existentes(usuario):
+    return set(
+        Alumno.objects.filter(usuario=usuario)
+        .exclude(documento__isnull=True).exclude(documento='')
+        .values_list('documento', flat=True)
+        .iterator(chunk_size=5000)
+    )
+
+
+def _guardar_lote(lote, filas, resultado):
+    with transaction.atomic():
+        Alumno.objects.bulk_create(lote)
+        busqueda.indexar(lote)
+        # Contra los alumnos guardados (incluidos los lotes anteriores) y dentro del lote
+        posibles = duplicados.posibles_duplicados(lote, lote[0].usuario_id)
+        duplicados.indexar(lote, nuevos=True)
+    for fila, encontrados in zip(filas, posibles):
+        resultado.posibles_duplicados.extend((fila, otro, motivo) for otro, motivo in encontrados)
+    resultado.importadas += len(lote)
+
+
+def importar_alumnos(archivo, usuario, nombre='', formato=None, tamano_lote=TAMANO_LOTE, progreso=None):
+    """Importa alumnos de ``archivo`` (binario) para ``usuario``.
+
+    ``progreso(resultado)`` se llama después de guardar cada lote.
+    Propaga ``ImportacionError`` si el archivo no se puede leer; si falla a
+    mitad de camino los lotes ya guardados quedan y el mensaje lo indica.
+    """
+    resultado = ResultadoImportacion()
+    documentos = _documentos_existentes(usuario)
+    lote, filas = [], []
+    try:
+        for numero, datos in leer_filas(archivo, nombre, formato):
+            resultado.procesadas += 1
+            limpios, errores = validar_fila(datos)
+            documento = limpios.get('documento')
+            if not errores and documento:
+                if documento in documentos:
+                    resultado.duplicadas += 1
+                    errores = {'documento': [f"El documento {documento} ya está registrado."]}
+                else:
+                    documentos.add(documento)
+            if errores:
+                resultado.errores.append((numero, errores))
+                continue
+
+            lote.append(Alumno(usuario_id=usuario.pk, **limpios))
+            filas.append(numero)
+            if len(lote) >= tamano_lote:
+                _guardar_lote(lote, filas, resultado)
+                lote, filas = [], []
+                if progreso:
+                    progreso(resultado)
+        if lote:
+            _guardar_lote(lote, filas, resultado)
+            if progreso:
+                progreso(resultado)
+    except ImportacionError as e:
+        if resultado.importadas:
+            raise ImportacionError(
+                f"{e} Se importaron {resultado.importadas} alumnos antes del error."
+            ) from e
+        raise
+    finally:
+        if resultado.importadas:
+            metricas.invalidar(usuario.pk)
+
+    logger.info(
+        "Importación de %s: %s filas, %s importadas, %s con error, %s posibles duplicados.",
+        usuario, resultado.procesadas, resultado.importadas, resultado.con_error, len(resultado.posibles_duplicados),
+    )
+    return resultado
@@ -0,0 +1,173 @@
+# alumnos/lotes.py
+"""Operaciones sobre muchas fichas a la vez: envío masivo y descargas.
+
+El envío masivo abre una sola conexión SMTP y manda los mensajes por tandas
+con ``send_messages()``. El ZIP recorre el queryset con ``.iterator()`` por
+tandas: las fichas de cada tanda que no están en cache se generan juntas y la
+memoria queda acotada por el tamaño de la tanda. El PDF combinado no: el
+canvas de ReportLab guarda todas las páginas hasta ``save()``, así que crece
+con la cantidad de alumnos. Por eso, pasado ``LIMITE_PDF_DIRECTO``, lo genera
+el worker de la cola (``alumnos.envios``) en un archivo y no la petición.
+"""
+import logging
+import os
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+from core import instrumentacion
+
+from .cache_pdf import fichas_pdf_cacheadas
+from .pdf import escribir_fichas_pdf
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 100
+CHUNK_ITERATOR = 500
+# Hasta cuántos alumnos el PDF combinado se genera en la misma petición
+LIMITE_PDF_DIRECTO = getattr(settings, 'FICHAS_LIMITE_PDF_DIRECTO', 200)
+COMBINADOS_DIR = Path(getattr(settings, 'FICHAS_COMBINADAS_DIR', Path(settings.MEDIA_ROOT) / 'fichas_combinadas'))
+# Los PDF combinados generados por la cola se borran pasado este tiempo
+COMBINADOS_SEGUNDOS = getattr(settings, 'FICHAS_COMBINADAS_SEGUNDOS', 24 * 3600)
+
+
+def _tandas(iterable, tamano):
+    tanda = []
+    for item in iterable:
+        tanda.append(item)
+        if len(tanda) >= tamano:
+            yield tanda
+            tanda = []
+    if tanda:
+        yield tanda
+
+
+def mensaje_ficha(alumno, pdf_bytes):
+    """Email con la ficha en PDF dirigido al propio alumno."""
+    email = EmailMessage(
+        subject=f"Ficha del Alumno - {alumno.nombre} {alumno.apellido}",
+        body=f"Adjunto PDF con la ficha del alumno {alumno.nombre} {alumno.apellido}.",
+        from_email=None,
+        to=[alumno.email],
+    )
+    email.attach("alumno.pdf", pdf_bytes, "application/pdf")
+    return email
+
+
+def _fichas_por_tanda(alumnos, usuario):
+    """(alumno, pdf) recorriendo el queryset; los PDFs faltantes se generan por tanda."""
+    for tanda in _tandas(alumnos.iterator(chunk_size=CHUNK_ITERATOR), CHUNK_ITERATOR):
+        yield from zip(tanda, fichas_pdf_cacheadas(tanda, usuario))
+
+
+def mensajes_fichas(alumnos, usuario):
+    """Genera pares (alumno, email) de un queryset de alumnos (omite los que no tienen email)."""
+    for alumno, pdf_bytes in _fichas_por_tanda(alumnos.exclude(email__isnull=True).exclude(email=''), usuario):
+        yield alumno, mensaje_ficha(alumno, pdf_bytes)
+
+
+def enviar_fichas(alumnos, usuario, tamano_lote=TAMANO_LOTE, connection=None):
+    """Envía la ficha de cada alumno reutilizando una única conexión SMTP.
+
+    Devuelve la cantidad de emails enviados.
+    """
+    enviados = 0
+    connection = connection or get_connection()
+    with connection:
+        mensajes = (mensaje for _, mensaje in mensajes_fichas(alumnos, usuario))
+        for tanda in _tandas(mensajes, tamano_lote):
+            with instrumentacion.medir('email'):
+                enviados += connection.send_messages(tanda) or 0
+            logger.info("Fichas enviadas: %s", enviados)
+    return enviados
+
+
+def pdf_fichas_combinado(alumnos, usuario):
+    """PDF con una página por alumno, escrito en un archivo temporal.
+
+    Devuelve el archivo abierto y posicionado al inicio, listo para
+    ``FileResponse``; se borra solo al cerrarlo. Pensado para listados de
+    hasta ``LIMITE_PDF_DIRECTO`` alumnos.
+    """
+    archivo = tempfile.TemporaryFile()
+    escribir_fichas_pdf(archivo, alumnos.iterator(chunk_size=CHUNK_ITERATOR), usuario)
+    archivo.seek(0)
+    return archivo
+
+
+def ruta_pdf_combinado(token):
+    return COMBINADOS_DIR / f"{token}.pdf"
+
+
+def limpiar_pdfs_combinados(segundos=COMBINADOS_SEGUNDOS):
+    """Borra los PDF combinados más viejos que ``segundos``."""
+    limite = time.time() - segundos
+    for ruta in COMBINADOS_DIR.glob('*.pdf'):
+        try:
+            if ruta.stat().st_mtime < limite:
+                ruta.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _avisando(iterable, al_avanzar, cada):
+    for i, item in enumerate(iterable, start=1):
+        if i % cada == 0:
+            al_avanzar()
+        yield item
+
+
+def guardar_pdf_fichas_combinado(token, alumnos, usuario, al_avanzar=None):
+    """Escribe el PDF combinado en ``ruta_pdf_combinado(token)``.
+
+    La escritura es atómica: la descarga nunca ve un archivo a medias.
+    ``al_avanzar()`` se llama cada ``CHUNK_ITERATOR`` alumnos.
+    """
+    ruta = ruta_pdf_combinado(token)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=ruta.parent, suffix='.tmp')
+    try:
+        filas = alumnos.iterator(chunk_size=CHUNK_ITERATOR)
+        if al_avanzar:
+            filas = _avisando(filas, al_avanzar, CHUNK_ITERATOR)
+        with os.fdopen(fd, 'wb') as archivo:
+            escribir_fichas_pdf(archivo, filas, usuario)
+        os.replace(tmp, ruta)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return ruta
+
+
+class _BufferZip:
+    """Destino no seekable para ZipFile: acumula bytes hasta que se los retira."""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+def zip_fichas_stream(alumnos, usuario):
+    """Genera un ZIP (una ficha PDF por alumno) en trozos, para StreamingHttpResponse."""
+    buffer = _BufferZip()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED) as zf:
+        for alumno, pdf_bytes in _fichas_por_tanda(alumnos, usuario):
+            nombre = f"ficha_{alumno.pk}_{alumno.apellido}_{alumno.nombre}.pdf".replace(' ', '_').replace('/', '_')
+            zf.writestr(nombre, pdf_bytes)
+            yield buffer.retirar()
+    yield buffer.retirar()
@@ -0,0 +1,37 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from alumnos.lotes import TAMANO_LOTE, enviar_fichas
+from alumnos.models import Alumno
+from alumnos.pagination import CAMPOS_BUSQUEDA, filtrar_alumnos
+from core import pdf
+
+
+class Command(BaseCommand):
+    help = "Envía por email la ficha en PDF a todos los alumnos de un usuario, sobre una sola conexión SMTP."
+
+    def add_arguments(self, parser):
+        parser.add_argument('usuario', help="Username dueño de los alumnos.")
+        parser.add_argument('--q', default='', help="Filtro de texto libre (como en gestion_alumnos).")
+        for campo in CAMPOS_BUSQUEDA:
+            parser.add_argument(f'--{campo}', default='', help=f"Filtrar por {campo}.")
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Mensajes por llamada a send_messages().")
+        parser.add_argument('--dry-run', action='store_true', help="Sólo informa cuántos emails se enviarían.")
+
+    def handle(self, *args, **options):
+        try:
+            usuario = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['usuario']!r}.")
+
+        filtros = {campo: options[campo] for campo in ('q',) + CAMPOS_BUSQUEDA}
+        alumnos = filtrar_alumnos(Alumno.objects.filter(usuario=usuario), **filtros)
+
+        if options['dry_run']:
+            total = alumnos.exclude(email__isnull=True).exclude(email='').count()
+            self.stdout.write(f"Se enviarían {total} fichas.")
+            return
+
+        pdf.habilitar_pool()
+        enviados = enviar_fichas(alumnos, usuario, tamano_lote=max(1, options['lote']))
+        self.stdout.write(self.style.SUCCESS(f"{enviados} fichas enviadas."))
@@ -0,0 +1,56 @@
+import sys
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from alumnos.importacion import TAMANO_LOTE, ImportacionError, importar_alumnos
+
+
+class Command(BaseCommand):
+    help = "Importa alumnos desde un CSV o XLSX, validando cada fila e insertando por lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('usuario', help="Username dueño de los alumnos importados.")
+        parser.add_argument('archivo', help="Ruta al archivo .csv o .xlsx.")
+        parser.add_argument('--formato', choices=['csv', 'xlsx'], help="Por defecto según la extensión.")
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Filas por bulk_create/transacción.")
+        parser.add_argument('--reporte', help="Escribe los errores y posibles duplicados por fila en este CSV ('-' para stdout).")
+
+    def handle(self, *args, **options):
+        try:
+            usuario = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['usuario']!r}.")
+
+        inicio = time.perf_counter()
+
+        def progreso(resultado):
+            self.stderr.write(
+                f"\r{resultado.procesadas} filas, {resultado.importadas} importadas, "
+                f"{resultado.con_error} con error ({time.perf_counter() - inicio:.1f} s)",
+                ending='',
+            )
+
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resultado = importar_alumnos(
+                    archivo, usuario, nombre=options['archivo'], formato=options['formato'],
+                    tamano_lote=max(1, options['lote']), progreso=progreso,
+                )
+        except (OSError, ImportacionError) as e:
+            raise CommandError(str(e))
+        self.stderr.write('')
+
+        if options['reporte'] and (resultado.errores or resultado.posibles_duplicados):
+            if options['reporte'] == '-':
+                resultado.escribir_reporte(sys.stdout)
+            else:
+                with open(options['reporte'], 'w', newline='', encoding='utf-8') as destino:
+                    resultado.escribir_reporte(destino)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.importadas} de {resultado.procesadas} alumnos importados en "
+            f"{time.perf_counter() - inicio:.1f} s ({resultado.duplicadas} duplicados, "
+            f"{resultado.con_error} filas con error, {len(resultado.posibles_duplicados)} posibles duplicados)."
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from alumnos import busqueda
+from alumnos.models import Alumno
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda (FTS5) de alumnos."
+
+    def handle(self, *args, **options):
+        if not busqueda.disponible():
+            raise CommandError("El índice de búsqueda sólo está disponible con SQLite.")
+        total = busqueda.reconstruir(Alumno.objects.all())
+        self.stdout.write(self.style.SUCCESS(f"{total} alumnos indexados."))
@@ -0,0 +1,52 @@
+import sys
+import time
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from alumnos import duplicados
+from alumnos.models import Alumno
+
+
+class Command(BaseCommand):
+    help = "Lista los pares de posibles alumnos duplicados de un usuario, comparando sólo dentro de cada clave de bloqueo."
+
+    def add_arguments(self, parser):
+        parser.add_argument('usuario', help="Username dueño de los alumnos.")
+        parser.add_argument('--salida', help="Escribe los pares en este CSV ('-' para stdout).")
+        parser.add_argument(
+            '--reconstruir', action='store_true',
+            help="Recalcula antes las claves de los alumnos del usuario (después de cambiar las reglas).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            usuario = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['usuario']!r}.")
+
+        if options['reconstruir']:
+            inicio = time.perf_counter()
+            total = duplicados.reconstruir(Alumno.objects.filter(usuario=usuario), usuario_id=usuario.pk)
+            self.stderr.write(f"Claves de {total} alumnos recalculadas en {time.perf_counter() - inicio:.1f} s.")
+
+        inicio = time.perf_counter()
+        pares, omitidos = duplicados.reporte(usuario.pk)
+        duracion = time.perf_counter() - inicio
+
+        if options['salida'] == '-':
+            duplicados.escribir_reporte(pares, sys.stdout)
+        elif options['salida']:
+            with open(options['salida'], 'w', newline='', encoding='utf-8') as destino:
+                duplicados.escribir_reporte(pares, destino)
+
+        for clave, tamano in omitidos:
+            self.stderr.write(self.style.WARNING(
+                f"Bloque {clave!r} con {tamano} alumnos: no se comparó (máximo {duplicados.MAX_BLOQUE})."
+            ))
+        por_motivo = Counter(motivo for _, _, motivo in pares)
+        detalle = ', '.join(f"{por_motivo[m]} por {texto}" for m, texto in duplicados.MOTIVOS.items() if por_motivo[m])
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(pares)} pares de posibles duplicados{f' ({detalle})' if detalle else ''} en {duracion:.1f} s."
+        ))
@@ -0,0 +1,136 @@
+# alumnos/metricas.py
+"""Métricas del dashboard, calculadas con agregados y cacheadas por usuario.
+
+Todos los contadores salen de un único ``aggregate()`` con ``filter=``;
+la inscripción por mes es un segundo GROUP BY acotado a los últimos meses.
+El resultado se guarda por usuario en la cache ``metricas``, compartida por
+los workers (archivo), y las señales de ``Alumno`` lo invalidan: el worker
+que sirve el dashboard después de un alta ve la invalidación aunque la haya
+hecho otro.
+
+Con réplica de reportes, recalcular justo después de una escritura podría
+leer una réplica atrasada y dejar ese dato viejo en cache todo el TTL. Por
+eso ``invalidar`` también marca al usuario durante ``METRICAS_RETRASO_REPLICA``
+segundos, y mientras tanto las métricas se leen de ``default``.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from core.db import para_reportes
+
+from .models import Alumno
+
+METRICAS_TTL = getattr(settings, 'ALUMNOS_METRICAS_TTL', 300)
+# Segundos después de una escritura en que las métricas no se leen de la réplica
+METRICAS_RETRASO_REPLICA = getattr(settings, 'ALUMNOS_METRICAS_RETRASO_REPLICA', 60)
+METRICAS_CACHE = getattr(settings, 'ALUMNOS_METRICAS_CACHE', 'metricas')
+MESES_INSCRIPCION = 12
+# (etiqueta, edad mínima, edad máxima) en años cumplidos; None = sin límite
+RANGOS_EDAD = (
+    ('Menores de 18', None, 17),
+    ('18 a 25', 18, 25),
+    ('26 a 35', 26, 35),
+    ('Mayores de 35', 36, None),
+)
+# Incrementar si cambia la forma de las métricas cacheadas
+VERSION = 1
+
+
+def clave_cache(usuario_id):
+    return f"alumnos:dashboard:v{VERSION}:{usuario_id}"
+
+
+def clave_escritura(usuario_id):
+    return f"alumnos:dashboard:escritura:{usuario_id}"
+
+
+def invalidar(usuario_id):
+    cache = caches[METRICAS_CACHE]
+    cache.delete(clave_cache(usuario_id))
+    cache.set(clave_escritura(usuario_id), True, METRICAS_RETRASO_REPLICA)
+
+
+def _hace_anios(hoy, anios):
+    try:
+        return hoy.replace(year=hoy.year - anios)
+    except ValueError:  # 29 de febrero
+        return hoy.replace(year=hoy.year - anios, day=28)
+
+
+def _filtro_edad(hoy, minima, maxima):
+    """Q sobre fecha_nacimiento para edades entre minima y maxima (inclusive)."""
+    condicion = Q()
+    if minima is not None:
+        condicion &= Q(fecha_nacimiento__lte=_hace_anios(hoy, minima))
+    if maxima is not None:
+        condicion &= Q(fecha_nacimiento__gt=_hace_anios(hoy, maxima + 1))
+    return condicion
+
+
+def calcular_metricas(usuario, replica=True):
+    """Calcula las métricas sin cache (tres consultas: agregados, meses y recientes).
+
+    Con ``replica=False`` lee de ``default`` aunque haya réplica de reportes.
+    """
+    hoy = timezone.localdate()
+    alumnos = Alumno.objects.filter(usuario=usuario)
+    if replica:
+        alumnos = para_reportes(alumnos)
+
+    sin_documentacion = Q(documento__isnull=True) | Q(documento='') | Q(email__isnull=True) | Q(email='')
+    agregados = {
+        'total': Count('id'),
+        'pendientes': Count('id', filter=sin_documentacion),
+        'sin_fecha_nacimiento': Count('id', filter=Q(fecha_nacimiento__isnull=True)),
+    }
+    for i, (_, minima, maxima) in enumerate(RANGOS_EDAD):
+        agregados[f'edad_{i}'] = Count('id', filter=_filtro_edad(hoy, minima, maxima))
+    datos = alumnos.aggregate(**agregados)
+
+    desde = date(hoy.year - (1 if hoy.month < MESES_INSCRIPCION else 0), (hoy.month % MESES_INSCRIPCION) + 1, 1)
+    por_mes = {
+        fila['mes'].strftime('%Y-%m'): fila['cantidad']
+        for fila in alumnos.filter(created_at__date__gte=desde)
+        .annotate(mes=TruncMonth('created_at'))
+        .values('mes')
+        .annotate(cantidad=Count('id'))
+        .order_by('mes')
+    }
+    inscripciones = []
+    anio, mes = desde.year, desde.month
+    for _ in range(MESES_INSCRIPCION):
+        clave = f"{anio}-{mes:02d}"
+        inscripciones.append({'mes': clave, 'cantidad': por_mes.get(clave, 0)})
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+
+    return {
+        'total_alumnos': datos['total'],
+        'pendientes': datos['pendientes'],
+        'alumnos_activos': datos['total'] - datos['pendientes'],
+        'sin_fecha_nacimiento': datos['sin_fecha_nacimiento'],
+        'rangos_edad': [
+            {'etiqueta': etiqueta, 'cantidad': datos[f'edad_{i}']}
+            for i, (etiqueta, _, _) in enumerate(RANGOS_EDAD)
+        ],
+        'inscripciones_por_mes': inscripciones,
+        'alumnos_recientes': list(
+            alumnos.order_by('-created_at').values('id', 'nombre', 'apellido', 'documento', 'email', 'created_at')[:5]
+        ),
+    }
+
+
+def metricas_dashboard(usuario):
+    """Métricas del usuario desde la cache, calculándolas si no están."""
+    cache = caches[METRICAS_CACHE]
+    clave = clave_cache(usuario.pk)
+    metricas = cache.get(clave)
+    if metricas is None:
+        escritura_reciente = cache.get(clave_escritura(usuario.pk)) is not None
+        metricas = calcular_metricas(usuario, replica=not escritura_reciente)
+        cache.set(clave, metricas, METRICAS_TTL)
+    return metricas
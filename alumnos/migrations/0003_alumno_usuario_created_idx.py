@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumnos', '0002_alter_alumno_options_alter_alumno_apellido_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alumno',
+            index=models.Index(fields=['usuario', 'created_at', 'id'], name='alumno_usuario_created_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def crear_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    from alumnos import busqueda
+
+    Alumno = apps.get_model('alumnos', 'Alumno')
+    busqueda.reconstruir(Alumno.objects.all())
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS alumnos_busqueda')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumnos', '0003_alumno_usuario_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def calcular_claves(apps, schema_editor):
+    from alumnos import duplicados
+
+    Alumno = apps.get_model('alumnos', 'Alumno')
+    ClaveDuplicado = apps.get_model('alumnos', 'ClaveDuplicado')
+
+    def guardar(lote):
+        ClaveDuplicado.objects.bulk_create(
+            ClaveDuplicado(alumno_id=pk, usuario_id=usuario_id, clave=clave)
+            for pk, usuario_id, clave in duplicados.filas_claves(lote)
+        )
+
+    lote = []
+    for alumno in Alumno.objects.only('usuario_id', *duplicados.CAMPOS).iterator(chunk_size=2000):
+        lote.append(alumno)
+        if len(lote) >= 2000:
+            guardar(lote)
+            lote = []
+    guardar(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumnos', '0005_alumno_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaveDuplicado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=200)),
+                ('alumno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='claves_duplicado', to='alumnos.alumno')),
+                ('usuario', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['usuario', 'clave', 'alumno'], name='alumno_clave_duplicado_idx')],
+            },
+        ),
+        migrations.RunPython(calcular_claves, migrations.RunPython.noop),
+    ]
@@ -10,11 +10,32 @@ class Alumno(models.Model):
     email = models.EmailField("Email", blank=True, null=True)
     fecha_nacimiento = models.DateField("Fecha de nacimiento", blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Sello de modificación: forma parte de la clave de cache de la fila renderizada
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Paginación por cursor del listado: WHERE usuario = ? ORDER BY created_at, id
+            models.Index(fields=['usuario', 'created_at', 'id'], name='alumno_usuario_created_idx'),
+        ]
         verbose_name = "Alumno"
         verbose_name_plural = "Alumnos"
 
     def __str__(self):
-        return f"{self.nombre} {self.apellido} ({self.documento or 'sin doc'})"
\ No newline at end of file
+        return f"{self.nombre} {self.apellido} ({self.documento or 'sin doc'})"
+
+
+class ClaveDuplicado(models.Model):
+    """Clave de bloqueo de un alumno para buscar duplicados (ver alumnos/duplicados.py)."""
+    alumno = models.ForeignKey(Alumno, on_delete=models.CASCADE, related_name='claves_duplicado')
+    # Copia de alumno.usuario: los bloques se buscan por usuario sin join. El índice
+    # compuesto de abajo ya empieza por usuario.
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', db_index=False)
+    clave = models.CharField(max_length=200)
+
+    class Meta:
+        indexes = [
+            # WHERE usuario = ? AND clave IN (...) y GROUP BY clave, sin leer la tabla
+            models.Index(fields=['usuario', 'clave', 'alumno'], name='alumno_clave_duplicado_idx'),
+        ]
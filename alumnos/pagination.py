@@ -0,0 +1,148 @@
+# alumnos/pagination.py
+"""Filtrado y paginación por cursor (keyset) del listado de alumnos.
+
+En lugar de OFFSET, cada página se pide a partir del último (campo, id)
+visto, así la consulta usa el índice compuesto y cuesta lo mismo en la
+página 1 que en la 500.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+from . import busqueda
+
+PAGE_SIZE = getattr(settings, 'ALUMNOS_PAGE_SIZE', 50)
+MAX_PAGE_SIZE = 500
+
+# Campos por los que se puede ordenar el listado (?orden=apellido, ?orden=-email, ...)
+CAMPOS_ORDEN = ('created_at', 'nombre', 'apellido', 'documento', 'email')
+# Coincide con Alumno.Meta.ordering
+ORDEN_DEFAULT = '-created_at'
+# Campos nulos: se ordenan como '' para que el cursor sea comparable
+CAMPOS_NULOS = ('documento', 'email')
+CAMPOS_BUSQUEDA = ('nombre', 'apellido', 'documento', 'email')
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def normalizar_orden(orden):
+    """Devuelve un orden válido (p. ej. 'apellido' o '-created_at')."""
+    orden = (orden or '').strip()
+    if orden.lstrip('-') in CAMPOS_ORDEN:
+        return orden
+    return ORDEN_DEFAULT
+
+
+def filtrar_alumnos(queryset, q=None, **campos):
+    """Aplica en la base el filtro de texto libre (q) y los filtros por campo.
+
+    El texto libre usa el índice de búsqueda (sin tildes ni mayúsculas) si
+    está disponible; si no, o si algún término es muy corto, ``icontains``.
+    """
+    q = (q or '').strip()
+    subconsulta = busqueda.sql_coincidencias(q) if q else None
+    if subconsulta:
+        queryset = queryset.filter(pk__in=RawSQL(*subconsulta))
+    elif q:
+        condicion = Q()
+        for campo in CAMPOS_BUSQUEDA:
+            condicion |= Q(**{f'{campo}__icontains': q})
+        queryset = queryset.filter(condicion)
+    for campo in CAMPOS_BUSQUEDA:
+        valor = (campos.get(campo) or '').strip()
+        if valor:
+            queryset = queryset.filter(**{f'{campo}__icontains': valor})
+    return queryset
+
+
+def filtros_desde_request(params):
+    """Extrae los filtros soportados de request.GET."""
+    filtros = {'q': params.get('q', '')}
+    for campo in CAMPOS_BUSQUEDA:
+        filtros[campo] = params.get(campo, '')
+    return filtros
+
+
+def pagina_desde_request(queryset, params):
+    """Filtra, ordena y pagina por cursor según ``params`` (request.GET).
+
+    Devuelve (queryset filtrado, items, siguiente_cursor, filtros, orden).
+    Propaga ``CursorInvalido``.
+    """
+    filtros = filtros_desde_request(params)
+    orden = normalizar_orden(params.get('orden'))
+    queryset = filtrar_alumnos(queryset, **filtros)
+    try:
+        limite = int(params.get('limite', PAGE_SIZE))
+    except ValueError:
+        limite = PAGE_SIZE
+    items, siguiente = paginar_alumnos(queryset, orden, params.get('cursor'), limite)
+    return queryset, items, siguiente, filtros, orden
+
+
+def codificar_cursor(valor, pk):
+    if isinstance(valor, datetime):
+        valor = valor.isoformat()
+    crudo = json.dumps([valor, pk], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, campo):
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valor, pk = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if campo == 'created_at':
+            valor = datetime.fromisoformat(valor)
+        return valor, int(pk)
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise CursorInvalido(str(e)) from e
+
+
+def _valor(item, nombre):
+    if isinstance(item, dict):
+        return item[nombre]
+    return getattr(item, nombre)
+
+
+def paginar_alumnos(queryset, orden=ORDEN_DEFAULT, cursor=None, limite=PAGE_SIZE):
+    """Devuelve (items, siguiente_cursor) para una página del listado.
+
+    El queryset se ordena por (campo, id) en la dirección pedida; el cursor
+    codifica el último par devuelto. ``siguiente_cursor`` es None en la
+    última página. Funciona tanto con instancias como con ``.values()``.
+    """
+    orden = normalizar_orden(orden)
+    limite = max(1, min(int(limite), MAX_PAGE_SIZE))
+    desc = orden.startswith('-')
+    campo = orden.lstrip('-')
+
+    clave = campo
+    if campo in CAMPOS_NULOS:
+        clave = f'_orden_{campo}'
+        queryset = queryset.annotate(**{clave: Coalesce(campo, Value(''))})
+
+    prefijo = '-' if desc else ''
+    queryset = queryset.order_by(f'{prefijo}{clave}', f'{prefijo}id')
+
+    if cursor:
+        valor, pk = decodificar_cursor(cursor, campo)
+        op = 'lt' if desc else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{clave}__{op}': valor}) | Q(**{clave: valor, f'id__{op}': pk})
+        )
+
+    items = list(queryset[:limite + 1])
+    siguiente = None
+    if len(items) > limite:
+        items = items[:limite]
+        ultimo = items[-1]
+        siguiente = codificar_cursor(_valor(ultimo, clave), _valor(ultimo, 'id'))
+    return items, siguiente
@@ -0,0 +1,70 @@
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from core.pdf import Plantilla, escribir_paginas, renderizar, renderizar_lote
+
+# Incrementar al cambiar el diseño de la ficha: invalida la cache de PDFs
+FICHA_VERSION = 2
+
+X = 50
+ETIQUETAS = (
+    ('nombre', "Nombre: ", 770),
+    ('apellido', "Apellido: ", 750),
+    ('email', "Email: ", 730),
+    ('documento', "Documento: ", 710),
+    ('fecha_nacimiento', "Fecha Nacimiento: ", 690),
+    ('creado_por', "Creado por: ", 670),
+)
+# Posición de cada valor: justo después de su etiqueta (calculada una vez)
+POSICIONES = tuple((campo, X + stringWidth(etiqueta, "Helvetica", 12), y) for campo, etiqueta, y in ETIQUETAS)
+
+
+def datos_ficha(alumno, usuario):
+    """Valores que se dibujan en la ficha (también son la base de su clave de cache)."""
+    return {
+        'nombre': alumno.nombre,
+        'apellido': alumno.apellido,
+        'email': str(getattr(alumno, "email", "---")),
+        'documento': alumno.documento or 'No especificado',
+        'fecha_nacimiento': str(alumno.fecha_nacimiento or 'No especificada'),
+        'creado_por': usuario.username,
+    }
+
+
+def _fondo_ficha(p):
+    texto = p.beginText(X, 800)
+    texto.setFont("Helvetica-Bold", 14)
+    texto.textOut("Ficha del Alumno")
+    texto.setFont("Helvetica", 12)
+    for _, etiqueta, y in ETIQUETAS:
+        texto.setTextOrigin(X, y)
+        texto.textOut(etiqueta)
+    p.drawText(texto)
+
+
+def _contenido_ficha(p, datos, salto):
+    # Un solo objeto de texto para todos los valores
+    texto = p.beginText()
+    texto.setFont("Helvetica", 12)
+    for campo, x, y in POSICIONES:
+        texto.setTextOrigin(x, y)
+        texto.textOut(datos[campo])
+    p.drawText(texto)
+
+
+FICHA = Plantilla('ficha_alumno', A4, _contenido_ficha, fondo=_fondo_ficha)
+
+
+def generar_ficha_pdf(alumno, usuario):
+    """Genera en memoria el PDF con la ficha del alumno y devuelve los bytes."""
+    return renderizar(FICHA, datos_ficha(alumno, usuario))
+
+
+def generar_fichas_pdf(alumnos, usuario, en_paralelo=None):
+    """Un PDF por alumno, en el mismo orden (en paralelo si el lote es grande)."""
+    return renderizar_lote(FICHA, [datos_ficha(a, usuario) for a in alumnos], en_paralelo=en_paralelo)
+
+
+def escribir_fichas_pdf(destino, alumnos, usuario):
+    """Escribe en `destino` (archivo o buffer) un único PDF con una página por alumno."""
+    escribir_paginas(destino, FICHA, (datos_ficha(a, usuario) for a in alumnos))
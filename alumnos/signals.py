@@ -0,0 +1,55 @@
+# alumnos/signals.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import busqueda, duplicados, metricas
+from .cache_pdf import invalidar
+from .models import Alumno
+
+_en_lote = ContextVar('alumnos_senales_en_lote', default=False)
+
+
+@contextmanager
+def en_lote():
+    """Desactiva estos receivers: quien guarda o borra en lote aplica lo mismo después, una vez."""
+    token = _en_lote.set(True)
+    try:
+        yield
+    finally:
+        _en_lote.reset(token)
+
+
+@receiver(post_save, sender=Alumno, dispatch_uid='alumno_invalidar_pdf_save')
+@receiver(post_delete, sender=Alumno, dispatch_uid='alumno_invalidar_pdf_delete')
+def invalidar_ficha_pdf(sender, instance, created=False, **kwargs):
+    if not created and not _en_lote.get():
+        invalidar(instance.pk)
+
+
+@receiver(post_save, sender=Alumno, dispatch_uid='alumno_invalidar_metricas_save')
+@receiver(post_delete, sender=Alumno, dispatch_uid='alumno_invalidar_metricas_delete')
+def invalidar_metricas_dashboard(sender, instance, **kwargs):
+    if not _en_lote.get():
+        metricas.invalidar(instance.usuario_id)
+
+
+@receiver(post_save, sender=Alumno, dispatch_uid='alumno_indexar_busqueda')
+def indexar_busqueda(sender, instance, **kwargs):
+    if not _en_lote.get():
+        busqueda.indexar([instance])
+
+
+@receiver(post_delete, sender=Alumno, dispatch_uid='alumno_desindexar_busqueda')
+def desindexar_busqueda(sender, instance, **kwargs):
+    if not _en_lote.get():
+        busqueda.desindexar(instance.pk)
+
+
+@receiver(post_save, sender=Alumno, dispatch_uid='alumno_claves_duplicado')
+def actualizar_claves_duplicado(sender, instance, created=False, **kwargs):
+    # Al borrar, las claves caen en cascada
+    if not _en_lote.get():
+        duplicados.indexar([instance], nuevos=created)
@@ -1,3 +1,466 @@
-from django.test import TestCase
+import io
+import json
+import tempfile
+from datetime import date
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import envios
+from core.models import TrabajoEnvio
+
+from . import busqueda, lotes
+from .importacion import ImportacionError, importar_alumnos, leer_filas
+from .models import Alumno, ClaveDuplicado
+from .pagination import CursorInvalido, codificar_cursor, filtrar_alumnos, paginar_alumnos
+
+
+class PaginacionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('ana', password='x')
+        # Documentos y emails nulos, vacíos y repetidos para ejercitar Coalesce y el desempate por id
+        datos = [
+            ('Ana', 'Zeta', None, 'b@example.com'),
+            ('Beto', 'Alfa', '30', None),
+            ('Caro', 'Alfa', '', ''),
+            ('Dani', 'Beta', '10', 'a@example.com'),
+            ('Eva', 'Beta', None, None),
+            ('Fede', 'Gama', '30', 'a@example.com'),
+            ('Gabi', 'Alfa', '20', ''),
+        ]
+        cls.alumnos = [
+            Alumno.objects.create(usuario=cls.usuario, nombre=n, apellido=a, documento=d, email=e)
+            for n, a, d, e in datos
+        ]
+        Alumno.objects.create(usuario=User.objects.create_user('beto', password='x'), nombre='Otro', apellido='Alfa')
+
+    def _recorrer(self, orden, limite):
+        queryset = Alumno.objects.filter(usuario=self.usuario)
+        ids, cursor = [], None
+        while True:
+            items, cursor = paginar_alumnos(queryset, orden, cursor, limite)
+            self.assertLessEqual(len(items), limite)
+            ids.extend(a.pk for a in items)
+            if cursor is None:
+                return ids
+
+    def _esperado(self, campo, desc=False):
+        return [a.pk for a in sorted(
+            self.alumnos, key=lambda a: (getattr(a, campo) or '', a.pk), reverse=desc,
+        )]
+
+    def test_cursor_recorre_todo_sin_repetir(self):
+        for orden in ('apellido', '-apellido', 'nombre', '-created_at'):
+            with self.subTest(orden=orden):
+                ids = self._recorrer(orden, 2)
+                self.assertEqual(len(ids), len(set(ids)))
+                self.assertEqual(set(ids), {a.pk for a in self.alumnos})
+
+    def test_orden_con_desempate_por_id(self):
+        self.assertEqual(self._recorrer('apellido', 2), self._esperado('apellido'))
+        self.assertEqual(self._recorrer('-apellido', 3), self._esperado('apellido', desc=True))
+
+    def test_campos_nulos_se_ordenan_como_vacios(self):
+        for campo in ('documento', 'email'):
+            for desc in (False, True):
+                with self.subTest(campo=campo, desc=desc):
+                    orden = f"{'-' if desc else ''}{campo}"
+                    self.assertEqual(self._recorrer(orden, 2), self._esperado(campo, desc))
+
+    def test_orden_invalido_usa_el_default(self):
+        self.assertEqual(self._recorrer('password', 3), self._recorrer('-created_at', 3))
+
+    def test_cursor_adulterado(self):
+        queryset = Alumno.objects.filter(usuario=self.usuario)
+        for cursor in ('no-es-base64!', codificar_cursor('Alfa', 'x')[:-2], 'W10', codificar_cursor('Alfa', 'x')):
+            with self.subTest(cursor=cursor), self.assertRaises(CursorInvalido):
+                paginar_alumnos(queryset, 'apellido', cursor)
+
+    def test_vistas_con_cursor_adulterado(self):
+        self.client.force_login(self.usuario)
+        respuesta = self.client.get(reverse('alumnos:gestion_alumnos_json'), {'cursor': 'basura'})
+        self.assertEqual(respuesta.status_code, 400)
+        respuesta = self.client.get(reverse('alumnos:gestion_alumnos'), {'cursor': 'basura'})
+        self.assertRedirects(respuesta, reverse('alumnos:gestion_alumnos'), fetch_redirect_response=False)
+
+    def test_json_pagina_con_values(self):
+        self.client.force_login(self.usuario)
+        url = reverse('alumnos:gestion_alumnos_json')
+        ids, params = [], {'orden': 'documento', 'limite': 3}
+        while True:
+            datos = self.client.get(url, params).json()
+            ids.extend(r['id'] for r in datos['resultados'])
+            if not datos['siguiente_cursor']:
+                break
+            params['cursor'] = datos['siguiente_cursor']
+        self.assertEqual(ids, self._esperado('documento'))
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class EnvioFichaTests(TestCase):
+
+    def test_alumno_borrado_falla_sin_reintentos(self):
+        usuario = User.objects.create_user('ana', password='x')
+        alumno = Alumno.objects.create(usuario=usuario, nombre='Ana', apellido='Zeta')
+        envios.encolar('ficha_alumno', {
+            'alumno_id': alumno.pk, 'usuario_id': usuario.pk, 'destinatarios': ['a@example.com'],
+        })
+        alumno.delete()
+        with self.assertLogs('core.envios', 'ERROR'):
+            self.assertEqual(envios.procesar_lote(envios.reclamar_trabajos()), 0)
+        trabajo = TrabajoEnvio.objects.get()
+        self.assertEqual((trabajo.estado, trabajo.intentos), (TrabajoEnvio.FALLIDO, 1))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_pdf_combinado_renueva_el_bloqueo(self):
+        usuario = User.objects.create_user('ana', password='x')
+        for i in range(5):
+            Alumno.objects.create(usuario=usuario, nombre=f'N{i}', apellido='Zeta')
+        envios.encolar('fichas_combinado', {'usuario_id': usuario.pk, 'filtros': {}}, usuario=usuario)
+        [trabajo] = envios.reclamar_trabajos()
+        with tempfile.TemporaryDirectory() as directorio, \
+                mock.patch.object(lotes, 'COMBINADOS_DIR', Path(directorio)), \
+                mock.patch.object(lotes, 'CHUNK_ITERATOR', 2), \
+                mock.patch('alumnos.envios.renovar_bloqueo') as renovar:
+            self.assertTrue(envios.procesar_trabajo(trabajo))
+            self.assertTrue(lotes.ruta_pdf_combinado(trabajo.token).read_bytes().startswith(b'%PDF'))
+        self.assertEqual(renovar.call_count, 2)
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, TrabajoEnvio.ENVIADO)
+        self.assertTrue(trabajo.payload['descarga'])
+
+
+class ImportacionTests(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('ana', password='x')
+
+    def _filas(self, contenido, formato='csv'):
+        return list(leer_filas(io.BytesIO(contenido), formato=formato))
+
+    def _importar(self, contenido, formato='csv', **opciones):
+        return importar_alumnos(io.BytesIO(contenido), self.usuario, formato=formato, **opciones)
+
+    def test_csv_utf8_con_bom_y_punto_y_coma(self):
+        contenido = '\ufeffNombre;Apellido;DNI;Fecha de nacimiento\nJosé;Núñez;123;2001-02-03\n'.encode('utf-8')
+        self.assertEqual(self._filas(contenido), [
+            (2, {'nombre': 'José', 'apellido': 'Núñez', 'documento': '123', 'fecha_nacimiento': '2001-02-03'}),
+        ])
+
+    def test_csv_de_excel_en_windows(self):
+        contenido = 'nombre,apellido\nJosé,O’Brien\n'.encode('cp1252')
+        self.assertEqual(self._filas(contenido), [(2, {'nombre': 'José', 'apellido': 'O’Brien'})])
+
+    def test_csv_latin1_como_ultimo_recurso(self):
+        # 0x81 no existe en cp1252
+        self.assertEqual(self._filas(b'nombre,apellido\nJos\xe9,A\x81\n'), [(2, {'nombre': 'José', 'apellido': 'A\x81'})])
+
+    def test_csv_con_bytes_nulos_no_importa_nada(self):
+        with self.assertRaises(ImportacionError):
+            self._importar(b'nombre,apellido\nAna,Zeta\nBe\x00to,Alfa\n', tamano_lote=1)
+        self.assertFalse(Alumno.objects.exists())
+
+    def test_encabezados_invalidos(self):
+        with self.assertRaisesMessage(ImportacionError, 'apellido'):
+            self._filas(b'nombre,email\nAna,a@example.com\n')
+        with self.assertRaisesMessage(ImportacionError, 'vacío'):
+            self._filas(b'')
+        with self.assertRaises(ImportacionError):
+            self._filas(b'x', formato='ods')
+
+    def test_filas_con_error_no_detienen_la_importacion(self):
+        resultado = self._importar(
+            b'nombre,apellido,email,fecha_nacimiento\n'
+            b'Ana,Zeta,a@example.com,2001-02-03\n'
+            b',Alfa,,\n'
+            b'Beto,Alfa,no-es-email,\n'
+            b'\n'
+            b'Caro,Beta,,\n'
+        )
+        self.assertEqual((resultado.procesadas, resultado.importadas), (4, 2))
+        self.assertEqual([(fila, sorted(errores)) for fila, errores in resultado.errores], [(3, ['nombre']), (4, ['email'])])
+        self.assertEqual(
+            set(Alumno.objects.values_list('nombre', 'fecha_nacimiento')),
+            {('Ana', date(2001, 2, 3)), ('Caro', None)},
+        )
+        reporte = io.StringIO()
+        resultado.escribir_reporte(reporte)
+        self.assertIn('4,email,', reporte.getvalue())
+
+    def test_documentos_repetidos(self):
+        Alumno.objects.create(usuario=self.usuario, nombre='Ya', apellido='Estaba', documento='1')
+        Alumno.objects.create(usuario=User.objects.create_user('beto'), nombre='Otro', apellido='Usuario', documento='2')
+        resultado = self._importar(b'nombre,apellido,documento\nA,Uno,1\nB,Dos,2\nC,Tres,2\nD,Cuatro,\nE,Cinco,\n')
+        self.assertEqual((resultado.importadas, resultado.duplicadas), (3, 2))
+        self.assertEqual([fila for fila, _ in resultado.errores], [2, 4])
+        self.assertEqual(Alumno.objects.filter(usuario=self.usuario, documento='2').count(), 1)
+
+    def test_xlsx(self):
+        from openpyxl import Workbook
+
+        libro = Workbook()
+        hoja = libro.active
+        hoja.append(['Nombre', 'Apellido', 'Documento', 'Fecha de nacimiento'])
+        hoja.append(['Ana', 'Zeta', 30123456.0, date(2001, 2, 3)])
+        hoja.append([None, None, None, None])
+        hoja.append(['Beto', 'Alfa', None, None])
+        archivo = io.BytesIO()
+        libro.save(archivo)
+
+        resultado = self._importar(archivo.getvalue(), formato='xlsx')
+        self.assertEqual((resultado.procesadas, resultado.importadas, resultado.con_error), (2, 2, 0))
+        ana = Alumno.objects.get(nombre='Ana')
+        self.assertEqual((ana.documento, ana.fecha_nacimiento), ('30123456', date(2001, 2, 3)))
+
+    def test_xlsx_danado(self):
+        for contenido in (b'no es un zip', self._zip_vacio()):
+            with self.subTest(contenido=contenido[:10]), self.assertRaises(ImportacionError):
+                self._importar(contenido, formato='xlsx')
+
+    def _zip_vacio(self):
+        import zipfile
+
+        archivo = io.BytesIO()
+        with zipfile.ZipFile(archivo, 'w') as zip_:
+            zip_.writestr('otro.txt', 'x')
+        return archivo.getvalue()
+
+    def test_lotes_indexan_busqueda_y_duplicados(self):
+        existente = Alumno.objects.create(usuario=self.usuario, nombre='Mariana', apellido='Gómez', email='m@example.com')
+        avances = []
+        resultado = self._importar(
+            b'nombre,apellido,email\n'
+            b'Pedro,Ramirez,p1@example.com\n'
+            b'Lucia,Fernandez,l@example.com\n'
+            b'Otra,Persona,m@example.com\n'
+            b'Pedro,Ramirez,p2@example.com\n'
+            b'Sofia,Herrera,\n',
+            tamano_lote=2, progreso=lambda r: avances.append(r.importadas),
+        )
+        self.assertEqual(avances, [2, 4, 5])
+        importados = Alumno.objects.exclude(pk=existente.pk)
+        # Índice de búsqueda y claves de duplicados de cada lote
+        self.assertEqual(busqueda.buscar_ids(self.usuario.pk, 'fernandez'), [importados.get(nombre='Lucia').pk])
+        self.assertEqual(
+            set(ClaveDuplicado.objects.values_list('alumno_id', flat=True)),
+            set(Alumno.objects.values_list('pk', flat=True)),
+        )
+        # Contra un alumno ya guardado y contra una fila de un lote anterior
+        posibles = {(fila, otro['id'], motivo) for fila, otro, motivo in resultado.posibles_duplicados}
+        self.assertIn((4, existente.pk, 'email'), posibles)
+        self.assertIn((5, importados.get(email='p1@example.com').pk, 'nombre'), posibles)
+
+
+class DuplicadosTests(TestCase):
+
+    def test_reconstruir_solo_las_claves_del_usuario(self):
+        ana = User.objects.create_user('ana', password='x')
+        beto = User.objects.create_user('beto')
+        Alumno.objects.create(usuario=ana, nombre='Lucía', apellido='Fernández', documento='30111222')
+        Alumno.objects.create(usuario=ana, nombre='Lucia', apellido='Fernandez')
+        Alumno.objects.create(usuario=beto, nombre='Pedro', apellido='Gómez')
+        claves_ajenas = set(ClaveDuplicado.objects.filter(usuario=beto).values_list('pk', 'clave'))
+        self.assertTrue(claves_ajenas)
+        ClaveDuplicado.objects.filter(usuario=ana).delete()
+
+        salida = io.StringIO()
+        call_command('reporte_duplicados', 'ana', '--reconstruir', stdout=salida, stderr=io.StringIO())
+        self.assertIn('1 pares', salida.getvalue())
+        self.assertTrue(ClaveDuplicado.objects.filter(usuario=ana).exists())
+        # Las de otro usuario ni se borran ni se vuelven a crear
+        self.assertEqual(set(ClaveDuplicado.objects.filter(usuario=beto).values_list('pk', 'clave')), claves_ajenas)
+
+
+class BusquedaTests(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('ana', password='x')
+        self.lucia = Alumno.objects.create(usuario=self.usuario, nombre='Lucía', apellido='Fernández', documento='30111222')
+        self.pedro = Alumno.objects.create(usuario=self.usuario, nombre='Pedro', apellido='Gómez', email='pgomez@example.com')
+        self.otro = Alumno.objects.create(
+            usuario=User.objects.create_user('beto'), nombre='Lucía', apellido='Fernández',
+        )
+
+    def buscar(self, consulta):
+        return busqueda.buscar_ids(self.usuario.pk, consulta)
+
+    def test_tabla_creada_por_la_migracion(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sql FROM sqlite_master WHERE name = %s", [busqueda.TABLA])
+            [sql] = cursor.fetchone()
+        self.assertIn('fts5', sql)
+        self.assertIn('trigram', sql)
+
+    def test_subcadena_sin_tildes_ni_mayusculas(self):
+        self.assertEqual(self.buscar('fernandez'), [self.lucia.pk])
+        self.assertEqual(self.buscar('GÓM'), [self.pedro.pk])
+        self.assertEqual(self.buscar('111 lucia'), [self.lucia.pk])
+        self.assertEqual(self.buscar('example.com'), [self.pedro.pk])
+
+    def test_solo_alumnos_del_usuario(self):
+        self.assertNotIn(self.otro.pk, self.buscar('lucia'))
+
+    def test_senales_mantienen_el_indice(self):
+        nuevo = Alumno.objects.create(usuario=self.usuario, nombre='Sofía', apellido='Herrera')
+        self.assertEqual(self.buscar('herrera'), [nuevo.pk])
+        nuevo.apellido = 'Quiroga'
+        nuevo.save()
+        self.assertEqual(self.buscar('quiroga'), [nuevo.pk])
+        self.assertEqual(self.buscar('herrera'), [])
+        nuevo.delete()
+        self.assertEqual(self.buscar('quiroga'), [])
+
+    def test_errores_de_tipeo(self):
+        self.assertEqual(self.buscar('fernadez'), [self.lucia.pk])
+        self.assertEqual(self.buscar('gomes pedro'), [self.pedro.pk])
+        self.assertEqual(self.buscar('zzzqqq'), [])
+
+    def test_consultas_cortas_usan_icontains(self):
+        self.assertIsNone(busqueda.sql_coincidencias('pe'))
+        self.assertIsNone(busqueda.sql_coincidencias('pe gomez'))
+        self.assertEqual(self.buscar('pe'), [])
+        alumnos = Alumno.objects.filter(usuario=self.usuario)
+        self.assertEqual(list(filtrar_alumnos(alumnos, q='pe').values_list('pk', flat=True)), [self.pedro.pk])
+        self.assertEqual(list(filtrar_alumnos(alumnos, q='fernández').values_list('pk', flat=True)), [self.lucia.pk])
+        # Sin tilde sólo la encuentra el índice; icontains no
+        self.assertEqual(list(filtrar_alumnos(alumnos, q='fernandez').values_list('pk', flat=True)), [self.lucia.pk])
+
+    def test_vista_autocompletado(self):
+        self.client.force_login(self.usuario)
+        datos = self.client.get(reverse('alumnos:buscar'), {'q': 'fernadez'}).json()
+        self.assertEqual([r['id'] for r in datos['resultados']], [self.lucia.pk])
+
+
+class ApiTests(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('ana', password='x')
+        self.lucia = Alumno.objects.create(usuario=self.usuario, nombre='Lucía', apellido='Fernández', documento='111')
+        self.pedro = Alumno.objects.create(usuario=self.usuario, nombre='Pedro', apellido='Gómez', documento='222')
+        self.ajeno = Alumno.objects.create(
+            usuario=User.objects.create_user('beto'), nombre='Otro', apellido='Usuario', documento='333',
+        )
+        self.client.force_login(self.usuario)
+
+    def enviar(self, metodo, datos, pk=None, cliente=None, **extra):
+        url = reverse('alumnos:api_alumno', args=[pk]) if pk else reverse('alumnos:api')
+        return getattr(cliente or self.client, metodo)(url, json.dumps(datos), content_type='application/json', **extra)
+
+    def documentos(self):
+        return dict(Alumno.objects.values_list('pk', 'documento'))
+
+    def test_sin_sesion(self):
+        respuesta = Client().get(reverse('alumnos:api'))
+        self.assertEqual(respuesta.status_code, 401)
+        self.assertEqual(respuesta.json()['error'], 'Autenticación requerida.')
+
+    def test_escrituras_requieren_csrf(self):
+        cliente = Client(enforce_csrf_checks=True)
+        cliente.force_login(self.usuario)
+        alta = [{'nombre': 'Sofía', 'apellido': 'Herrera'}]
+        self.assertEqual(cliente.get(reverse('alumnos:api')).status_code, 200)
+        self.assertEqual(self.enviar('post', alta, cliente=cliente).status_code, 403)
+        self.assertFalse(Alumno.objects.filter(apellido='Herrera').exists())
+
+        cliente.cookies['csrftoken'] = token = 'a' * 32
+        self.assertEqual(self.enviar('post', alta, cliente=cliente, HTTP_X_CSRFTOKEN=token).status_code, 201)
+
+    def test_solo_alumnos_del_usuario(self):
+        ids = [a['id'] for a in self.client.get(reverse('alumnos:api')).json()['resultados']]
+        self.assertCountEqual(ids, [self.lucia.pk, self.pedro.pk])
+        self.assertEqual(self.client.get(reverse('alumnos:api_alumno', args=[self.ajeno.pk])).status_code, 404)
+
+        respuesta = self.enviar('patch', {'nombre': 'Cambiado'}, pk=self.ajeno.pk)
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['errores'], {'0': {'id': ['No existe un alumno con ese id.']}})
+        respuesta = self.enviar('delete', [self.pedro.pk, self.ajeno.pk])
+        self.assertEqual(respuesta.status_code, 404)
+        self.assertEqual(respuesta.json()['errores'], {'ids': [self.ajeno.pk]})
+        self.assertEqual(Alumno.objects.count(), 3)
+        self.assertEqual(Alumno.objects.get(pk=self.ajeno.pk).nombre, 'Otro')
+
+    def test_alta_con_documento_repetido(self):
+        respuesta = self.enviar('post', [
+            {'nombre': 'Uno', 'apellido': 'Nuevo', 'documento': '111'},
+            {'nombre': 'Dos', 'apellido': 'Nuevo', 'documento': '444'},
+            {'nombre': 'Tres', 'apellido': 'Nuevo', 'documento': '444'},
+            # El documento de otro usuario no cuenta
+            {'nombre': 'Cuatro', 'apellido': 'Nuevo', 'documento': '333'},
+        ])
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(set(respuesta.json()['errores']), {'0', '2'})
+        self.assertFalse(Alumno.objects.filter(apellido='Nuevo').exists())
+
+        respuesta = self.enviar('post', [
+            {'nombre': 'Dos', 'apellido': 'Nuevo', 'documento': '444'},
+            {'nombre': 'Cuatro', 'apellido': 'Nuevo', 'documento': '333'},
+        ])
+        self.assertEqual(respuesta.status_code, 201)
+        ids = respuesta.json()['ids']
+        self.assertEqual(busqueda.buscar_ids(self.usuario.pk, 'nuevo'), sorted(ids))
+        self.assertTrue(ClaveDuplicado.objects.filter(alumno_id=ids[0]).exists())
+
+    def test_cambio_de_documento(self):
+        respuesta = self.enviar('patch', {'documento': '222'}, pk=self.lucia.pk)
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('documento', respuesta.json()['errores']['0'])
+
+        # Un intercambio en el mismo lote no choca consigo mismo
+        respuesta = self.enviar('patch', [
+            {'id': self.lucia.pk, 'documento': '222'},
+            {'id': self.pedro.pk, 'documento': '111'},
+        ])
+        self.assertEqual(respuesta.status_code, 200)
+        documentos = self.documentos()
+        self.assertEqual((documentos[self.lucia.pk], documentos[self.pedro.pk]), ('222', '111'))
+
+        respuesta = self.enviar('patch', [
+            {'id': self.lucia.pk, 'documento': '555'},
+            {'id': self.pedro.pk, 'documento': '555'},
+        ])
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(set(respuesta.json()['errores']), {'1'})
+        self.assertEqual(self.documentos(), documentos)
+
+    def test_fields_elige_las_columnas(self):
+        resultados = self.client.get(reverse('alumnos:api'), {'fields': 'apellido, nombre'}).json()['resultados']
+        self.assertEqual({tuple(r) for r in resultados}, {('apellido', 'nombre')})
+        datos = self.client.get(reverse('alumnos:api_alumno', args=[self.lucia.pk]), {'fields': 'documento'}).json()
+        self.assertEqual(datos, {'documento': '111'})
+        respuesta = self.client.get(reverse('alumnos:api'), {'fields': 'nombre,usuario'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('usuario', respuesta.json()['error'])
+
+    def test_etag_y_304(self):
+        respuesta = self.client.get(reverse('alumnos:api'))
+        etag = respuesta['ETag']
+        respuesta = self.client.get(reverse('alumnos:api'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta.content, b'')
+
+        self.enviar('patch', {'nombre': 'Lu'}, pk=self.lucia.pk)
+        respuesta = self.client.get(reverse('alumnos:api'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_baja_en_lote_sin_senales(self):
+        with mock.patch('alumnos.signals.invalidar') as desde_senal, \
+                mock.patch('alumnos.cache_pdf.invalidar') as desde_api, \
+                mock.patch('alumnos.signals.busqueda.desindexar', wraps=busqueda.desindexar) as desindexar:
+            respuesta = self.enviar('delete', [self.lucia.pk, self.pedro.pk])
+        self.assertEqual(respuesta.json(), {'eliminados': 2})
+        desde_senal.assert_not_called()
+        self.assertCountEqual([c.args[0] for c in desde_api.call_args_list], [self.lucia.pk, self.pedro.pk])
+        # Una sola llamada para el lote, no una por alumno desde post_delete
+        desindexar.assert_called_once()
+        self.assertEqual(busqueda.buscar_ids(self.usuario.pk, 'fernandez'), [])
+        self.assertFalse(ClaveDuplicado.objects.filter(usuario=self.usuario).exists())
+        self.assertEqual(list(Alumno.objects.values_list('pk', flat=True)), [self.ajeno.pk])
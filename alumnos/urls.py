@@ -1,13 +1,24 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'alumnos'
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('crear/', views.crear_alumno, name='crear'),
+    path('importar/', views.importar_alumnos, name='importar'),
     path('<int:pk>/editar/', views.editar_alumno, name='editar'),
     path('<int:pk>/eliminar/', views.eliminar_alumno, name='eliminar'),
-    path('enviar_pdf/<int:alumno_id>/', views.enviar_pdf, name='enviar_pdf'),
+    path('enviar_pdf/<int:alumno_id>/', views.enviar_pdf_async if settings.VISTAS_ASYNC else views.enviar_pdf, name='enviar_pdf'),
+    path('<int:alumno_id>/pdf/', views.descargar_pdf_async if settings.VISTAS_ASYNC else views.descargar_pdf, name='descargar_pdf'),
     path('gestion/', views.gestion_alumnos, name='gestion_alumnos'),
+    path('gestion/json/', views.gestion_alumnos_json, name='gestion_alumnos_json'),
+    path('buscar/', views.buscar_alumnos_json, name='buscar'),
+    path('exportar/', views.exportar_alumnos, name='exportar'),
+    path('fichas/enviar/', views.enviar_fichas, name='enviar_fichas'),
+    path('fichas/descargar/', views.descargar_fichas, name='descargar_fichas'),
+    path('fichas/descargar/<uuid:token>/', views.descargar_fichas_combinado, name='descargar_fichas_combinado'),
+    path('api/', api.alumnos, name='api'),
+    path('api/<int:pk>/', api.alumno, name='api_alumno'),
 ]
\ No newline at end of file
@@ -1,53 +1,171 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.urls import reverse
 from .models import Alumno
-from .forms import AlumnoForm
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from django.core.mail import EmailMessage, BadHeaderError
-from io import BytesIO
+from .forms import AlumnoForm, ImportarAlumnosForm
+from .pagination import (
+    CursorInvalido, filtrar_alumnos, filtros_desde_request, normalizar_orden, pagina_desde_request,
+)
+from core.db import para_reportes
+from core.envios import encolar
+from core.models import TrabajoEnvio
+from core.limites import limitar_tasa
+from .cache_pdf import clave_ficha, ficha_pdf_cacheada
+from . import busqueda, duplicados
+from .exportacion import FORMATOS, exportar_stream
+from .filas import filas_html, urls_fila
+from .importacion import ImportacionError, importar_alumnos as importar_archivo
+from .metricas import metricas_dashboard
+from .lotes import LIMITE_PDF_DIRECTO, pdf_fichas_combinado, ruta_pdf_combinado, zip_fichas_stream
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
 @login_required
 def dashboard(request):
     """Dashboard principal con métricas"""
-    alumnos = Alumno.objects.filter(usuario=request.user)
-    total_alumnos = alumnos.count()
-    alumnos_recientes = alumnos.order_by('-created_at')[:5]
-    
-    # Si necesitas otros cálculos, puedes agregarlos aquí
-    alumnos_activos = total_alumnos  # Por ahora, todos están activos
-    pendientes = 0  # Puedes modificar esto según tu lógica
-    
-    return render(request, 'alumnos/dashboard.html', {
-        'total_alumnos': total_alumnos,
-        'alumnos_activos': alumnos_activos,
-        'pendientes': pendientes,
-        'alumnos_recientes': alumnos_recientes,
-    })
+    contexto = metricas_dashboard(request.user)
+    for alumno in contexto['alumnos_recientes']:
+        alumno['urls'] = urls_fila(alumno['id'])
+    return render(request, 'alumnos/dashboard.html', contexto)
+
+def _token_envio(valor):
+    try:
+        return uuid.UUID(valor) if valor else None
+    except ValueError:
+        return None
 
 @login_required
 def gestion_alumnos(request):
-    """Lista completa de alumnos"""
-    alumnos = Alumno.objects.filter(usuario=request.user)
-    return render(request, 'alumnos/gestion_alumnos.html', {'alumnos': alumnos})
+    """Lista de alumnos paginada por cursor, con filtros y orden en la base"""
+    base = Alumno.objects.filter(usuario=request.user)
+    try:
+        queryset, alumnos, siguiente, filtros, orden = pagina_desde_request(base, request.GET)
+    except CursorInvalido:
+        return redirect('alumnos:gestion_alumnos')
+    return render(request, 'alumnos/gestion_alumnos.html', {
+        'alumnos': alumnos,
+        'filas': filas_html(alumnos),
+        'total': queryset.count(),
+        'siguiente_cursor': siguiente,
+        'filtros': filtros,
+        'orden': orden,
+        'envio_token': _token_envio(request.GET.get('envio')),
+    })
+
+@login_required
+def gestion_alumnos_json(request):
+    """Página siguiente del listado en JSON (scroll infinito de gestion_alumnos)"""
+    base = Alumno.objects.filter(usuario=request.user).values(
+        'id', 'nombre', 'apellido', 'documento', 'email', 'created_at',
+    )
+    try:
+        _, alumnos, siguiente, _, _ = pagina_desde_request(base, request.GET)
+    except CursorInvalido:
+        return JsonResponse({'error': 'Cursor inválido.'}, status=400)
+
+    resultados = []
+    for a in alumnos:
+        urls = urls_fila(a['id'])
+        resultados.append({
+            'id': a['id'],
+            'nombre': a['nombre'],
+            'apellido': a['apellido'],
+            'documento': a['documento'] or '',
+            'email': a['email'] or '',
+            'created_at': a['created_at'].isoformat(),
+            'editar_url': urls['editar'],
+            'enviar_pdf_url': urls['enviar_pdf'],
+            'descargar_pdf_url': urls['descargar_pdf'],
+            'eliminar_url': urls['eliminar'],
+        })
+    return JsonResponse({'resultados': resultados, 'siguiente_cursor': siguiente})
+
+@login_required
+def buscar_alumnos_json(request):
+    """Autocompletado: mejores coincidencias (con tolerancia a errores de tipeo) en JSON"""
+    # buscar_ids ya filtra por usuario; filtrar otra vez por usuario_id haría
+    # que SQLite eligiera el índice de usuario y recorriera todos sus alumnos
+    ids = busqueda.buscar_ids(request.user.pk, request.GET.get('q', ''))
+    alumnos = {
+        a['id']: a
+        for a in Alumno.objects.filter(pk__in=ids).values(
+            'id', 'nombre', 'apellido', 'documento', 'email', 'usuario_id',
+        )
+    }
+    resultados = []
+    for pk in ids:
+        a = alumnos.get(pk)
+        if a is None or a['usuario_id'] != request.user.pk:
+            continue
+        resultados.append({
+            'id': a['id'],
+            'nombre': a['nombre'],
+            'apellido': a['apellido'],
+            'documento': a['documento'] or '',
+            'email': a['email'] or '',
+            'editar_url': urls_fila(a['id'])['editar'],
+        })
+    return JsonResponse({'resultados': resultados})
 
 @login_required
 def crear_alumno(request):
+    posibles = []
     if request.method == 'POST':
         form = AlumnoForm(request.POST)
         if form.is_valid():
             alumno = form.save(commit=False)
             alumno.usuario = request.user
-            alumno.save()
-            messages.success(request, 'Alumno creado correctamente.')
-            return redirect('alumnos:dashboard')
+            # Si se parece a un alumno existente se avisa antes de guardar; el
+            # formulario vuelve con confirmar_duplicado para crearlo igual
+            if not request.POST.get('confirmar_duplicado'):
+                posibles = [
+                    {'alumno': otro, 'motivo': duplicados.MOTIVOS[motivo], 'editar_url': urls_fila(otro['id'])['editar']}
+                    for otro, motivo in duplicados.posibles_duplicados([alumno], request.user.pk)[0]
+                ]
+            if not posibles:
+                alumno.save()
+                messages.success(request, 'Alumno creado correctamente.')
+                return redirect('alumnos:dashboard')
     else:
         form = AlumnoForm()
-    return render(request, 'alumnos/alumno_form.html', {'form': form, 'crear': True})
+    return render(request, 'alumnos/alumno_form.html', {'form': form, 'crear': True, 'posibles_duplicados': posibles})
+
+# Errores (y posibles duplicados) que se muestran en pantalla; el reporte completo sale del comando importar_alumnos
+ERRORES_VISIBLES = 200
+
+@login_required
+def importar_alumnos(request):
+    """Alta masiva desde un CSV o XLSX subido."""
+    resultado = None
+    if request.method == 'POST':
+        form = ImportarAlumnosForm(request.POST, request.FILES)
+        if form.is_valid():
+            archivo = form.cleaned_data['archivo']
+            try:
+                resultado = importar_archivo(archivo, request.user, nombre=archivo.name)
+            except ImportacionError as e:
+                form.add_error('archivo', str(e))
+            else:
+                messages.success(request, f'Se importaron {resultado.importadas} de {resultado.procesadas} alumnos.')
+                if not resultado.con_error and not resultado.posibles_duplicados:
+                    return redirect('alumnos:gestion_alumnos')
+    else:
+        form = ImportarAlumnosForm()
+    return render(request, 'alumnos/importar_alumnos.html', {
+        'form': form,
+        'resultado': resultado,
+        'errores': resultado.errores[:ERRORES_VISIBLES] if resultado else [],
+        'posibles_duplicados': [
+            (fila, otro, duplicados.MOTIVOS[motivo])
+            for fila, otro, motivo in resultado.posibles_duplicados[:ERRORES_VISIBLES]
+        ] if resultado else [],
+    })
 
 @login_required
 def editar_alumno(request, pk):
@@ -71,67 +189,170 @@ def eliminar_alumno(request, pk):
         return redirect('alumnos:gestion_alumnos')
     return render(request, 'alumnos/alumno_confirm_delete.html', {'alumno': alumno})
 
+def _etag_ficha(clave):
+    # Débil: una ficha regenerada es equivalente aunque ReportLab cambie la fecha interna
+    return f'W/"{clave}"'
+
+def _no_modificado(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    return bool(if_none_match) and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match))
+
+def _respuesta_ficha(alumno, etag, pdf_bytes=None):
+    if pdf_bytes is None:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(pdf_bytes, content_type='application/pdf')
+        response['Content-Disposition'] = f'inline; filename="ficha_{alumno.pk}.pdf"'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
 @login_required
-def enviar_pdf(request, alumno_id):
+def descargar_pdf(request, alumno_id):
+    """Ficha en PDF servida desde la cache, con ETag y respuesta 304."""
     alumno = get_object_or_404(Alumno, id=alumno_id, usuario=request.user)
+    clave = clave_ficha(alumno, request.user)
+    etag = _etag_ficha(clave)
+    if _no_modificado(request, etag):
+        return _respuesta_ficha(alumno, etag)
+    return _respuesta_ficha(alumno, etag, ficha_pdf_cacheada(alumno, request.user, clave))
+
+@login_required
+async def descargar_pdf_async(request, alumno_id):
+    """Versión ASGI de descargar_pdf: ReportLab corre en el pool de hilos, no en el event loop."""
+    user = await request.auser()
+    alumno = await aget_object_or_404(Alumno, id=alumno_id, usuario=user)
+    clave = clave_ficha(alumno, user)
+    etag = _etag_ficha(clave)
+    if _no_modificado(request, etag):
+        return _respuesta_ficha(alumno, etag)
+    pdf_bytes = await sync_to_async(ficha_pdf_cacheada, thread_sensitive=False)(alumno, user, clave)
+    return _respuesta_ficha(alumno, etag, pdf_bytes)
 
-    # Generar PDF en memoria
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-
-    p.setFont("Helvetica-Bold", 14)
-    p.drawString(50, 800, "Ficha del Alumno")
-    p.setFont("Helvetica", 12)
-    p.drawString(50, 770, f"Nombre: {alumno.nombre}")
-    p.drawString(50, 750, f"Apellido: {alumno.apellido}")
-    email_text = getattr(alumno, "email", "---")
-    p.drawString(50, 730, f"Email: {email_text}")
-    p.drawString(50, 710, f"Documento: {alumno.documento or 'No especificado'}")
-    p.drawString(50, 690, f"Fecha Nacimiento: {alumno.fecha_nacimiento or 'No especificada'}")
-    p.drawString(50, 670, f"Creado por: {request.user.username}")
-
-    p.showPage()
-    p.save()
-
-    buffer.seek(0)
-    pdf_bytes = buffer.getvalue()
-    buffer.close()
-
-    # Preparar correo
-    subject = f"Ficha del Alumno - {alumno.nombre} {alumno.apellido}"
-    body = f"Adjunto PDF con la ficha del alumno {alumno.nombre} {alumno.apellido}."
-    from_email = None
-    
+def _destinatarios_ficha(alumno, user):
     destinatarios = []
-    if email_text and email_text != '---':
-        destinatarios.append(email_text)
-    if request.user.email and request.user.email not in destinatarios:
-        destinatarios.append(request.user.email)
+    if alumno.email:
+        destinatarios.append(alumno.email)
+    if user.email and user.email not in destinatarios:
+        destinatarios.append(user.email)
+    return destinatarios
+
+def _datos_envio_ficha(alumno, user, destinatarios):
+    return {'alumno_id': alumno.id, 'usuario_id': user.id, 'destinatarios': destinatarios}
+
+# Cada ficha es un PDF y un email para el worker
+LIMITE_ENVIAR_PDF = dict(capacidad=10, por_minuto=10)
+
+@login_required
+@limitar_tasa('enviar_pdf', **LIMITE_ENVIAR_PDF)
+def enviar_pdf(request, alumno_id):
+    alumno = get_object_or_404(Alumno, id=alumno_id, usuario=request.user)
+
+    destinatarios = _destinatarios_ficha(alumno, request.user)
+    if not destinatarios:
+        messages.error(request, "No hay destinatarios válidos para enviar el PDF (sin email asociado).")
+        return redirect("alumnos:gestion_alumnos")
+
+    # El PDF se genera y se envía en el worker (manage.py procesar_envios)
+    trabajo = encolar('ficha_alumno', _datos_envio_ficha(alumno, request.user, destinatarios), usuario=request.user)
+
+    messages.success(request, f"PDF en cola de envío a: {', '.join(destinatarios)}")
+    return redirect(f"{reverse('alumnos:gestion_alumnos')}?envio={trabajo.token}")
 
+@login_required
+@limitar_tasa('enviar_pdf', **LIMITE_ENVIAR_PDF)
+async def enviar_pdf_async(request, alumno_id):
+    """Versión ASGI de enviar_pdf."""
+    user = await request.auser()
+    alumno = await aget_object_or_404(Alumno, id=alumno_id, usuario=user)
+
+    destinatarios = _destinatarios_ficha(alumno, user)
     if not destinatarios:
         messages.error(request, "No hay destinatarios válidos para enviar el PDF (sin email asociado).")
         return redirect("alumnos:gestion_alumnos")
 
-    email = EmailMessage(
-        subject=subject,
-        body=body,
-        from_email=from_email,
-        to=destinatarios,
+    trabajo = await sync_to_async(encolar)('ficha_alumno', _datos_envio_ficha(alumno, user, destinatarios), usuario=user)
+
+    messages.success(request, f"PDF en cola de envío a: {', '.join(destinatarios)}")
+    return redirect(f"{reverse('alumnos:gestion_alumnos')}?envio={trabajo.token}")
+
+@login_required
+def enviar_fichas(request):
+    """Encola el envío de la ficha a cada alumno del listado filtrado (una sola conexión SMTP)."""
+    if request.method != 'POST':
+        return redirect('alumnos:gestion_alumnos')
+
+    filtros = filtros_desde_request(request.POST)
+    alumnos = filtrar_alumnos(Alumno.objects.filter(usuario=request.user), **filtros)
+    con_email = alumnos.exclude(email__isnull=True).exclude(email='').count()
+    if not con_email:
+        messages.error(request, "Ninguno de los alumnos seleccionados tiene email.")
+        return redirect('alumnos:gestion_alumnos')
+
+    trabajo = encolar('fichas_lote', {'usuario_id': request.user.id, 'filtros': filtros}, usuario=request.user)
+    messages.success(request, f"Envío de {con_email} ficha{'s' if con_email != 1 else ''} en cola.")
+    return redirect(f"{reverse('alumnos:gestion_alumnos')}?envio={trabajo.token}")
+
+@login_required
+def descargar_fichas(request):
+    """Descarga las fichas del listado filtrado como un PDF combinado o un ZIP.
+
+    Pasado ``LIMITE_PDF_DIRECTO`` alumnos el PDF combinado se encola y se baja
+    después desde ``descargar_fichas_combinado``.
+    """
+    filtros = filtros_desde_request(request.GET)
+    alumnos = filtrar_alumnos(Alumno.objects.filter(usuario=request.user), **filtros).order_by('apellido', 'nombre', 'id')
+
+    if request.GET.get('formato') == 'zip':
+        response = StreamingHttpResponse(zip_fichas_stream(alumnos, request.user), content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="fichas.zip"'
+        return response
+
+    total = alumnos.count()
+    if total > LIMITE_PDF_DIRECTO:
+        # El canvas guarda todas las páginas hasta el final: los listados grandes los arma el worker
+        trabajo = encolar('fichas_combinado', {'usuario_id': request.user.id, 'filtros': filtros}, usuario=request.user)
+        messages.info(request, f"El PDF con {total} fichas se está generando; el enlace de descarga aparece abajo al terminar.")
+        return redirect(f"{reverse('alumnos:gestion_alumnos')}?envio={trabajo.token}")
+
+    return FileResponse(
+        pdf_fichas_combinado(alumnos, request.user),
+        as_attachment=True,
+        filename='fichas.pdf',
+        content_type='application/pdf',
     )
-    email.attach("alumno.pdf", pdf_bytes, "application/pdf")
 
+@login_required
+def descargar_fichas_combinado(request, token):
+    """Descarga el PDF combinado que generó el worker de la cola."""
+    trabajo = get_object_or_404(
+        TrabajoEnvio, token=token, tipo='fichas_combinado', usuario=request.user, estado=TrabajoEnvio.ENVIADO,
+    )
     try:
-        email.send(fail_silently=False)
-    except BadHeaderError as e:
-        logger.exception("BadHeaderError al enviar PDF: %s", e)
-        messages.error(request, "Error enviando email: header inválido.")
-        return redirect("alumnos:gestion_alumnos")
-    except Exception as e:
-        logger.exception("Error al enviar email con PDF: %s", e)
-        messages.error(request, "Ocurrió un error al intentar enviar el email. Revisá la configuración SMTP.")
-        messages.info(request, f"Detalle técnico: {str(e)}")
-        return redirect("alumnos:gestion_alumnos")
+        archivo = open(ruta_pdf_combinado(trabajo.token), 'rb')
+    except FileNotFoundError:
+        messages.error(request, "El PDF combinado ya no está disponible; volvé a generarlo.")
+        return redirect('alumnos:gestion_alumnos')
+    return FileResponse(archivo, as_attachment=True, filename='fichas.pdf', content_type='application/pdf')
 
-    messages.success(request, f"PDF enviado a: {', '.join(destinatarios)}")
-    return redirect("alumnos:gestion_alumnos")
+@login_required
+def exportar_alumnos(request):
+    """Exporta el listado filtrado en CSV o NDJSON (?formato=), en streaming y opcionalmente con ?gzip=1."""
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS:
+        formato = 'csv'
+    comprimir = request.GET.get('gzip') in ('1', 'true', 'si')
+
+    filtros = filtros_desde_request(request.GET)
+    orden = normalizar_orden(request.GET.get('orden'))
+    alumnos = filtrar_alumnos(para_reportes(Alumno.objects.filter(usuario=request.user)), **filtros).order_by(
+        orden, '-id' if orden.startswith('-') else 'id'
+    )
 
+    content_type, extension = FORMATOS[formato]
+    nombre = f'alumnos.{extension}'
+    if comprimir:
+        content_type, nombre = 'application/gzip', f'{nombre}.gz'
+    response = StreamingHttpResponse(exportar_stream(alumnos, formato, comprimir), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return response
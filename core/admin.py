@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import TrabajoEnvio
 
-# Register your models here.
+@admin.register(TrabajoEnvio)
+class TrabajoEnvioAdmin(admin.ModelAdmin):
+    list_display = ('tipo', 'estado', 'intentos', 'usuario', 'proximo_intento', 'created_at')
+    list_filter = ('estado', 'tipo')
+    readonly_fields = ('token', 'created_at', 'updated_at')
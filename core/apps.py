@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from . import checks, db, instrumentacion  # noqa: F401  (checks de estáticos, PRAGMA de SQLite y medición de SQL)
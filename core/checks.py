@@ -0,0 +1,71 @@
+"""Checks de sistema (``manage.py check``) sobre los archivos estáticos.
+
+Los estáticos sólo se pueden cachear como inmutables si la URL lleva el hash
+del contenido, y eso lo pone ``{% static %}`` con el storage de manifiesto.
+Una ruta escrita a mano (``/static/css/x.css``) se serviría sin hash y sin
+cache larga, y un ``{% static %}`` a un archivo inexistente rompe la página
+en producción (``manifest_strict``). Ambos casos son errores, así que
+``manage.py check`` (y el build que lo corre) falla.
+"""
+import re
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestFilesMixin, staticfiles_storage
+from django.core.checks import Error, Tags, register
+
+# href/src que apuntan directo a STATIC_URL en vez de pasar por {% static %}
+PATRON_SIN_HASH = re.compile(r'''(?:href|src)\s*=\s*["'](?:/?static/|\{\{\s*STATIC_URL)''')
+PATRON_STATIC = re.compile(r'''\{%\s*static\s+["']([^"']+)["']''')
+
+
+def _directorios_plantillas():
+    directorios = [Path(d) for motor in settings.TEMPLATES for d in motor.get('DIRS', [])]
+    base = Path(settings.BASE_DIR).resolve()
+    for app in apps.get_app_configs():
+        ruta = Path(app.path).resolve() / 'templates'
+        # Sólo las apps del proyecto; las de Django y terceros no se revisan
+        if ruta.is_dir() and base in ruta.parents:
+            directorios.append(ruta)
+    return directorios
+
+
+def _plantillas():
+    for directorio in _directorios_plantillas():
+        yield from sorted(Path(directorio).rglob('*.html'))
+
+
+@register(Tags.templates, Tags.staticfiles)
+def revisar_estaticos_en_plantillas(app_configs, **kwargs):
+    errores = []
+    for ruta in _plantillas():
+        texto = ruta.read_text(encoding='utf-8')
+        for numero, linea in enumerate(texto.splitlines(), start=1):
+            if PATRON_SIN_HASH.search(linea):
+                errores.append(Error(
+                    f"{ruta}:{numero} referencia un estático sin {{% static %}}: la URL no lleva hash.",
+                    hint="Usá {% static 'ruta/al/archivo' %} para que el nombre incluya el hash del contenido.",
+                    id='core.E001',
+                ))
+            for archivo in PATRON_STATIC.findall(linea):
+                if not finders.find(archivo):
+                    errores.append(Error(
+                        f"{ruta}:{numero} usa {{% static '{archivo}' %}} pero el archivo no existe.",
+                        hint="Sin el archivo no hay entrada en el manifiesto y la página falla en producción.",
+                        id='core.E002',
+                    ))
+    return errores
+
+
+@register(Tags.staticfiles, deploy=True)
+def revisar_storage_estaticos(app_configs, **kwargs):
+    # staticfiles_storage es lazy, pero isinstance ve la clase configurada
+    if isinstance(staticfiles_storage, ManifestFilesMixin):
+        return []
+    return [Error(
+        "El storage de estáticos no agrega hash a los nombres de archivo.",
+        hint="Usá whitenoise.storage.CompressedManifestStaticFilesStorage en STORAGES['staticfiles'].",
+        id='core.E003',
+    )]
@@ -0,0 +1,99 @@
+"""Configuración de SQLite para producción.
+
+Cada conexión nueva recibe, vía ``connection_created``, los PRAGMA que
+hacen que varios workers de gunicorn convivan sobre el mismo archivo:
+
+- ``journal_mode=WAL``: los lectores no bloquean al escritor ni viceversa.
+- ``synchronous=NORMAL``: con WAL sigue siendo seguro ante caídas del
+  proceso y evita un fsync por commit.
+- ``busy_timeout``: ante un lock, SQLite reintenta en vez de fallar enseguida
+  con "database is locked".
+- ``mmap_size`` y ``cache_size``: lecturas desde memoria mapeada y una caché
+  de páginas más grande por conexión.
+
+Se pueden ajustar con ``settings.SQLITE_PRAGMAS``. Las transacciones se
+abren con ``BEGIN IMMEDIATE`` (``OPTIONS['transaction_mode']`` en settings)
+para que un escritor tome el lock al empezar y espere con ``busy_timeout``,
+en vez de fallar al pasar de lectura a escritura a mitad de la transacción.
+
+Réplica de lectura opcional: si existe ``DATABASES['reportes']`` (por
+ejemplo una copia replicada con Litestream), las consultas de reportes la
+usan con ``para_reportes(queryset)``; ``RouterReplica`` mantiene escrituras
+y migraciones en ``default``.
+"""
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+PRAGMAS_DEFAULT = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,           # ms
+    'mmap_size': 256 * 1024 * 1024,  # bytes
+    'cache_size': -20000,            # negativo = KiB (≈ 20 MB)
+    'temp_store': 'MEMORY',
+}
+# PRAGMAS que no tienen sentido en bases en memoria (tests)
+SOLO_ARCHIVO = {'journal_mode', 'mmap_size'}
+
+REPLICA = 'reportes'
+
+
+def pragmas():
+    return {**PRAGMAS_DEFAULT, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+
+
+def aplicar_pragmas(cursor, valores, en_memoria=False):
+    """Ejecuta los PRAGMA sobre un cursor (de Django o de sqlite3)."""
+    for nombre, valor in valores.items():
+        if en_memoria and nombre in SOLO_ARCHIVO:
+            continue
+        cursor.execute(f"PRAGMA {nombre}={valor}")
+
+
+@receiver(connection_created, dispatch_uid='core_configurar_sqlite')
+def configurar_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        aplicar_pragmas(cursor, pragmas(), en_memoria=connection.is_in_memory_db())
+
+
+def replica_disponible():
+    return REPLICA in settings.DATABASES
+
+
+def para_reportes(queryset):
+    """Lee ``queryset`` de la réplica de reportes si está configurada."""
+    return queryset.using(REPLICA) if replica_disponible() else queryset
+
+
+class RouterReplica:
+    """La réplica es de sólo lectura y tiene los mismos datos que ``default``."""
+
+    def db_for_read(self, model, **hints):
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        alias = {'default', REPLICA}
+        if obj1._state.db in alias and obj2._state.db in alias:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+def estado_conexion(alias='default'):
+    """PRAGMA efectivos de una conexión (para diagnóstico)."""
+    with connections[alias].cursor() as cursor:
+        datos = {}
+        for nombre in pragmas():
+            cursor.execute(f"PRAGMA {nombre}")
+            fila = cursor.fetchone()
+            datos[nombre] = fila[0] if fila else None
+        return datos
@@ -0,0 +1,239 @@
+"""Cola persistente de envíos de email.
+
+Las vistas sólo llaman a ``encolar()`` y responden enseguida; el PDF y la
+conexión SMTP quedan a cargo del comando ``procesar_envios``, que reclama
+trabajos de la tabla ``TrabajoEnvio`` y reintenta con backoff exponencial.
+
+Cada app registra cómo construir su mensaje con ``@registrar('tipo')``; el
+handler recibe el trabajo y devuelve un ``EmailMessage`` listo para enviar,
+o un iterable de pares ``(progreso, mensaje)`` (envíos masivos). En ese caso
+cada tanda enviada guarda en ``trabajo.progreso`` el del último mensaje, y al
+reintentar el handler tiene que seguir desde ahí: así un error a mitad de un
+envío masivo no reenvía lo que ya salió. Un handler que no manda emails
+(genera un archivo, por ejemplo) devuelve None; si deja en el payload una URL
+de ``descarga``, la UI la muestra al terminar. Si el trabajo no tiene arreglo
+(el alumno se borró, por ejemplo), el handler lanza ``ErrorPermanente`` y el
+trabajo queda fallido sin reintentos.
+
+Cada reclamo cuenta como un intento, también si el worker muere a mitad de
+camino: un trabajo que tumba al worker termina fallido y no se retoma para
+siempre.
+"""
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from . import instrumentacion
+from .models import TrabajoEnvio
+
+logger = logging.getLogger(__name__)
+
+MAX_INTENTOS = getattr(settings, 'ENVIOS_MAX_INTENTOS', 5)
+# Segundos de espera antes del 1er reintento; se duplica en cada intento
+BACKOFF_BASE = getattr(settings, 'ENVIOS_BACKOFF_BASE', 30)
+BACKOFF_MAX = getattr(settings, 'ENVIOS_BACKOFF_MAX', 3600)
+# Si un worker muere con un trabajo tomado, otro lo retoma pasado este tiempo
+BLOQUEO_SEGUNDOS = getattr(settings, 'ENVIOS_BLOQUEO_SEGUNDOS', 300)
+# Mensajes por llamada a send_messages() en los envíos masivos
+TAMANO_TANDA = getattr(settings, 'ENVIOS_TAMANO_TANDA', 100)
+
+_handlers = {}
+
+
+class ErrorPermanente(Exception):
+    """El trabajo no se puede completar y reintentarlo no cambia nada."""
+
+
+def registrar(tipo):
+    """Decorador para registrar el constructor de mensajes de un tipo de trabajo."""
+    def decorador(func):
+        _handlers[tipo] = func
+        return func
+    return decorador
+
+
+def encolar(tipo, payload, usuario=None):
+    """Crea un trabajo pendiente y lo devuelve (no envía nada)."""
+    if tipo not in _handlers:
+        raise ValueError(f"Tipo de envío desconocido: {tipo}")
+    return TrabajoEnvio.objects.create(
+        tipo=tipo,
+        payload=payload,
+        usuario=usuario if usuario is not None and usuario.is_authenticated else None,
+        max_intentos=MAX_INTENTOS,
+    )
+
+
+def calcular_backoff(intentos):
+    """Espera (en segundos) antes del siguiente intento, con jitter de ±10 %."""
+    espera = min(BACKOFF_BASE * (2 ** max(intentos - 1, 0)), BACKOFF_MAX)
+    return espera * random.uniform(0.9, 1.1)
+
+
+def reclamar_trabajos(limite=10):
+    """Marca como 'en_proceso' hasta `limite` trabajos listos y los devuelve.
+
+    El reclamo es un UPDATE condicional por fila, así dos workers nunca toman
+    el mismo trabajo (también en SQLite, que no tiene SELECT ... FOR UPDATE).
+    El mismo UPDATE suma el intento.
+    """
+    ahora = timezone.now()
+    # Abandonados por un worker caído que ya no tienen intentos
+    TrabajoEnvio.objects.filter(
+        estado=TrabajoEnvio.EN_PROCESO, bloqueado_hasta__lt=ahora, intentos__gte=F('max_intentos'),
+    ).update(
+        estado=TrabajoEnvio.FALLIDO, bloqueado_hasta=None, updated_at=ahora,
+        ultimo_error="El worker se detuvo durante el último intento.",
+    )
+    candidatos = list(
+        TrabajoEnvio.objects.filter(estado=TrabajoEnvio.PENDIENTE, proximo_intento__lte=ahora)
+        .order_by('proximo_intento', 'id')
+        .values_list('id', flat=True)[:limite]
+    )
+    # Trabajos abandonados por un worker caído
+    candidatos += list(
+        TrabajoEnvio.objects.filter(estado=TrabajoEnvio.EN_PROCESO, bloqueado_hasta__lt=ahora)
+        .values_list('id', flat=True)[:limite]
+    )
+
+    tomados = []
+    bloqueo = ahora + timedelta(seconds=BLOQUEO_SEGUNDOS)
+    for pk in candidatos:
+        actualizados = TrabajoEnvio.objects.filter(
+            pk=pk, estado__in=[TrabajoEnvio.PENDIENTE, TrabajoEnvio.EN_PROCESO], proximo_intento__lte=ahora,
+        ).exclude(
+            estado=TrabajoEnvio.EN_PROCESO, bloqueado_hasta__gte=ahora,
+        ).update(
+            estado=TrabajoEnvio.EN_PROCESO, intentos=F('intentos') + 1, bloqueado_hasta=bloqueo, updated_at=ahora,
+        )
+        if actualizados:
+            tomados.append(pk)
+    return list(TrabajoEnvio.objects.filter(pk__in=tomados).order_by('id'))
+
+
+def _enviar(mensajes, connection=None, al_enviar=None):
+    """Envía pares ``(progreso, mensaje)`` sobre una sola conexión.
+
+    Cada ``TAMANO_TANDA`` mensajes, y también si uno falla, llama a
+    ``al_enviar(progreso, cantidad)`` con el progreso del último que salió y
+    cuántos salieron desde la llamada anterior.
+    """
+    propia = connection is None
+    progreso, pendientes = None, 0
+    try:
+        for progreso_mensaje, mensaje in mensajes:
+            if connection is None:
+                # Recién con el primer mensaje: un trabajo sin emails no necesita SMTP
+                connection = get_connection(fail_silently=False)
+                connection.open()
+            # De a uno: si falla el destinatario N, los anteriores ya cuentan como enviados
+            with instrumentacion.medir('email'):
+                connection.send_messages([mensaje])
+            progreso, pendientes = progreso_mensaje, pendientes + 1
+            if pendientes >= TAMANO_TANDA and al_enviar:
+                al_enviar(progreso, pendientes)
+                pendientes = 0
+    finally:
+        if pendientes and al_enviar:
+            al_enviar(progreso, pendientes)
+        if propia and connection is not None:
+            connection.close()
+
+
+def _registrar_progreso(trabajo, progreso, cantidad):
+    """Guarda hasta dónde llegó el envío y renueva el bloqueo del trabajo.
+
+    Sin renovarlo, otro worker retomaría un envío masivo que tarda más que
+    ``BLOQUEO_SEGUNDOS`` y lo mandaría dos veces.
+    """
+    trabajo.enviados += cantidad
+    if progreso is not None:
+        trabajo.progreso = str(progreso)
+    trabajo.bloqueado_hasta = timezone.now() + timedelta(seconds=BLOQUEO_SEGUNDOS)
+    trabajo.save(update_fields=['enviados', 'progreso', 'bloqueado_hasta', 'updated_at'])
+
+
+def renovar_bloqueo(trabajo):
+    """Renueva el bloqueo de un trabajo que tarda sin enviar nada (p. ej. arma un PDF grande).
+
+    Se puede llamar seguido: sólo escribe cuando queda menos de la mitad del bloqueo.
+    """
+    ahora = timezone.now()
+    if trabajo.bloqueado_hasta and trabajo.bloqueado_hasta - ahora > timedelta(seconds=BLOQUEO_SEGUNDOS / 2):
+        return
+    trabajo.bloqueado_hasta = ahora + timedelta(seconds=BLOQUEO_SEGUNDOS)
+    TrabajoEnvio.objects.filter(pk=trabajo.pk).update(bloqueado_hasta=trabajo.bloqueado_hasta, updated_at=ahora)
+
+
+def procesar_trabajo(trabajo, connection=None):
+    """Construye y envía el mensaje de un trabajo ya reclamado.
+
+    Devuelve True si se envió. Ante un error programa el reintento con
+    backoff o, agotados los intentos (o con ``ErrorPermanente``), lo marca
+    como fallido. El intento ya lo sumó ``reclamar_trabajos``.
+    """
+    try:
+        handler = _handlers[trabajo.tipo]
+        mensajes = handler(trabajo)
+        if mensajes is None:
+            mensajes = []
+        elif isinstance(mensajes, EmailMessage):
+            mensajes = [(None, mensajes)]
+        _enviar(mensajes, connection, al_enviar=lambda progreso, cantidad: _registrar_progreso(trabajo, progreso, cantidad))
+    except Exception as e:
+        logger.exception("Error procesando envío #%s (intento %s): %s", trabajo.pk, trabajo.intentos, e)
+        trabajo.ultimo_error = str(e)
+        trabajo.bloqueado_hasta = None
+        if isinstance(e, ErrorPermanente) or trabajo.intentos >= trabajo.max_intentos:
+            trabajo.estado = TrabajoEnvio.FALLIDO
+        else:
+            trabajo.estado = TrabajoEnvio.PENDIENTE
+            trabajo.proximo_intento = timezone.now() + timedelta(seconds=calcular_backoff(trabajo.intentos))
+        trabajo.save(update_fields=['estado', 'proximo_intento', 'bloqueado_hasta', 'ultimo_error', 'updated_at'])
+        return False
+
+    trabajo.estado = TrabajoEnvio.ENVIADO
+    trabajo.ultimo_error = ''
+    trabajo.bloqueado_hasta = None
+    trabajo.save(update_fields=['estado', 'bloqueado_hasta', 'ultimo_error', 'updated_at'])
+    return True
+
+
+def procesar_lote(trabajos):
+    """Procesa una lista de trabajos reutilizando una única conexión SMTP."""
+    close_old_connections()
+    enviados = 0
+    try:
+        with get_connection() as connection:
+            for trabajo in trabajos:
+                enviados += procesar_trabajo(trabajo, connection)
+    except Exception as e:
+        # Falla al abrir la conexión: cada trabajo registra el error y se reintenta
+        logger.exception("No se pudo abrir la conexión de email: %s", e)
+        for trabajo in trabajos:
+            if trabajo.estado == TrabajoEnvio.EN_PROCESO:
+                enviados += procesar_trabajo(trabajo)
+    finally:
+        close_old_connections()
+    return enviados
+
+
+def estado_trabajo(trabajo):
+    """Representación JSON del estado de un trabajo (para polling desde la UI)."""
+    return {
+        'token': str(trabajo.token),
+        'tipo': trabajo.tipo,
+        'estado': trabajo.estado,
+        'intentos': trabajo.intentos,
+        'enviados': trabajo.enviados,
+        'max_intentos': trabajo.max_intentos,
+        'proximo_intento': trabajo.proximo_intento.isoformat() if trabajo.estado == TrabajoEnvio.PENDIENTE else None,
+        'ultimo_error': trabajo.ultimo_error,
+        'descarga': trabajo.payload.get('descarga') if trabajo.estado == TrabajoEnvio.ENVIADO else None,
+    }
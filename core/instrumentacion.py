@@ -0,0 +1,190 @@
+"""Instrumentación de rendimiento por petición.
+
+Cada petición abre una ``Medicion`` en un ``ContextVar`` (viaja con
+``sync_to_async`` y con las tareas de asyncio) y los hooks suman ahí tiempo y
+cantidad por categoría:
+
+- ``db``: todas las consultas, vía un ``execute_wrapper`` instalado en cada
+  conexión al crearse (así cubre también los hilos de las vistas async).
+- ``http``: peticiones salientes (clientes de ``scraper.cliente_http``).
+- ``email``: llamadas a ``send_messages()``.
+- ``pdf``: generación con ReportLab.
+
+Fuera de una petición (comandos, workers) los hooks sólo alimentan las
+métricas globales del proceso, que ``exportar_prometheus()`` publica en
+formato de texto de Prometheus. Son por proceso: con varios workers de
+gunicorn cada uno reporta lo suyo.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+CATEGORIAS = ('db', 'http', 'email', 'pdf')
+# Límites superiores (segundos) del histograma de duración de peticiones
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_actual = ContextVar('medicion', default=None)
+
+
+class Medicion:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.tiempos = dict.fromkeys(CATEGORIAS, 0.0)
+        self.cantidades = dict.fromkeys(CATEGORIAS, 0)
+        self._lock = threading.Lock()
+
+    def sumar(self, categoria, segundos):
+        with self._lock:
+            self.tiempos[categoria] += segundos
+            self.cantidades[categoria] += 1
+
+    def total(self):
+        return time.perf_counter() - self.inicio
+
+    def server_timing(self):
+        """Valor del header ``Server-Timing`` (duraciones en ms)."""
+        partes = [
+            f'{c};dur={self.tiempos[c] * 1000:.1f};desc="{self.cantidades[c]}"'
+            for c in CATEGORIAS if self.cantidades[c]
+        ]
+        partes.append(f'total;dur={self.total() * 1000:.1f}')
+        return ', '.join(partes)
+
+
+def iniciar():
+    """Abre una medición para el contexto actual; devuelve (medicion, token)."""
+    medicion = Medicion()
+    return medicion, _actual.set(medicion)
+
+
+def terminar(token):
+    _actual.reset(token)
+
+
+def medicion_actual():
+    return _actual.get()
+
+
+class _Registro:
+    """Contadores globales del proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (vista, método, status) -> cantidad
+        self.peticiones = {}
+        # vista -> [buckets..., +Inf], suma
+        self.duracion_buckets = {}
+        self.duracion_suma = {}
+        self.categoria_segundos = dict.fromkeys(CATEGORIAS, 0.0)
+        self.categoria_total = dict.fromkeys(CATEGORIAS, 0)
+
+    def categoria(self, categoria, segundos):
+        with self._lock:
+            self.categoria_segundos[categoria] += segundos
+            self.categoria_total[categoria] += 1
+
+    def peticion(self, vista, metodo, status, segundos):
+        with self._lock:
+            clave = (vista, metodo, status)
+            self.peticiones[clave] = self.peticiones.get(clave, 0) + 1
+            buckets = self.duracion_buckets.setdefault(vista, [0] * (len(BUCKETS) + 1))
+            for i, limite in enumerate(BUCKETS):
+                if segundos <= limite:
+                    buckets[i] += 1
+                    break
+            else:
+                buckets[-1] += 1
+            self.duracion_suma[vista] = self.duracion_suma.get(vista, 0.0) + segundos
+
+    def copia(self):
+        with self._lock:
+            return (
+                dict(self.peticiones),
+                {k: list(v) for k, v in self.duracion_buckets.items()},
+                dict(self.duracion_suma),
+                dict(self.categoria_segundos),
+                dict(self.categoria_total),
+            )
+
+
+registro = _Registro()
+
+
+def registrar(categoria, segundos):
+    """Suma ``segundos`` a la categoría en la petición actual y en el proceso."""
+    registro.categoria(categoria, segundos)
+    medicion = _actual.get()
+    if medicion is not None:
+        medicion.sumar(categoria, segundos)
+
+
+@contextmanager
+def medir(categoria):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(categoria, time.perf_counter() - inicio)
+
+
+def _wrapper_sql(execute, sql, params, many, context):
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        registrar('db', time.perf_counter() - inicio)
+
+
+@receiver(connection_created, dispatch_uid='core_instrumentar_sql')
+def instrumentar_conexion(sender, connection, **kwargs):
+    if _wrapper_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_wrapper_sql)
+
+
+def _etiqueta(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def exportar_prometheus():
+    """Métricas del proceso en el formato de texto de Prometheus."""
+    peticiones, buckets, sumas, segundos, totales = registro.copia()
+    lineas = [
+        '# HELP django_peticiones_total Peticiones atendidas por vista, método y status.',
+        '# TYPE django_peticiones_total counter',
+    ]
+    for (vista, metodo, status), cantidad in sorted(peticiones.items()):
+        lineas.append(
+            f'django_peticiones_total{{vista="{_etiqueta(vista)}",metodo="{metodo}",status="{status}"}} {cantidad}'
+        )
+
+    lineas += [
+        '# HELP django_peticion_segundos Duración de las peticiones por vista.',
+        '# TYPE django_peticion_segundos histogram',
+    ]
+    for vista in sorted(buckets):
+        etiqueta = _etiqueta(vista)
+        acumulado = 0
+        for limite, cantidad in zip(BUCKETS + (float('inf'),), buckets[vista]):
+            acumulado += cantidad
+            le = '+Inf' if limite == float('inf') else repr(limite)
+            lineas.append(f'django_peticion_segundos_bucket{{vista="{etiqueta}",le="{le}"}} {acumulado}')
+        lineas.append(f'django_peticion_segundos_sum{{vista="{etiqueta}"}} {sumas[vista]:.6f}')
+        lineas.append(f'django_peticion_segundos_count{{vista="{etiqueta}"}} {acumulado}')
+
+    lineas += [
+        '# HELP django_operaciones_segundos_total Tiempo acumulado por categoría (db, http, email, pdf).',
+        '# TYPE django_operaciones_segundos_total counter',
+    ]
+    for categoria in CATEGORIAS:
+        lineas.append(f'django_operaciones_segundos_total{{categoria="{categoria}"}} {segundos[categoria]:.6f}')
+    lineas += [
+        '# HELP django_operaciones_total Operaciones por categoría (consultas SQL, peticiones HTTP, ...).',
+        '# TYPE django_operaciones_total counter',
+    ]
+    for categoria in CATEGORIAS:
+        lineas.append(f'django_operaciones_total{{categoria="{categoria}"}} {totales[categoria]}')
+    return '\n'.join(lineas) + '\n'
@@ -0,0 +1,264 @@
+"""Límite de tasa por usuario (o IP) y por endpoint con token buckets.
+
+Cada par (endpoint, usuario) tiene una cubeta de ``capacidad`` fichas que se
+recarga a ``por_minuto`` fichas por minuto; cada petición limitada gasta una.
+Sin fichas, la vista no se ejecuta y se responde 429 con ``Retry-After``.
+Los anónimos se identifican por IP (``LIMITES_PROXIES`` indica cuántos
+proxies de confianza agregan ``X-Forwarded-For`` delante de la app).
+
+El estado vive en un almacén intercambiable (``LIMITES_ALMACEN``):
+
+- ``'archivo'`` (por defecto): una base SQLite propia en
+  ``LIMITES_ARCHIVO``, compartida por todos los workers de gunicorn de la
+  máquina. Sin fsync: perder el estado en un corte sólo devuelve fichas.
+- ``'db'``: la tabla ``CubetaLimite`` en la base de Django, para varias
+  máquinas.
+- ``'memoria'``: un dict por proceso (desarrollo y tests).
+- o la ruta de una clase propia con ``consumir()``.
+
+En los almacenes SQL, recargar, descontar y decidir es un único
+``INSERT ... ON CONFLICT DO UPDATE ... RETURNING``: atómico sin locks ni
+transacciones explícitas. ``manage.py bench_limites`` mide el costo.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.shortcuts import render
+from django.utils.module_loading import import_string
+
+ALMACEN = getattr(settings, 'LIMITES_ALMACEN', 'archivo')
+ARCHIVO = getattr(settings, 'LIMITES_ARCHIVO', Path(settings.BASE_DIR) / 'cache' / 'limites.sqlite3')
+# Límites por endpoint que pisan los del decorador: {'buscar': (capacidad, por_minuto)}
+LIMITES = getattr(settings, 'LIMITES_TASA', {})
+PROXIES = getattr(settings, 'LIMITES_PROXIES', 0)
+ACTIVO = getattr(settings, 'LIMITES_ACTIVO', True)
+# Cubetas sin uso por más que esto se borran (tienen que haberse llenado antes)
+RETENCION = getattr(settings, 'LIMITES_RETENCION', 3600)
+# Una de cada N consultas borra las cubetas vencidas
+LIMPIEZA_CADA = 1000
+
+# Recarga, descuento y resultado en una sola sentencia. En el UPDATE todas las
+# expresiones ven los valores anteriores de la fila.
+SQL_CONSUMIR = """
+INSERT INTO {tabla} (clave, fichas, actualizado, permitido) VALUES (%(clave)s, %(capacidad)s - 1, %(ahora)s, 1)
+ON CONFLICT (clave) DO UPDATE SET
+    fichas = CASE WHEN {disponibles} >= 1 THEN {disponibles} - 1 ELSE {disponibles} END,
+    permitido = CASE WHEN {disponibles} >= 1 THEN 1 ELSE 0 END,
+    actualizado = %(ahora)s
+RETURNING fichas, permitido
+"""
+DISPONIBLES = "{minimo}(%(capacidad)s, {tabla}.fichas + (%(ahora)s - {tabla}.actualizado) * %(por_segundo)s)"
+
+
+def sql_consumir(tabla, minimo='MIN', parametro='%({})s'):
+    sql = SQL_CONSUMIR.replace('{disponibles}', DISPONIBLES.format(minimo=minimo, tabla=tabla))
+    sql = sql.format(tabla=tabla)
+    if parametro != '%({})s':
+        # sqlite3 usa :nombre en vez de %(nombre)s
+        for nombre in ('clave', 'capacidad', 'ahora', 'por_segundo'):
+            sql = sql.replace(f'%({nombre})s', parametro.format(nombre))
+    return sql
+
+
+def espera(fichas, por_segundo):
+    """Segundos hasta tener una ficha."""
+    return max(1, math.ceil((1 - fichas) / por_segundo))
+
+
+class AlmacenMemoria:
+    """Cubetas en un dict del proceso: cada worker limita por su cuenta."""
+
+    def __init__(self):
+        self._cubetas = {}
+        self._lock = threading.Lock()
+
+    def consumir(self, clave, capacidad, por_segundo, ahora):
+        """(permitido, fichas restantes)."""
+        with self._lock:
+            fichas, actualizado = self._cubetas.get(clave, (capacidad, ahora))
+            fichas = min(capacidad, fichas + (ahora - actualizado) * por_segundo)
+            permitido = fichas >= 1
+            if permitido:
+                fichas -= 1
+            self._cubetas[clave] = (fichas, ahora)
+            return permitido, fichas
+
+    def limpiar(self, antes_de):
+        with self._lock:
+            self._cubetas = {c: v for c, v in self._cubetas.items() if v[1] >= antes_de}
+
+    def vaciar(self):
+        with self._lock:
+            self._cubetas.clear()
+
+
+class AlmacenArchivo:
+    """Cubetas en una base SQLite aparte, compartida por los procesos de la máquina."""
+
+    TABLA = 'cubetas'
+
+    def __init__(self, ruta=None):
+        self.ruta = Path(ruta or ARCHIVO)
+        self._local = threading.local()
+        self._sql = sql_consumir(self.TABLA, parametro=':{}')
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        # Un worker creado con fork (gunicorn --preload) no reusa la conexión del padre
+        if conexion is None or self._local.pid != os.getpid():
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            # autocommit: cada sentencia es su propia transacción
+            conexion = sqlite3.connect(self.ruta, timeout=5, isolation_level=None, check_same_thread=False)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=OFF')
+            conexion.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.TABLA} ('
+                'clave TEXT PRIMARY KEY, fichas REAL NOT NULL, actualizado REAL NOT NULL, '
+                'permitido INTEGER NOT NULL) WITHOUT ROWID'
+            )
+            self._local.conexion = conexion
+            self._local.pid = os.getpid()
+        return conexion
+
+    def consumir(self, clave, capacidad, por_segundo, ahora):
+        fila = self._conexion().execute(self._sql, {
+            'clave': clave, 'capacidad': capacidad, 'ahora': ahora, 'por_segundo': por_segundo,
+        }).fetchone()
+        return bool(fila[1]), fila[0]
+
+    def limpiar(self, antes_de):
+        self._conexion().execute(f'DELETE FROM {self.TABLA} WHERE actualizado < ?', [antes_de])
+
+    def vaciar(self):
+        self._conexion().execute(f'DELETE FROM {self.TABLA}')
+
+
+class AlmacenDB:
+    """Cubetas en la tabla ``CubetaLimite`` de la base de Django (SQLite o PostgreSQL)."""
+
+    # Usa la conexión de Django: en vistas async va al hilo de sync_to_async
+    # (thread_sensitive), los demás almacenes a un hilo cualquiera
+    requiere_hilo = True
+
+    def __init__(self):
+        from .models import CubetaLimite
+
+        self.modelo = CubetaLimite
+        tabla = connection.ops.quote_name(CubetaLimite._meta.db_table)
+        self._sql = sql_consumir(tabla, minimo='LEAST' if connection.vendor == 'postgresql' else 'MIN')
+
+    def consumir(self, clave, capacidad, por_segundo, ahora):
+        with connection.cursor() as cursor:
+            cursor.execute(self._sql, {
+                'clave': clave, 'capacidad': capacidad, 'ahora': ahora, 'por_segundo': por_segundo,
+            })
+            fichas, permitido = cursor.fetchone()
+        return bool(permitido), fichas
+
+    def limpiar(self, antes_de):
+        self.modelo.objects.filter(actualizado__lt=antes_de).delete()
+
+    def vaciar(self):
+        self.modelo.objects.all().delete()
+
+
+ALMACENES = {'memoria': AlmacenMemoria, 'archivo': AlmacenArchivo, 'db': AlmacenDB}
+_almacen = None
+_almacen_lock = threading.Lock()
+_consultas = 0
+_consultas_lock = threading.Lock()
+
+
+def crear_almacen(nombre):
+    return ALMACENES[nombre]() if nombre in ALMACENES else import_string(nombre)()
+
+
+def almacen():
+    global _almacen
+    if _almacen is None:
+        with _almacen_lock:
+            if _almacen is None:
+                _almacen = crear_almacen(ALMACEN)
+    return _almacen
+
+
+def consumir(clave, capacidad, por_minuto, almacen_=None):
+    """(permitido, segundos de espera si no) para una petición con ``clave``."""
+    global _consultas
+    almacen_ = almacen_ or almacen()
+    por_segundo = por_minuto / 60
+    ahora = time.time()
+    permitido, fichas = almacen_.consumir(clave, capacidad, por_segundo, ahora)
+    with _consultas_lock:
+        _consultas += 1
+        limpiar = _consultas % LIMPIEZA_CADA == 0
+    if limpiar:
+        almacen_.limpiar(ahora - RETENCION)
+    return permitido, 0 if permitido else espera(fichas, por_segundo)
+
+
+def ip_cliente(request):
+    if PROXIES:
+        reenviadas = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(reenviadas) >= PROXIES:
+            return reenviadas[-PROXIES]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def clave(endpoint, request, usuario):
+    if usuario is not None and usuario.is_authenticated:
+        return f'{endpoint}:u{usuario.pk}'
+    return f'{endpoint}:ip{ip_cliente(request)}'
+
+
+def respuesta_limitada(request, segundos):
+    response = render(request, 'core/limite_tasa.html', {'segundos': segundos}, status=429)
+    response['Retry-After'] = str(segundos)
+    return response
+
+
+def limitar_tasa(endpoint, capacidad, por_minuto, metodos=None):
+    """Decorador de vistas (sync o async): ``capacidad`` peticiones seguidas y
+    ``por_minuto`` sostenidas por usuario o IP. ``metodos`` limita sólo esos
+    métodos HTTP (p. ej. ``('POST',)``); por defecto, todos.
+
+    ``settings.LIMITES_TASA[endpoint]`` pisa capacidad y por_minuto.
+    """
+    capacidad, por_minuto = LIMITES.get(endpoint, (capacidad, por_minuto))
+
+    def aplica(request):
+        return ACTIVO and (metodos is None or request.method in metodos)
+
+    def decorador(vista):
+        if iscoroutinefunction(vista):
+            @wraps(vista)
+            async def envuelta_async(request, *args, **kwargs):
+                if aplica(request):
+                    usuario = await request.auser()
+                    almacen_ = almacen()
+                    # consumir() bloquea (SQLite, la base, un almacén propio): nunca en el event loop
+                    permitido, segundos = await sync_to_async(
+                        consumir, thread_sensitive=getattr(almacen_, 'requiere_hilo', False),
+                    )(clave(endpoint, request, usuario), capacidad, por_minuto, almacen_)
+                    if not permitido:
+                        return await sync_to_async(respuesta_limitada)(request, segundos)
+                return await vista(request, *args, **kwargs)
+            return envuelta_async
+
+        @wraps(vista)
+        def envuelta(request, *args, **kwargs):
+            if aplica(request):
+                permitido, segundos = consumir(clave(endpoint, request, request.user), capacidad, por_minuto)
+                if not permitido:
+                    return respuesta_limitada(request, segundos)
+            return vista(request, *args, **kwargs)
+        return envuelta
+    return decorador
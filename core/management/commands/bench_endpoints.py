@@ -0,0 +1,280 @@
+import json
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from alumnos import busqueda, duplicados
+from alumnos.models import Alumno
+from core import limites
+from core.envios import procesar_lote, reclamar_trabajos
+from core.management.commands.prueba_carga import percentil
+
+# Máximo de consultas SQL por petición, contadas en el hilo de la vista.
+# Sesión y usuario salen de la cache (cached_db + BackendCacheado).
+# Un N+1 nuevo hace fallar el benchmark.
+PRESUPUESTOS = {
+    'dashboard': 3,        # métricas sin cachear
+    'gestion_alumnos': 2,
+    'crear_alumno': 5,     # + candidatos a duplicado y alta de sus claves
+    'editar_alumno': 8,    # + reemplazo de las claves de duplicado, en su transacción (BEGIN/COMMIT)
+    'enviar_pdf': 2,
+    'buscar': 7,           # término nuevo: lectura y alta en la cache de Wikipedia
+    'api_listar': 1,
+    'api_actualizar': 8,   # lote de LOTE_API: lectura, bulk_update, índice de búsqueda y claves de duplicado
+}
+LOTE_API = 100
+# Diferencias de p95 menores a esto se consideran ruido al comparar corridas
+MARGEN_MS = 2.0
+NOMBRES = ('Ana', 'José', 'María', 'Lucía', 'Martín', 'Sofía', 'Juan', 'Tomás', 'Camila', 'Inés')
+APELLIDOS = ('González', 'Rodríguez', 'Gómez', 'Fernández', 'López', 'Díaz', 'Pérez', 'Sánchez', 'Álvarez', 'Ruiz')
+
+
+@contextmanager
+def base_temporal():
+    """Entorno de test sobre una base SQLite en archivo temporal, con las caches vacías."""
+    setup_test_environment()
+    # En archivo (no en memoria) para que los hilos del scraper la compartan sin bloqueos
+    directorio = tempfile.TemporaryDirectory()
+    connection.settings_dict['TEST']['NAME'] = str(Path(directorio.name) / 'bench.sqlite3')
+    nombre_original = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    # Las caches guardan usuarios por pk: no deben mezclarse con los de la base real
+    for cache in caches.all():
+        cache.clear()
+    try:
+        yield
+    finally:
+        for cache in caches.all():
+            cache.clear()
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        teardown_test_environment()
+        directorio.cleanup()
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark reproducible de los endpoints principales sobre una base de prueba: siembra N usuarios × M "
+        "alumnos, mide latencia (p50/p95/p99) y throughput, controla presupuestos de consultas SQL y guarda JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=3)
+        parser.add_argument('--alumnos', type=int, default=500, help="Alumnos por usuario.")
+        parser.add_argument('--iteraciones', type=int, default=50, help="Peticiones por endpoint.")
+        parser.add_argument('--calentamiento', type=int, default=3, help="Peticiones previas no medidas.")
+        parser.add_argument('--semilla', type=int, default=1)
+        parser.add_argument('--latencia-stub', type=float, default=20.0, help="ms que tarda el Wikipedia falso.")
+        parser.add_argument('--salida', help="Archivo JSON donde guardar los resultados.")
+        parser.add_argument('--comparar', help="JSON de una corrida anterior para detectar regresiones.")
+        parser.add_argument('--tolerancia', type=float, default=0.5, help="Aumento de p95 aceptado (0.5 = 50%%).")
+
+    def handle(self, *args, **options):
+        # Las iteraciones superan a propósito los límites de tasa; su costo lo mide bench_limites
+        limites.ACTIVO = False
+        with base_temporal():
+            servidor = self._iniciar_stub(options['latencia_stub'] / 1000)
+            try:
+                usuarios = self._sembrar(options['usuarios'], options['alumnos'], options['semilla'])
+                # Las métricas van a una cache en archivo: sin esto sobreviven a corridas anteriores
+                for alias in ('default', 'metricas'):
+                    caches[alias].clear()
+                resultados = self._medir(usuarios, options)
+            finally:
+                servidor.shutdown()
+
+        informe = {
+            'commit': _commit(),
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'parametros': {k: options[k] for k in ('usuarios', 'alumnos', 'iteraciones', 'calentamiento', 'semilla', 'latencia_stub')},
+            'resultados': resultados,
+        }
+        self._imprimir(resultados)
+        if options['salida']:
+            Path(options['salida']).write_text(json.dumps(informe, indent=2))
+            self.stdout.write(f"Resultados guardados en {options['salida']}")
+
+        problemas = [
+            f"{nombre}: {r['consultas_max']} consultas (presupuesto {r['presupuesto_consultas']})"
+            for nombre, r in resultados.items()
+            if r.get('presupuesto_consultas') is not None and r['consultas_max'] > r['presupuesto_consultas']
+        ]
+        problemas += [f"{nombre}: {r['errores']} respuestas inesperadas" for nombre, r in resultados.items() if r['errores']]
+        if options['comparar']:
+            problemas += self._regresiones(resultados, options['comparar'], options['tolerancia'])
+        if problemas:
+            raise CommandError("Benchmark con problemas:\n  " + "\n  ".join(problemas))
+
+    def _iniciar_stub(self, latencia):
+        from scraper.management.commands.bench_mediawiki import StubWikipedia, iniciar_stub
+
+        StubWikipedia.latencia = latencia
+        return iniciar_stub()
+
+    def _sembrar(self, n_usuarios, n_alumnos, semilla):
+        azar = random.Random(semilla)
+        clave = make_password('bench')
+        usuarios = User.objects.bulk_create(
+            User(username=f'bench{i}', email=f'bench{i}@example.com', password=clave) for i in range(n_usuarios)
+        )
+        for usuario in usuarios:
+            alumnos = Alumno.objects.bulk_create(
+                Alumno(
+                    usuario=usuario,
+                    nombre=azar.choice(NOMBRES),
+                    apellido=azar.choice(APELLIDOS),
+                    documento=str(30000000 + usuario.pk * 100000 + i),
+                    email=f'alumno{i}.{usuario.pk}@example.com',
+                    fecha_nacimiento=date(2000, 1, 1) + timedelta(days=azar.randrange(8000)),
+                )
+                for i in range(n_alumnos)
+            )
+            busqueda.indexar(alumnos)
+            duplicados.indexar(alumnos, nuevos=True)
+        return usuarios
+
+    def _escenarios(self):
+        def dashboard(cliente, usuario, ids, i):
+            return cliente.get(reverse('alumnos:dashboard')), 200
+
+        def gestion_alumnos(cliente, usuario, ids, i):
+            return cliente.get(reverse('alumnos:gestion_alumnos')), 200
+
+        def crear_alumno(cliente, usuario, ids, i):
+            datos = {'nombre': 'Nuevo', 'apellido': f'Alumno {i}', 'documento': f'9{usuario.pk:03d}{i:06d}',
+                     'email': f'nuevo{i}@example.com', 'fecha_nacimiento': '2004-05-06'}
+            return cliente.post(reverse('alumnos:crear'), datos), 302
+
+        def editar_alumno(cliente, usuario, ids, i):
+            pk = ids[i % len(ids)]
+            datos = {'nombre': 'Editado', 'apellido': f'Alumno {i}', 'documento': f'8{usuario.pk:03d}{i:06d}',
+                     'email': f'editado{i}@example.com', 'fecha_nacimiento': '2003-02-01'}
+            return cliente.post(reverse('alumnos:editar', args=[pk]), datos), 302
+
+        def enviar_pdf(cliente, usuario, ids, i):
+            return cliente.get(reverse('alumnos:enviar_pdf', args=[ids[i % len(ids)]])), 302
+
+        def buscar(cliente, usuario, ids, i):
+            return cliente.get(reverse('scraper:buscar'), {'palabra': f'Termino{i}'}), 200
+
+        def api_listar(cliente, usuario, ids, i):
+            return cliente.get(reverse('alumnos:api'), {'fields': 'id,nombre,apellido', 'limite': LOTE_API}), 200
+
+        def api_actualizar(cliente, usuario, ids, i):
+            lote = [{'id': pk, 'apellido': f'Lote {i}'} for pk in ids[:LOTE_API]]
+            return cliente.patch(reverse('alumnos:api'), json.dumps(lote), content_type='application/json'), 200
+
+        return [
+            ('dashboard', dashboard), ('gestion_alumnos', gestion_alumnos), ('crear_alumno', crear_alumno),
+            ('editar_alumno', editar_alumno), ('enviar_pdf', enviar_pdf), ('buscar', buscar),
+            ('api_listar', api_listar), ('api_actualizar', api_actualizar),
+        ]
+
+    def _medir(self, usuarios, options):
+        clientes = []
+        for usuario in usuarios:
+            cliente = Client()
+            cliente.force_login(usuario)
+            ids = list(Alumno.objects.filter(usuario=usuario).values_list('id', flat=True)[:200])
+            clientes.append((cliente, usuario, ids))
+
+        resultados = {}
+        for nombre, escenario in self._escenarios():
+            latencias, consultas, errores = [], [], 0
+            for i in range(-options['calentamiento'], 0):
+                cliente, usuario, ids = clientes[i % len(clientes)]
+                escenario(cliente, usuario, ids, i)
+            for i in range(options['iteraciones']):
+                cliente, usuario, ids = clientes[i % len(clientes)]
+                with CaptureQueriesContext(connection) as capturadas:
+                    inicio = time.perf_counter()
+                    respuesta, esperado = escenario(cliente, usuario, ids, i)
+                    latencias.append(time.perf_counter() - inicio)
+                consultas.append(len(capturadas))
+                if respuesta.status_code != esperado:
+                    errores += 1
+            resultados[nombre] = self._resumen(latencias, consultas, errores, PRESUPUESTOS.get(nombre))
+
+        # El email sale del worker: se mide el vaciado de la cola con el backend locmem
+        mail.outbox = []
+        inicio = time.perf_counter()
+        enviados = 0
+        while True:
+            trabajos = reclamar_trabajos(limite=50)
+            if not trabajos:
+                break
+            enviados += procesar_lote(trabajos)
+        duracion = time.perf_counter() - inicio
+        resultados['enviar_pdf_worker'] = {
+            'n': enviados,
+            'emails': len(mail.outbox),
+            'media_ms': duracion / enviados * 1000 if enviados else 0.0,
+            'rps': enviados / duracion if duracion else 0.0,
+            'errores': options['iteraciones'] + options['calentamiento'] - enviados,
+        }
+        return resultados
+
+    def _resumen(self, latencias, consultas, errores, presupuesto):
+        return {
+            'n': len(latencias),
+            'media_ms': statistics.mean(latencias) * 1000,
+            'p50_ms': percentil(latencias, 50) * 1000,
+            'p95_ms': percentil(latencias, 95) * 1000,
+            'p99_ms': percentil(latencias, 99) * 1000,
+            'rps': len(latencias) / sum(latencias),
+            'consultas_media': statistics.mean(consultas),
+            'consultas_max': max(consultas),
+            'presupuesto_consultas': presupuesto,
+            'errores': errores,
+        }
+
+    def _imprimir(self, resultados):
+        for nombre, r in resultados.items():
+            if 'p50_ms' in r:
+                self.stdout.write(
+                    f"{nombre:18s} p50 {r['p50_ms']:7.1f} ms | p95 {r['p95_ms']:7.1f} ms | p99 {r['p99_ms']:7.1f} ms | "
+                    f"{r['rps']:6.1f} req/s | SQL máx {r['consultas_max']}/{r['presupuesto_consultas']} | "
+                    f"errores {r['errores']}"
+                )
+            else:
+                self.stdout.write(
+                    f"{nombre:18s} {r['n']} fichas enviadas ({r['emails']} emails) | {r['media_ms']:.1f} ms/ficha | "
+                    f"{r['rps']:.1f} fichas/s"
+                )
+
+    def _regresiones(self, resultados, ruta, tolerancia):
+        anterior = json.loads(Path(ruta).read_text())['resultados']
+        problemas = []
+        for nombre, r in resultados.items():
+            previo = anterior.get(nombre, {})
+            limite = previo.get('p95_ms', 0) * (1 + tolerancia)
+            if 'p95_ms' in r and previo.get('p95_ms') and r['p95_ms'] > max(limite, previo['p95_ms'] + MARGEN_MS):
+                problemas.append(f"{nombre}: p95 {previo['p95_ms']:.1f} -> {r['p95_ms']:.1f} ms")
+            if 'consultas_max' in r and 'consultas_max' in previo and r['consultas_max'] > previo['consultas_max']:
+                problemas.append(f"{nombre}: consultas {previo['consultas_max']} -> {r['consultas_max']}")
+        return problemas
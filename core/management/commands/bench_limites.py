@@ -0,0 +1,117 @@
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from core import limites
+from core.management.commands.bench_endpoints import base_temporal
+from core.management.commands.prueba_carga import percentil
+
+# Lo que el límite puede sumar a una petición
+PRESUPUESTO_MS = 0.5
+
+
+def _vista(request):
+    return HttpResponse('ok')
+
+
+class Command(BaseCommand):
+    help = (
+        "Costo del límite de tasa por petición con cada almacén (memoria, archivo, db): "
+        "latencia de consumir(), throughput con N hilos y sobrecosto del decorador sobre una vista vacía."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=5000)
+        parser.add_argument('--usuarios', type=int, default=500, help="Claves distintas (una cubeta por usuario).")
+        parser.add_argument('--hilos', type=int, default=4)
+        parser.add_argument('--almacenes', default='memoria,archivo,db')
+        parser.add_argument('--presupuesto-ms', type=float, default=PRESUPUESTO_MS)
+        parser.add_argument('--json', action='store_true', help="Imprime el resultado como JSON.")
+
+    def handle(self, *args, **options):
+        resultados = {}
+        with base_temporal(), tempfile.TemporaryDirectory() as directorio:
+            usuarios = User.objects.bulk_create(User(username=f'limite{i}') for i in range(options['usuarios']))
+            for nombre in options['almacenes'].split(','):
+                if nombre == 'archivo':
+                    almacen = limites.AlmacenArchivo(Path(directorio) / 'limites.sqlite3')
+                else:
+                    almacen = limites.crear_almacen(nombre)
+                almacen.vaciar()
+                resultados[nombre] = {
+                    **self._consumir(almacen, options['peticiones'], len(usuarios)),
+                    **self._concurrente(almacen, options['peticiones'], options['hilos']),
+                    **self._decorador(almacen, usuarios, options['peticiones']),
+                }
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultados, indent=2))
+        else:
+            for nombre, r in resultados.items():
+                self.stdout.write(
+                    f"{nombre:8s} consumir p50 {r['p50_us']:6.1f} µs | p99 {r['p99_us']:6.1f} µs | "
+                    f"{r['consumos_s']:8.0f} consumos/s con {options['hilos']} hilos | "
+                    f"sobrecosto por petición {r['sobrecosto_us']:6.1f} µs"
+                )
+        excedidos = [
+            f"{nombre}: {r['sobrecosto_us'] / 1000:.3f} ms" for nombre, r in resultados.items()
+            if r['sobrecosto_us'] / 1000 > options['presupuesto_ms']
+        ]
+        if excedidos:
+            raise CommandError(f"El límite supera {options['presupuesto_ms']} ms por petición: {'; '.join(excedidos)}")
+
+    def _consumir(self, almacen, peticiones, claves):
+        latencias = []
+        for i in range(peticiones):
+            inicio = time.perf_counter()
+            limites.consumir(f'bench:u{i % claves}', 10_000, 60_000, almacen)
+            latencias.append(time.perf_counter() - inicio)
+        return {'p50_us': percentil(latencias, 50) * 1e6, 'p99_us': percentil(latencias, 99) * 1e6}
+
+    def _concurrente(self, almacen, peticiones, hilos):
+        por_hilo = max(1, peticiones // hilos)
+        errores = []
+
+        def trabajar(n):
+            try:
+                for i in range(por_hilo):
+                    # Todos los hilos sobre las mismas claves: contención real por fila
+                    limites.consumir(f'bench:u{i % 50}', 10_000, 60_000, almacen)
+            except Exception as e:
+                errores.append(e)
+
+        trabajadores = [threading.Thread(target=trabajar, args=(n,)) for n in range(hilos)]
+        inicio = time.perf_counter()
+        for t in trabajadores:
+            t.start()
+        for t in trabajadores:
+            t.join()
+        if errores:
+            raise CommandError(f"Error con {hilos} hilos: {errores[0]}")
+        return {'consumos_s': por_hilo * hilos / (time.perf_counter() - inicio)}
+
+    def _decorador(self, almacen, usuarios, peticiones):
+        """Mediana de la vista con límite menos la mediana sin límite (misma petición)."""
+        previo = limites._almacen
+        limites._almacen = almacen
+        try:
+            limitada = limites.limitar_tasa('bench', capacidad=10_000, por_minuto=60_000)(_vista)
+            fabrica = RequestFactory()
+            tiempos = {'sin': [], 'con': []}
+            for i in range(peticiones):
+                request = fabrica.get('/')
+                request.user = usuarios[i % len(usuarios)]
+                for nombre, vista in (('sin', _vista), ('con', limitada)):
+                    inicio = time.perf_counter()
+                    vista(request)
+                    tiempos[nombre].append(time.perf_counter() - inicio)
+        finally:
+            limites._almacen = previo
+        return {'sobrecosto_us': (percentil(tiempos['con'], 50) - percentil(tiempos['sin'], 50)) * 1e6}
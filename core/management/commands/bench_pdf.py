@@ -0,0 +1,103 @@
+import json
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from alumnos.pdf import FICHA
+from core import pdf
+
+
+def _datos(i):
+    return {
+        'nombre': f'Nombre{i}',
+        'apellido': f'Apellido{i}',
+        'email': f'alumno{i}@example.com',
+        'documento': str(30000000 + i),
+        'fecha_nacimiento': '2001-02-03',
+        'creado_por': 'bench',
+    }
+
+
+def _pagina_anterior(p, datos):
+    # Cómo se dibujaba antes: todo a mano, fuente y etiquetas en cada página
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(50, 800, "Ficha del Alumno")
+    p.setFont("Helvetica", 12)
+    p.drawString(50, 770, f"Nombre: {datos['nombre']}")
+    p.drawString(50, 750, f"Apellido: {datos['apellido']}")
+    p.drawString(50, 730, f"Email: {datos['email']}")
+    p.drawString(50, 710, f"Documento: {datos['documento']}")
+    p.drawString(50, 690, f"Fecha Nacimiento: {datos['fecha_nacimiento']}")
+    p.drawString(50, 670, f"Creado por: {datos['creado_por']}")
+    p.showPage()
+
+
+def _documento_anterior(datos):
+    # canvas.Canvas de ReportLab tal cual (con rl_config.useA85 como lo dejó core.pdf)
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4)
+    _pagina_anterior(p, datos)
+    p.save()
+    return buffer.getvalue()
+
+
+def _combinado_anterior(documentos):
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4)
+    for datos in documentos:
+        _pagina_anterior(p, datos)
+    p.save()
+    return buffer.getvalue()
+
+
+def _combinado_plantilla(documentos):
+    buffer = BytesIO()
+    pdf.escribir_paginas(buffer, FICHA, documentos)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        "Documentos por segundo generando fichas: canvas a mano por documento (como antes), "
+        "plantilla con beginForm/doForm, lote en el proceso, lote en el pool de procesos y PDF combinado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documentos', type=int, default=2000)
+        parser.add_argument('--json', action='store_true', help="Imprime el resultado como JSON.")
+
+    def handle(self, *args, **options):
+        documentos = [_datos(i) for i in range(options['documentos'])]
+        # Arranca el pool antes de medir: en los workers queda vivo entre lotes
+        pdf.habilitar_pool()
+        pdf.renderizar_lote(FICHA, documentos[:pdf.PROCESOS * pdf.DOCUMENTOS_POR_TAREA], en_paralelo=True)
+
+        variantes = {
+            'anterior: canvas por documento': lambda: [_documento_anterior(d) for d in documentos],
+            'plantilla por documento': lambda: [pdf.renderizar(FICHA, d) for d in documentos],
+            'lote en el proceso': lambda: pdf.renderizar_lote(FICHA, documentos, en_paralelo=False),
+            f'lote en pool ({pdf.PROCESOS} procesos)': lambda: pdf.renderizar_lote(FICHA, documentos, en_paralelo=True),
+            'anterior: PDF combinado': lambda: [_combinado_anterior(documentos)],
+            'plantilla: PDF combinado': lambda: [_combinado_plantilla(documentos)],
+        }
+        resultados = {}
+        for nombre, funcion in variantes.items():
+            inicio = time.perf_counter()
+            pdfs = funcion()
+            segundos = time.perf_counter() - inicio
+            resultados[nombre] = {
+                'documentos_s': len(documentos) / segundos,
+                'segundos': segundos,
+                'bytes': sum(len(b) for b in pdfs),
+            }
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultados, indent=2))
+            return
+        for nombre, r in resultados.items():
+            self.stdout.write(
+                f"{nombre:34s} {r['documentos_s']:8.0f} docs/s | {r['segundos']:6.2f} s | {r['bytes'] / 1024:8.0f} KiB"
+            )
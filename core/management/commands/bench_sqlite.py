@@ -0,0 +1,122 @@
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.db import aplicar_pragmas, pragmas
+
+# Configuración por defecto de Django: journal DELETE, synchronous FULL,
+# BEGIN diferido y timeout de 5 s.
+CONFIGURACIONES = {
+    'antes': {'pragmas': {}, 'begin': 'BEGIN', 'timeout': 5},
+    'despues': {'pragmas': None, 'begin': 'BEGIN IMMEDIATE', 'timeout': 20},
+}
+FILAS_INICIALES = 10000
+
+
+def _preparar(ruta, configuracion):
+    con = sqlite3.connect(ruta, isolation_level=None)
+    aplicar_pragmas(con, configuracion['pragmas'])
+    con.execute("CREATE TABLE alumno (id INTEGER PRIMARY KEY, usuario INTEGER, nombre TEXT, creado REAL)")
+    con.execute("CREATE INDEX alumno_usuario ON alumno (usuario, creado)")
+    con.execute("BEGIN")
+    con.executemany(
+        "INSERT INTO alumno (usuario, nombre, creado) VALUES (?, ?, ?)",
+        ((i % 20, f"alumno {i}", time.time()) for i in range(FILAS_INICIALES)),
+    )
+    con.execute("COMMIT")
+    con.close()
+
+
+def _worker(ruta, configuracion, segundos, ratio_lecturas, semilla, cola):
+    azar = random.Random(semilla)
+    con = sqlite3.connect(ruta, timeout=configuracion['timeout'], isolation_level=None)
+    aplicar_pragmas(con, configuracion['pragmas'])
+    lecturas = escrituras = errores = 0
+    fin = time.monotonic() + segundos
+    while time.monotonic() < fin:
+        usuario = azar.randrange(20)
+        try:
+            if azar.random() < ratio_lecturas:
+                con.execute(
+                    "SELECT id, nombre FROM alumno WHERE usuario = ? ORDER BY creado DESC LIMIT 50", (usuario,)
+                ).fetchall()
+                lecturas += 1
+            else:
+                # Lee y escribe en la misma transacción, como reclamar un trabajo o un get_or_create
+                con.execute(configuracion['begin'])
+                con.execute("SELECT count(*) FROM alumno WHERE usuario = ?", (usuario,)).fetchone()
+                con.execute(
+                    "INSERT INTO alumno (usuario, nombre, creado) VALUES (?, ?, ?)",
+                    (usuario, "nuevo", time.time()),
+                )
+                con.execute("COMMIT")
+                escrituras += 1
+        except sqlite3.OperationalError:
+            errores += 1
+            if con.in_transaction:
+                con.execute("ROLLBACK")
+    con.close()
+    cola.put((lecturas, escrituras, errores))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el throughput de lecturas y escrituras de SQLite con N procesos concurrentes, "
+        "con la configuración por defecto de Django y con la de core/db.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Procesos concurrentes.")
+        parser.add_argument('--segundos', type=float, default=5.0, help="Duración de cada corrida.")
+        parser.add_argument('--lecturas', type=float, default=0.8, help="Proporción de operaciones de lectura.")
+        parser.add_argument('--json', action='store_true', help="Imprime el resultado como JSON.")
+
+    def handle(self, *args, **options):
+        resultados = {}
+        for nombre, configuracion in CONFIGURACIONES.items():
+            if configuracion['pragmas'] is None:
+                configuracion = dict(configuracion, pragmas=pragmas())
+            resultados[nombre] = self._correr(configuracion, options)
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultados, indent=2))
+            return
+        for nombre, r in resultados.items():
+            self.stdout.write(
+                f"{nombre:8s} {r['workers']} workers: {r['lecturas_s']:8.0f} lecturas/s | "
+                f"{r['escrituras_s']:7.0f} escrituras/s | {r['errores']} errores 'database is locked'"
+            )
+
+    def _correr(self, configuracion, options):
+        workers = max(1, options['workers'])
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'bench.sqlite3')
+            _preparar(ruta, configuracion)
+            cola = multiprocessing.Queue()
+            procesos = [
+                multiprocessing.Process(
+                    target=_worker,
+                    args=(ruta, configuracion, options['segundos'], options['lecturas'], i, cola),
+                )
+                for i in range(workers)
+            ]
+            for proceso in procesos:
+                proceso.start()
+            totales = [cola.get() for _ in procesos]
+            for proceso in procesos:
+                proceso.join()
+
+        lecturas, escrituras, errores = (sum(t[i] for t in totales) for i in range(3))
+        return {
+            'workers': workers,
+            'segundos': options['segundos'],
+            'lecturas_s': lecturas / options['segundos'],
+            'escrituras_s': escrituras / options['segundos'],
+            'errores': errores,
+        }
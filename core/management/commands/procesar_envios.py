@@ -0,0 +1,34 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from core import pdf
+from core.envios import procesar_lote, reclamar_trabajos
+
+
+class Command(BaseCommand):
+    help = "Procesa la cola de envíos de email (TrabajoEnvio) con un pool de workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Hilos enviando en paralelo.")
+        parser.add_argument('--lote', type=int, default=10, help="Trabajos por worker y por conexión SMTP.")
+        parser.add_argument('--intervalo', type=float, default=2.0, help="Segundos de espera si la cola está vacía.")
+        parser.add_argument('--once', action='store_true', help="Procesa lo pendiente y termina.")
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        lote = max(1, options['lote'])
+        pdf.habilitar_pool()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                trabajos = reclamar_trabajos(limite=workers * lote)
+                if trabajos:
+                    lotes = [trabajos[i:i + lote] for i in range(0, len(trabajos), lote)]
+                    enviados = sum(pool.map(procesar_lote, lotes))
+                    self.stdout.write(f"{enviados}/{len(trabajos)} envíos completados.")
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['intervalo'])
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+from django.core.management.base import BaseCommand
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga HTTP contra un servidor en marcha (por ejemplo gunicorn sync vs. "
+        "gunicorn + UvicornWorker). En la URL, {n} se reemplaza por el número de petición."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help="Ej: http://127.0.0.1:8000/scraper/?palabra=Termino{n}")
+        parser.add_argument('--total', type=int, default=200, help="Peticiones a realizar.")
+        parser.add_argument('--concurrencia', type=int, default=50, help="Peticiones simultáneas.")
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument('--cookie', action='append', default=[], help="nombre=valor (p. ej. sessionid=...).")
+        parser.add_argument('--json', action='store_true', help="Imprime el resultado como JSON.")
+
+    def handle(self, *args, **options):
+        resultado = asyncio.run(self._correr(options))
+        if options['json']:
+            self.stdout.write(json.dumps(resultado, indent=2))
+            return
+        self.stdout.write(
+            f"{resultado['total']} peticiones, concurrencia {resultado['concurrencia']}: "
+            f"{resultado['rps']:.1f} req/s | p50 {resultado['p50_ms']:.0f} ms | "
+            f"p95 {resultado['p95_ms']:.0f} ms | p99 {resultado['p99_ms']:.0f} ms | "
+            f"máx {resultado['max_ms']:.0f} ms | errores {resultado['errores']}"
+        )
+
+    async def _correr(self, options):
+        total = max(1, options['total'])
+        concurrencia = max(1, options['concurrencia'])
+        cookies = dict(c.split('=', 1) for c in options['cookie'])
+        latencias = []
+        errores = 0
+        semaforo = asyncio.Semaphore(concurrencia)
+
+        limites = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+        async with httpx.AsyncClient(timeout=options['timeout'], limits=limites, cookies=cookies) as cliente:
+            async def una(n):
+                nonlocal errores
+                async with semaforo:
+                    inicio = time.perf_counter()
+                    try:
+                        respuesta = await cliente.get(options['url'].replace('{n}', str(n)))
+                        if respuesta.status_code >= 400:
+                            errores += 1
+                    except httpx.HTTPError:
+                        errores += 1
+                    latencias.append(time.perf_counter() - inicio)
+
+            inicio = time.perf_counter()
+            await asyncio.gather(*(una(n) for n in range(total)))
+            duracion = time.perf_counter() - inicio
+
+        return {
+            'url': options['url'],
+            'total': total,
+            'concurrencia': concurrencia,
+            'duracion_s': duracion,
+            'rps': total / duracion,
+            'errores': errores,
+            'media_ms': statistics.mean(latencias) * 1000,
+            'p50_ms': percentil(latencias, 50) * 1000,
+            'p95_ms': percentil(latencias, 95) * 1000,
+            'p99_ms': percentil(latencias, 99) * 1000,
+            'max_ms': max(latencias) * 1000,
+        }
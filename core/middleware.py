@@ -0,0 +1,97 @@
+"""Middleware de instrumentación: tiempos por petición, Server-Timing y cProfile opcional."""
+import cProfile
+import logging
+import os
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import instrumentacion
+
+logger = logging.getLogger(__name__)
+
+# Server-Timing expone tiempos internos: por defecto sólo en DEBUG o para staff
+SERVER_TIMING = getattr(settings, 'INSTRUMENTACION_SERVER_TIMING', settings.DEBUG)
+# Fracción de peticiones (sync) que se perfilan con cProfile; 0 = nunca
+PERFIL_MUESTREO = getattr(settings, 'INSTRUMENTACION_PERFIL_MUESTREO', 0.0)
+PERFIL_DIR = getattr(settings, 'INSTRUMENTACION_PERFIL_DIR', os.path.join(settings.BASE_DIR, 'perfiles'))
+# Parámetro GET con el que staff pide el perfil de una petición (escribe un archivo en disco)
+PARAMETRO_PERFIL = '_perfil'
+
+
+def _es_staff(request):
+    usuario = getattr(request, 'user', None)
+    return bool(usuario is not None and usuario.is_authenticated and usuario.is_staff)
+
+
+def _vista(request):
+    match = getattr(request, 'resolver_match', None)
+    return (match.view_name or match._func_path) if match else 'sin_ruta'
+
+
+class InstrumentacionMiddleware:
+    """Mide cada petición (total, SQL, HTTP saliente, email, PDF).
+
+    Debe ir primero en ``MIDDLEWARE`` para incluir al resto. En respuestas en
+    streaming mide hasta que la vista devuelve, no el envío del cuerpo.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicion, token = instrumentacion.iniciar()
+        try:
+            response = self.get_response(request)
+            perfil = getattr(request, '_perfil', None)
+            if perfil is not None:
+                perfil.disable()
+                self._guardar_perfil(perfil, request)
+            return self._completar(request, response, medicion, SERVER_TIMING or _es_staff(request))
+        finally:
+            instrumentacion.terminar(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Acá request.user ya está resuelto; el perfil cubre la vista.
+        # cProfile sólo ve el hilo actual: en modo async no se perfila.
+        if iscoroutinefunction(self):
+            return None
+        pedido = PARAMETRO_PERFIL in request.GET and _es_staff(request)
+        if pedido or (PERFIL_MUESTREO and random.random() < PERFIL_MUESTREO):
+            request._perfil = cProfile.Profile()
+            request._perfil.enable()
+        return None
+
+    async def __acall__(self, request):
+        medicion, token = instrumentacion.iniciar()
+        try:
+            response = await self.get_response(request)
+            mostrar = SERVER_TIMING
+            if not mostrar and hasattr(request, 'auser'):
+                usuario = await request.auser()
+                mostrar = usuario.is_authenticated and usuario.is_staff
+            return self._completar(request, response, medicion, mostrar)
+        finally:
+            instrumentacion.terminar(token)
+
+    def _completar(self, request, response, medicion, mostrar_timing):
+        instrumentacion.registro.peticion(_vista(request), request.method, response.status_code, medicion.total())
+        if mostrar_timing:
+            response['Server-Timing'] = medicion.server_timing()
+        return response
+
+    def _guardar_perfil(self, perfil, request):
+        os.makedirs(PERFIL_DIR, exist_ok=True)
+        nombre = f"{time.strftime('%Y%m%d-%H%M%S')}-{_vista(request).replace(':', '_')}-{os.getpid()}.prof"
+        ruta = os.path.join(PERFIL_DIR, nombre)
+        perfil.dump_stats(ruta)
+        logger.info("Perfil de %s guardado en %s", request.path, ruta)
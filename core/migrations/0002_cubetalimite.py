@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CubetaLimite',
+            fields=[
+                ('clave', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('fichas', models.FloatField()),
+                ('actualizado', models.FloatField(db_index=True)),
+                ('permitido', models.PositiveSmallIntegerField(default=1)),
+            ],
+            options={
+                'verbose_name': 'Cubeta de límite de tasa',
+                'verbose_name_plural': 'Cubetas de límite de tasa',
+            },
+        ),
+    ]
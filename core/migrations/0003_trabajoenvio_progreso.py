@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_cubetalimite'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoenvio',
+            name='enviados',
+            field=models.PositiveIntegerField(default=0, verbose_name='Mensajes enviados'),
+        ),
+        migrations.AddField(
+            model_name='trabajoenvio',
+            name='progreso',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Progreso'),
+        ),
+    ]
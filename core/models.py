@@ -1,3 +1,65 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+
+class TrabajoEnvio(models.Model):
+    """Email (con PDF adjunto) pendiente de enviar por el worker de `procesar_envios`."""
+
+    PENDIENTE = 'pendiente'
+    EN_PROCESO = 'en_proceso'
+    ENVIADO = 'enviado'
+    FALLIDO = 'fallido'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_PROCESO, 'En proceso'),
+        (ENVIADO, 'Enviado'),
+        (FALLIDO, 'Fallido'),
+    ]
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    tipo = models.CharField("Tipo", max_length=50)
+    payload = models.JSONField("Datos", default=dict)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='trabajos_envio',
+    )
+    estado = models.CharField("Estado", max_length=20, choices=ESTADOS, default=PENDIENTE)
+    intentos = models.PositiveIntegerField("Intentos", default=0)
+    max_intentos = models.PositiveIntegerField("Máximo de intentos", default=5)
+    proximo_intento = models.DateTimeField("Próximo intento", default=timezone.now)
+    bloqueado_hasta = models.DateTimeField(null=True, blank=True)
+    ultimo_error = models.TextField("Último error", blank=True)
+    # Envíos masivos: mensajes ya enviados y dónde retomar al reintentar (ver core.envios)
+    enviados = models.PositiveIntegerField("Mensajes enviados", default=0)
+    progreso = models.CharField("Progreso", max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # El worker busca: WHERE estado = 'pendiente' AND proximo_intento <= now
+            models.Index(fields=['estado', 'proximo_intento'], name='envio_estado_proximo_idx'),
+        ]
+        verbose_name = "Trabajo de envío"
+        verbose_name_plural = "Trabajos de envío"
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.estado})"
+
+
+class CubetaLimite(models.Model):
+    """Token bucket de ``core.limites`` (almacén 'db'): fichas disponibles de una clave endpoint:usuario."""
+
+    clave = models.CharField(max_length=255, primary_key=True)
+    fichas = models.FloatField()
+    # Segundos desde epoch (time.time()): la recarga se calcula en la misma sentencia SQL
+    actualizado = models.FloatField(db_index=True)
+    # Resultado de la última consulta (1/0), devuelto por RETURNING
+    permitido = models.PositiveSmallIntegerField(default=1)
 
-# Create your models here.
+    class Meta:
+        verbose_name = "Cubeta de límite de tasa"
+        verbose_name_plural = "Cubetas de límite de tasa"
@@ -0,0 +1,197 @@
+"""Motor de PDFs compartido (ReportLab) para fichas y reportes.
+
+Una ``Plantilla`` separa el diseño en dos partes:
+
+- ``fondo(canvas)``: lo que es igual en todas las páginas (títulos,
+  etiquetas, líneas). La primera página de un canvas lo dibuja directo; a
+  partir de la segunda se define como XObject (``beginForm``) y cada página
+  lo referencia con ``doForm``. En un PDF de una página el XObject sólo
+  agregaría peso; en uno de muchas, el fondo se escribe una vez.
+- ``contenido(canvas, datos, salto)``: los valores de un documento.
+  ``salto()`` cierra la página y abre otra con el fondo.
+
+``datos`` es un dict de valores simples (no modelos), así un lote se puede
+repartir en un pool de procesos. Las fuentes son las Type 1 estándar: sus
+métricas se cargan una vez por proceso y los anchos de las etiquetas se
+calculan al importar cada plantilla. Los streams se guardan sólo con Flate:
+al importar el módulo se apaga ``rl_config.useA85``, la capa ASCII85 que
+ReportLab agrega por defecto (en Python puro, sin ``rl_accel``, es la mitad
+del tiempo de ``save()`` y suma un 25% de bytes). Es una opción global de
+ReportLab: vale para todo el proceso, y ``PDF_ASCII85 = True`` la deja
+encendida.
+
+- ``renderizar``: un documento, devuelve los bytes.
+- ``escribir_paginas``: muchos documentos en un único PDF (una sola pasada
+  por el canvas, el fondo definido una vez).
+- ``renderizar_lote``: muchos documentos separados; a partir de
+  ``PDF_UMBRAL_PROCESOS`` se reparten en un ``ProcessPoolExecutor``.
+
+El pool sólo existe en los procesos que llaman a ``habilitar_pool`` (los
+comandos de worker): en los workers web cada uno arrancaría el suyo y serían
+workers × ``PDF_PROCESOS`` procesos, así que ahí los lotes se renderizan en
+el proceso y los muy grandes van a la cola de trabajos. Se crea la primera
+vez que hace falta y queda vivo para los lotes siguientes. Usa
+``forkserver``: hacer ``fork`` de un proceso con hilos (el pool de envíos,
+el del scraper) puede heredar locks tomados.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from django.conf import settings
+from reportlab import rl_config
+from reportlab.pdfgen import canvas
+
+from .instrumentacion import medir
+
+logger = logging.getLogger(__name__)
+
+# Lotes más chicos que esto se renderizan en el proceso actual: arrancar el
+# pool y serializar los datos cuesta más que lo que se gana
+UMBRAL_PROCESOS = getattr(settings, 'PDF_UMBRAL_PROCESOS', 200)
+PROCESOS = getattr(settings, 'PDF_PROCESOS', None) or min(os.cpu_count() or 1, 4)
+CONTEXTO_PROCESOS = getattr(settings, 'PDF_CONTEXTO_PROCESOS', 'forkserver')
+DOCUMENTOS_POR_TAREA = 50
+
+ASCII85 = bool(getattr(settings, 'PDF_ASCII85', False))
+rl_config.useA85 = int(ASCII85)
+
+_pool = None
+_pool_habilitado = False
+_pool_lock = threading.Lock()
+
+
+def habilitar_pool():
+    """Permite usar el pool de procesos en este proceso (llamar desde comandos de worker)."""
+    global _pool_habilitado
+    _pool_habilitado = True
+
+
+class CanvasPlantilla(canvas.Canvas):
+    """Canvas que lleva la cuenta de las páginas abiertas con cada fondo."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # nombre de plantilla -> páginas abiertas con ese fondo
+        self.paginas_con_fondo = {}
+
+
+class Plantilla:
+    def __init__(self, nombre, pagesize, contenido, fondo=None):
+        self.nombre = nombre
+        self.pagesize = pagesize
+        self.contenido = contenido
+        self.fondo = fondo
+
+    def _abrir_pagina(self, c):
+        if self.fondo is None:
+            return
+        anteriores = c.paginas_con_fondo.get(self.nombre, 0)
+        c.paginas_con_fondo[self.nombre] = anteriores + 1
+        if anteriores == 0:
+            self.fondo(c)
+            return
+        if anteriores == 1:
+            c.beginForm(self.nombre)
+            self.fondo(c)
+            c.endForm()
+        c.doForm(self.nombre)
+
+    def dibujar(self, c, datos):
+        """Dibuja un documento (una o más páginas) en el canvas y cierra la última página."""
+        def salto():
+            c.showPage()
+            self._abrir_pagina(c)
+
+        self._abrir_pagina(c)
+        self.contenido(c, datos, salto)
+        c.showPage()
+
+    def canvas(self, destino):
+        return CanvasPlantilla(destino, pagesize=self.pagesize)
+
+
+def _renderizar(plantilla, datos):
+    buffer = BytesIO()
+    c = plantilla.canvas(buffer)
+    plantilla.dibujar(c, datos)
+    c.save()
+    return buffer.getvalue()
+
+
+def renderizar(plantilla, datos):
+    """Bytes del PDF de un documento."""
+    with medir('pdf'):
+        return _renderizar(plantilla, datos)
+
+
+def escribir_paginas(destino, plantilla, documentos):
+    """Escribe en ``destino`` (archivo o buffer) un único PDF con todos los documentos."""
+    with medir('pdf'):
+        c = plantilla.canvas(destino)
+        for datos in documentos:
+            plantilla.dibujar(c, datos)
+        c.save()
+
+
+def _renderizar_tanda(plantilla, tanda):
+    return [_renderizar(plantilla, datos) for datos in tanda]
+
+
+def _inicializar_worker():
+    # Con 'spawn' (macOS, Windows) el proceso hijo arranca sin Django configurado
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def _obtener_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PROCESOS,
+                mp_context=multiprocessing.get_context(CONTEXTO_PROCESOS),
+                initializer=_inicializar_worker,
+            )
+        return _pool
+
+
+def _descartar_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def renderizar_lote(plantilla, documentos, en_paralelo=None):
+    """Bytes de un PDF por documento, en el mismo orden.
+
+    ``plantilla`` tiene que ser un objeto de nivel de módulo (con funciones
+    de nivel de módulo) para poder enviarse a los procesos del pool.
+    ``en_paralelo`` fuerza o evita el pool; por defecto se usa desde
+    ``UMBRAL_PROCESOS`` documentos si el proceso llamó a ``habilitar_pool``.
+    """
+    documentos = list(documentos)
+    if en_paralelo is None:
+        en_paralelo = _pool_habilitado and PROCESOS > 1 and len(documentos) >= UMBRAL_PROCESOS
+    with medir('pdf'):
+        if not en_paralelo:
+            return _renderizar_tanda(plantilla, documentos)
+        tandas = [documentos[i:i + DOCUMENTOS_POR_TAREA] for i in range(0, len(documentos), DOCUMENTOS_POR_TAREA)]
+        pool = _obtener_pool()
+        try:
+            resultados = pool.map(_renderizar_tanda, [plantilla] * len(tandas), tandas)
+            return [pdf for tanda in resultados for pdf in tanda]
+        except BrokenProcessPool:
+            # Un proceso murió (OOM, kill): se descarta el pool y el lote se hace acá
+            logger.warning("Pool de PDFs roto; se renderiza el lote en el proceso actual")
+            _descartar_pool(pool)
+            return _renderizar_tanda(plantilla, documentos)
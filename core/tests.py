@@ -1,3 +1,189 @@
-from django.test import TestCase
+from datetime import timedelta
+from smtplib import SMTPRecipientsRefused
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import envios
+from .models import TrabajoEnvio
+
+
+@envios.registrar('prueba')
+def _mensaje_prueba(trabajo):
+    if trabajo.payload.get('permanente'):
+        raise envios.ErrorPermanente("No hay a quién enviarlo.")
+    if trabajo.payload.get('falla'):
+        raise SMTPRecipientsRefused({trabajo.payload['para']: (550, b'rechazado')})
+    return EmailMessage('Prueba', 'Cuerpo', to=[trabajo.payload['para']])
+
+
+@envios.registrar('prueba_masivo')
+def _mensajes_prueba_masivo(trabajo):
+    for numero in range(int(trabajo.progreso or 0) + 1, trabajo.payload['total'] + 1):
+        if numero == trabajo.payload.get('falla_en') and trabajo.intentos == 1:
+            raise SMTPRecipientsRefused({f'a{numero}@example.com': (451, b'intente luego')})
+        yield numero, EmailMessage('Prueba', 'Cuerpo', to=[f'a{numero}@example.com'])
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class ColaEnviosTests(TestCase):
+
+    def test_encolar_no_envia(self):
+        trabajo = envios.encolar('prueba', {'para': 'a@example.com'})
+        self.assertEqual(trabajo.estado, TrabajoEnvio.PENDIENTE)
+        self.assertEqual(trabajo.max_intentos, envios.MAX_INTENTOS)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_encolar_tipo_desconocido(self):
+        with self.assertRaises(ValueError):
+            envios.encolar('no_existe', {})
+
+    def test_procesar_envia_y_marca_enviado(self):
+        envios.encolar('prueba', {'para': 'a@example.com'})
+        trabajos = envios.reclamar_trabajos()
+        self.assertEqual(envios.procesar_lote(trabajos), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['a@example.com'])
+        trabajo = TrabajoEnvio.objects.get()
+        self.assertEqual((trabajo.estado, trabajo.intentos), (TrabajoEnvio.ENVIADO, 1))
+        self.assertIsNone(trabajo.bloqueado_hasta)
+
+    def test_reclamar_no_toma_dos_veces(self):
+        envios.encolar('prueba', {'para': 'a@example.com'})
+        self.assertEqual(len(envios.reclamar_trabajos()), 1)
+        self.assertEqual(envios.reclamar_trabajos(), [])
+
+    def test_reclamar_retoma_bloqueo_vencido(self):
+        trabajo = envios.encolar('prueba', {'para': 'a@example.com'})
+        envios.reclamar_trabajos()
+        TrabajoEnvio.objects.filter(pk=trabajo.pk).update(bloqueado_hasta=timezone.now() - timedelta(seconds=1))
+        self.assertEqual([t.pk for t in envios.reclamar_trabajos()], [trabajo.pk])
+
+    def test_reclamar_respeta_proximo_intento(self):
+        envios.encolar('prueba', {'para': 'a@example.com'})
+        TrabajoEnvio.objects.update(proximo_intento=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(envios.reclamar_trabajos(), [])
+
+    def test_error_reprograma_con_backoff(self):
+        envios.encolar('prueba', {'para': 'a@example.com', 'falla': True})
+        antes = timezone.now()
+        with self.assertLogs('core.envios', 'ERROR'):
+            self.assertEqual(envios.procesar_lote(envios.reclamar_trabajos()), 0)
+        trabajo = TrabajoEnvio.objects.get()
+        self.assertEqual((trabajo.estado, trabajo.intentos), (TrabajoEnvio.PENDIENTE, 1))
+        self.assertIn('rechazado', trabajo.ultimo_error)
+        self.assertGreaterEqual(trabajo.proximo_intento, antes + timedelta(seconds=envios.BACKOFF_BASE * 0.9))
+        self.assertEqual(envios.reclamar_trabajos(), [])
+
+    def test_agotar_intentos_marca_fallido(self):
+        trabajo = envios.encolar('prueba', {'para': 'a@example.com', 'falla': True})
+        for _ in range(trabajo.max_intentos):
+            TrabajoEnvio.objects.update(proximo_intento=timezone.now())
+            with self.assertLogs('core.envios', 'ERROR'):
+                envios.procesar_lote(envios.reclamar_trabajos())
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.intentos), (TrabajoEnvio.FALLIDO, trabajo.max_intentos))
+        self.assertEqual(envios.reclamar_trabajos(), [])
+
+    def test_error_permanente_no_reintenta(self):
+        envios.encolar('prueba', {'para': 'a@example.com', 'permanente': True})
+        with self.assertLogs('core.envios', 'ERROR'):
+            envios.procesar_lote(envios.reclamar_trabajos())
+        trabajo = TrabajoEnvio.objects.get()
+        self.assertEqual((trabajo.estado, trabajo.intentos), (TrabajoEnvio.FALLIDO, 1))
+        self.assertIn('No hay a quién', trabajo.ultimo_error)
+
+    def test_worker_caido_cuenta_el_intento(self):
+        trabajo = envios.encolar('prueba', {'para': 'a@example.com'})
+        # El worker reclama y muere sin llegar a procesar_trabajo, una y otra vez
+        for intento in range(1, trabajo.max_intentos + 1):
+            self.assertEqual([t.intentos for t in envios.reclamar_trabajos()], [intento])
+            TrabajoEnvio.objects.update(bloqueado_hasta=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(envios.reclamar_trabajos(), [])
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.intentos), (TrabajoEnvio.FALLIDO, trabajo.max_intentos))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_reintento_masivo_no_reenvia(self):
+        trabajo = envios.encolar('prueba_masivo', {'total': 5, 'falla_en': 4})
+        with self.assertLogs('core.envios', 'ERROR'):
+            envios.procesar_lote(envios.reclamar_trabajos())
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.enviados, trabajo.progreso), (TrabajoEnvio.PENDIENTE, 3, '3'))
+
+        TrabajoEnvio.objects.update(proximo_intento=timezone.now())
+        envios.procesar_lote(envios.reclamar_trabajos())
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.enviados), (TrabajoEnvio.ENVIADO, 5))
+        self.assertEqual([m.to[0] for m in mail.outbox], [f'a{n}@example.com' for n in range(1, 6)])
+
+    def test_renovar_bloqueo(self):
+        trabajo = envios.encolar('prueba', {'para': 'a@example.com'})
+        [trabajo] = envios.reclamar_trabajos()
+        reclamado = trabajo.bloqueado_hasta
+        with self.assertNumQueries(0):
+            envios.renovar_bloqueo(trabajo)
+        casi_vencido = timezone.now() + timedelta(seconds=1)
+        TrabajoEnvio.objects.update(bloqueado_hasta=casi_vencido)
+        trabajo.bloqueado_hasta = casi_vencido
+        envios.renovar_bloqueo(trabajo)
+        trabajo.refresh_from_db()
+        self.assertGreaterEqual(trabajo.bloqueado_hasta, reclamado)
+        # Pasado el bloqueo anterior sigue tomado
+        with mock.patch('core.envios.timezone.now', return_value=casi_vencido + timedelta(seconds=1)):
+            self.assertEqual(envios.reclamar_trabajos(), [])
+
+    def test_calcular_backoff(self):
+        with mock.patch('core.envios.random.uniform', return_value=1.0):
+            self.assertEqual(envios.calcular_backoff(1), envios.BACKOFF_BASE)
+            self.assertEqual(envios.calcular_backoff(3), envios.BACKOFF_BASE * 4)
+            self.assertEqual(envios.calcular_backoff(100), envios.BACKOFF_MAX)
+
+
+class EstadoEnvioTests(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('ana', password='x')
+        self.trabajo = envios.encolar('prueba', {'para': 'a@example.com'}, usuario=self.usuario)
+        self.url = reverse('core:estado_envio', args=[self.trabajo.token])
+
+    def test_estado_json(self):
+        self.client.force_login(self.usuario)
+        datos = self.client.get(self.url).json()
+        self.assertEqual(datos['token'], str(self.trabajo.token))
+        self.assertEqual(datos['estado'], TrabajoEnvio.PENDIENTE)
+        self.assertEqual((datos['intentos'], datos['max_intentos']), (0, envios.MAX_INTENTOS))
+        self.assertIsNotNone(datos['proximo_intento'])
+
+    def test_estado_de_otro_usuario(self):
+        self.client.force_login(User.objects.create_user('beto', password='x'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+# Sin DEBUG el storage con manifest exige haber corrido collectstatic
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class PerfilPedidoTests(TestCase):
+
+    def _pedir(self):
+        with mock.patch('core.middleware.InstrumentacionMiddleware._guardar_perfil') as guardar:
+            self.client.get(reverse('core:about'), {'_perfil': '1'})
+        return guardar.called
+
+    def test_anonimo_no_perfila(self):
+        self.assertFalse(self._pedir())
+
+    def test_usuario_comun_no_perfila(self):
+        self.client.force_login(User.objects.create_user('ana', password='x'))
+        self.assertFalse(self._pedir())
+
+    def test_staff_perfila(self):
+        self.client.force_login(User.objects.create_user('ana', password='x', is_staff=True))
+        self.assertTrue(self._pedir())
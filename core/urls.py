@@ -7,4 +7,5 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('about/', views.about, name='about'),
     path('dashboard/', views.dashboard_redirect, name='dashboard'),
+    path('envios/<uuid:token>/', views.estado_envio, name='estado_envio'),
 ]
\ No newline at end of file
@@ -1,5 +1,12 @@
-from django.shortcuts import render
+from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.utils.crypto import constant_time_compare
+
+from . import instrumentacion
+from .envios import estado_trabajo
+from .models import TrabajoEnvio
 
 def home(request):
     return render(request, 'home.html')
@@ -10,3 +17,25 @@ def about(request):
 @login_required
 def dashboard_redirect(request):
     return render(request, 'dashboard_public.html')
+
+def estado_envio(request, token):
+    """Estado de un envío encolado, consultado por polling desde la UI."""
+    trabajo = get_object_or_404(TrabajoEnvio, token=token)
+    if trabajo.usuario_id and trabajo.usuario_id != request.user.pk:
+        return JsonResponse({'error': 'No autorizado.'}, status=404)
+    return JsonResponse(estado_trabajo(trabajo))
+
+def metricas(request):
+    """Métricas del proceso en formato Prometheus.
+
+    Con ``METRICAS_TOKEN`` configurado exige ``Authorization: Bearer <token>``;
+    si no, sólo responde a peticiones locales.
+    """
+    token = getattr(settings, 'METRICAS_TOKEN', '')
+    if token:
+        permitido = constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    else:
+        permitido = request.META.get('REMOTE_ADDR') in ('127.0.0.1', '::1')
+    if not permitido:
+        return HttpResponseForbidden()
+    return HttpResponse(instrumentacion.exportar_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
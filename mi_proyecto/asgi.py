@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_proyecto.settings')
+# Bajo ASGI se usan las versiones async de buscar, enviar_resultados y enviar_pdf
+os.environ.setdefault('DJANGO_VISTAS_ASYNC', '1')
 
 application = get_asgi_application()
@@ -1,3 +1,4 @@
+import importlib.util
 import os
 from pathlib import Path
 
@@ -5,7 +6,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 
 SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret')
-DEBUG = 'True'
+# Booleano real: en producción DJANGO_DEBUG=0 (un string como 'False' sería verdadero)
+DEBUG = os.getenv('DJANGO_DEBUG', '1') == '1'
 ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
 
 
@@ -20,10 +22,14 @@ INSTALLED_APPS = [
     'core',
     'alumnos',
     'scraper',
+    'accounts',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentacionMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Sirve /static/ antes de sesiones y auth: sin consultas a la base por archivo
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -38,8 +44,15 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [ BASE_DIR / "templates"],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Plantillas compiladas una vez por proceso. En desarrollo el autoreload
+            # vacía esta cache al editar un .html, así que puede quedar siempre activa.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -51,14 +64,42 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'mi_proyecto.wsgi.application'
+ASGI_APPLICATION = 'mi_proyecto.asgi.application'
+
+# Vistas async para scraper y envíos; asgi.py las activa por defecto. El
+# procfile sirve con uvicorn (ASGI) sólo con DJANGO_VISTAS_ASYNC=1; si no, WSGI
+VISTAS_ASYNC = os.getenv('DJANGO_VISTAS_ASYNC', '0') == '1'
+
+# Instrumentación (core/middleware.py): Server-Timing, /metrics y cProfile por muestreo
+INSTRUMENTACION_SERVER_TIMING = os.getenv('DJANGO_SERVER_TIMING', '1' if DEBUG else '0') == '1'
+INSTRUMENTACION_PERFIL_MUESTREO = float(os.getenv('DJANGO_PERFIL_MUESTREO', '0'))
+METRICAS_TOKEN = os.getenv('METRICAS_TOKEN', '')
 
+# PRAGMAs por conexión (WAL, busy_timeout, mmap...) en core/db.py. Conexiones
+# persistentes sólo con WSGI: bajo ASGI las vistas sync corren en hilos que no
+# se reutilizan entre peticiones y cada uno dejaría su conexión abierta
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': int(os.getenv('DJANGO_CONN_MAX_AGE', '0' if VISTAS_ASYNC else '60')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Réplica de sólo lectura opcional para reportes (exportaciones, métricas)
+if os.getenv('DJANGO_DB_REPORTES'):
+    DATABASES['reportes'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DJANGO_DB_REPORTES'),
+        'OPTIONS': {},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['core.db.RouterReplica']
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -75,6 +116,67 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Argon2 con parámetros ajustados (accounts/hashers.py) si argon2-cffi está
+# instalado. Los hashes PBKDF2 existentes se siguen aceptando y se
+# convierten a Argon2 la próxima vez que el usuario inicia sesión.
+PASSWORD_HASHERS = [
+    *(['accounts.hashers.Argon2Ajustado'] if importlib.util.find_spec('argon2') else []),
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+ARGON2_TIME_COST = int(os.getenv('DJANGO_ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.getenv('DJANGO_ARGON2_MEMORY_COST', 19 * 1024))  # KiB
+ARGON2_PARALLELISM = int(os.getenv('DJANGO_ARGON2_PARALLELISM', 1))
+
+# request.user sale de la cache 'sesiones' en vez de un SELECT por petición.
+# Los logins nuevos quedan con BackendCacheado; ModelBackend sigue en la lista
+# para que las sesiones abiertas antes del cambio (que guardan su ruta) no se
+# cierren y pasen a la cache en el próximo login.
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.BackendCacheado',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Cache para sesiones y usuarios. 'file' la comparten los workers del mismo
+# host; con 'locmem' cada worker tiene la suya y un logout o cambio de
+# contraseña hecho en otro worker recién se ve al vencer la entrada.
+CACHE_SESIONES = os.getenv('DJANGO_CACHE_SESIONES', 'file')
+# Métricas del dashboard (alumnos/metricas.py): igual que las sesiones, con
+# 'locmem' la invalidación de una escritura sólo la ve el worker que la hizo
+CACHE_METRICAS = os.getenv('DJANGO_CACHE_METRICAS', 'file')
+
+
+def _cache_compartida(nombre, tipo):
+    if tipo == 'file':
+        return {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': BASE_DIR / 'cache' / nombre}
+    return {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': nombre}
+
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'sesiones': _cache_compartida('sesiones', CACHE_SESIONES),
+    'metricas': _cache_compartida('metricas', CACHE_METRICAS),
+}
+
+# Backend de sesiones: 'cached_db' (lee de la cache y escribe en ambas),
+# 'db', 'cache' o 'signed_cookies' (sin estado en el servidor, pero un
+# logout no invalida copias robadas de la cookie antes de que venza).
+MOTORES_SESION = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = MOTORES_SESION[os.getenv('DJANGO_SESIONES', 'cached_db')]
+SESSION_CACHE_ALIAS = 'sesiones'
+
+# Límite de tasa (core.limites): 'archivo' lo comparten los workers del host,
+# 'db' todas las máquinas que usan la misma base, 'memoria' es por worker
+LIMITES_ALMACEN = os.getenv('DJANGO_LIMITES', 'archivo')
+# Proxies de confianza delante de la app (X-Forwarded-For) para obtener la IP real
+LIMITES_PROXIES = int(os.getenv('DJANGO_LIMITES_PROXIES', 0))
+
 
 LANGUAGE_CODE = 'en-us'
 
@@ -86,6 +188,16 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / "staticfiles"
+STATICFILES_DIRS = [BASE_DIR / "static"]
+# collectstatic escribe nombres con hash del contenido más copias .gz y .br;
+# WhiteNoise sirve esos archivos con "Cache-Control: immutable" por un año
+# y elige la versión comprimida según Accept-Encoding. Los nombres con hash
+# sólo se usan con DEBUG apagado (DJANGO_DEBUG=0) y después de collectstatic;
+# en desarrollo {% static %} devuelve el nombre original.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+}
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / "media"
 
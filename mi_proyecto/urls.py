@@ -17,8 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from core.views import metricas
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metricas, name='metricas'),
     path('', include('core.urls')),
     path('accounts/', include('accounts.urls')),  
     path('accounts/', include('django.contrib.auth.urls')),
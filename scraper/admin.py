@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import BusquedaWikipedia
 
-# Register your models here.
+@admin.register(BusquedaWikipedia)
+class BusquedaWikipediaAdmin(admin.ModelAdmin):
+    list_display = ('termino', 'status', 'consultas', 'ultima_consulta', 'actualizado', 'created_at')
+    search_fields = ('termino', 'titulo')
+    list_filter = ('status',)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ScraperConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'scraper'
+
+    def ready(self):
+        from . import envios  # noqa: F401  (registra los tipos de envío)
@@ -0,0 +1,193 @@
+"""Búsqueda de varios términos en paralelo.
+
+Con ``SCRAPER_BACKEND = 'api'`` (por defecto) todos los términos se piden
+juntos con ``cache.obtener_resultados``: una petición a la API de MediaWiki
+cada 50 términos. Los que la API no resuelve, y todos con ``'html'``, se
+resuelven de a uno con ``cache.obtener_resultado`` (scraper HTML) en un pool
+de hilos compartido por el proceso. Las descargas a un mismo host se limitan
+con ``wikipedia.limite_host`` y toda la búsqueda tiene un plazo global: lo
+que no terminó a tiempo se devuelve como resultado parcial (el hilo sigue y
+deja el término en cache para la próxima vez). Cada tarea del pool corre en
+una copia del contexto de la petición, así sus descargas y consultas suman a
+la medición de ``core.instrumentacion``.
+
+Cada búsqueda suma a la popularidad de sus términos (``refresco.registrar``).
+"""
+import asyncio
+import contextvars
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import refresco, wikipedia
+from .cache import (
+    BACKEND, normalizar_termino, obtener_resultado, obtener_resultado_async, obtener_resultados,
+    obtener_resultados_async,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_TERMINOS = getattr(settings, 'SCRAPER_MAX_TERMINOS', 50)
+WORKERS = getattr(settings, 'SCRAPER_WORKERS', 16)
+# Segundos que como máximo espera la vista por el conjunto de términos
+PLAZO_GLOBAL = getattr(settings, 'SCRAPER_PLAZO_GLOBAL', 12)
+
+_pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='scraper')
+# Tareas async que siguieron después del plazo (referencia para que no las recolecte el GC)
+_en_curso = set()
+
+
+def separar_terminos(valores):
+    """Lista de términos únicos (en orden) a partir de ?palabra=a&palabra=b o un textarea."""
+    terminos = []
+    vistos = set()
+    for valor in valores:
+        for termino in re.split(r"[\r\n]+", valor or ""):
+            termino = termino.strip()
+            clave = normalizar_termino(termino)
+            if clave and clave not in vistos:
+                vistos.add(clave)
+                terminos.append(termino)
+    return terminos[:MAX_TERMINOS]
+
+
+def _enviar_al_pool(func, *args):
+    # Una copia por tarea: un mismo Context no puede correr en dos hilos a la vez
+    return _pool.submit(contextvars.copy_context().run, func, *args)
+
+
+def _resolver(termino):
+    try:
+        return obtener_resultado(termino)
+    finally:
+        # Los hilos del pool no pasan por el ciclo request/response de Django
+        connections.close_all()
+
+
+def _resolver_lote(terminos):
+    try:
+        return obtener_resultados(terminos)
+    finally:
+        connections.close_all()
+
+
+def _resultado_unico(termino):
+    if BACKEND == 'api':
+        resultado = obtener_resultados([termino]).get(termino)
+        if resultado is not None:
+            return resultado
+    return obtener_resultado(termino)
+
+
+def resultado_pendiente(termino):
+    return {
+        "titulo": termino,
+        "descripcion": "Wikipedia tardó demasiado en responder; probá de nuevo en unos segundos.",
+        "url": wikipedia.url_termino(termino),
+        "parcial": True,
+    }
+
+
+def buscar_terminos(terminos, plazo=None):
+    """Resultados de todos los términos, en el mismo orden, dentro del plazo global."""
+    if not terminos:
+        return []
+    resultados = _buscar_terminos(terminos, plazo)
+    if refresco.registrar(terminos):
+        refresco.volcar()
+    return resultados
+
+
+def _buscar_terminos(terminos, plazo):
+    if len(terminos) == 1:
+        return [_resultado_unico(terminos[0])]
+
+    plazo = PLAZO_GLOBAL if plazo is None else plazo
+    fin = time.monotonic() + plazo
+    resueltos = {}
+    if BACKEND == 'api':
+        lote = _enviar_al_pool(_resolver_lote, terminos)
+        wait([lote], timeout=plazo)
+        if not lote.done():
+            return [resultado_pendiente(termino) for termino in terminos]
+        try:
+            resueltos = lote.result()
+        except Exception as e:
+            logger.warning("Falló la búsqueda por lotes; se usa el scraper HTML: %s", e)
+
+    futuros = {termino: _enviar_al_pool(_resolver, termino) for termino in terminos if termino not in resueltos}
+    if futuros:
+        wait(futuros.values(), timeout=max(0, fin - time.monotonic()))
+
+    resultados = []
+    for termino in terminos:
+        if termino in resueltos:
+            resultados.append(resueltos[termino])
+            continue
+        futuro = futuros[termino]
+        if futuro.done():
+            try:
+                resultados.append(futuro.result())
+            except Exception as e:
+                resultados.append(wikipedia.resultado_error(termino, e))
+        else:
+            resultados.append(resultado_pendiente(termino))
+    return resultados
+
+
+def _seguir_en_segundo_plano(tarea):
+    # Referencia para que el GC no la recolecte; al terminar deja el resultado en cache
+    _en_curso.add(tarea)
+    tarea.add_done_callback(_en_curso.discard)
+
+
+async def buscar_terminos_async(terminos, plazo=None):
+    """Versión async de ``buscar_terminos``: todas las descargas en el mismo event loop."""
+    if not terminos:
+        return []
+    resultados = await _buscar_terminos_async(terminos, plazo)
+    if refresco.registrar(terminos):
+        await sync_to_async(refresco.volcar)()
+    return resultados
+
+
+async def _buscar_terminos_async(terminos, plazo):
+    plazo = PLAZO_GLOBAL if plazo is None else plazo
+    fin = time.monotonic() + plazo
+    resueltos = {}
+    if BACKEND == 'api':
+        lote = asyncio.ensure_future(obtener_resultados_async(terminos))
+        await asyncio.wait([lote], timeout=plazo)
+        if not lote.done():
+            _seguir_en_segundo_plano(lote)
+            return [resultado_pendiente(termino) for termino in terminos]
+        if lote.exception():
+            logger.warning("Falló la búsqueda por lotes; se usa el scraper HTML: %s", lote.exception())
+        else:
+            resueltos = lote.result()
+
+    tareas = {
+        termino: asyncio.ensure_future(obtener_resultado_async(termino))
+        for termino in terminos if termino not in resueltos
+    }
+    if tareas:
+        await asyncio.wait(tareas.values(), timeout=max(0, fin - time.monotonic()))
+
+    resultados = []
+    for termino in terminos:
+        if termino in resueltos:
+            resultados.append(resueltos[termino])
+            continue
+        tarea = tareas[termino]
+        if tarea.done():
+            error = tarea.exception()
+            resultados.append(wikipedia.resultado_error(termino, error) if error else tarea.result())
+        else:
+            _seguir_en_segundo_plano(tarea)
+            resultados.append(resultado_pendiente(termino))
+    return resultados
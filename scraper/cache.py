@@ -0,0 +1,465 @@
+"""Cache de búsquedas en Wikipedia.
+
+Dos niveles: un LRU en memoria del proceso (acotado a ``SCRAPER_LRU_MAX``
+términos) delante de la tabla ``BusquedaWikipedia``. Una entrada vale
+``SCRAPER_CACHE_TTL`` segundos; vencida, se revalida con un GET condicional
+(If-None-Match / If-Modified-Since) y un 304 sólo renueva la fecha.
+Si Wikipedia falla y hay una entrada vencida, se sirve la vencida.
+
+Stale-while-revalidate: durante ``SCRAPER_CACHE_SWR`` segundos después del
+TTL la entrada vencida se sirve igual y el término se refresca en segundo
+plano (un solo hilo, en lotes y a ``SCRAPER_REFRESCOS_POR_SEGUNDO``), así la
+búsqueda no espera a Wikipedia. Más vieja que eso se revalida en el momento.
+
+``obtener_resultados`` resuelve varios términos de una vez: una consulta a la
+tabla para todos y, para los que faltan o vencieron, una petición a la API de
+MediaWiki por cada ``mediawiki.MAX_TITULOS`` términos.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import httpx
+import requests
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+from . import mediawiki, wikipedia
+from .cliente_http import Ritmo
+from .models import BusquedaWikipedia
+
+logger = logging.getLogger(__name__)
+
+TTL = getattr(settings, 'SCRAPER_CACHE_TTL', 24 * 3600)
+LRU_MAX = getattr(settings, 'SCRAPER_LRU_MAX', 1000)
+SWR = getattr(settings, 'SCRAPER_CACHE_SWR', 24 * 3600)
+# Peticiones por segundo a Wikipedia del trabajo en segundo plano (no de las búsquedas)
+REFRESCOS_POR_SEGUNDO = getattr(settings, 'SCRAPER_REFRESCOS_POR_SEGUNDO', 2)
+# 'api': lotes con la API de MediaWiki y el scraper HTML como respaldo; 'html': sólo el scraper
+BACKEND = getattr(settings, 'SCRAPER_BACKEND', 'api')
+# Sólo se cachean respuestas definitivas; un 5xx se vuelve a pedir
+STATUS_CACHEABLES = (200, 404)
+CAMPOS_ENTRADA = ['titulo', 'descripcion', 'url', 'status', 'etag', 'last_modified', 'actualizado']
+
+
+def normalizar_termino(palabra):
+    """Clave de cache: espacios colapsados y sin distinguir mayúsculas."""
+    return " ".join((palabra or "").split()).casefold()
+
+
+class LRU:
+    """Diccionario acotado y thread-safe que descarta lo menos usado."""
+
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            valor = self._datos.get(clave)
+            if valor is not None:
+                self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def pop(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+lru = LRU(LRU_MAX)
+ritmo = Ritmo(REFRESCOS_POR_SEGUNDO)
+
+_refrescos = ThreadPoolExecutor(max_workers=1, thread_name_prefix='scraper-refresco')
+_refrescos_lock = threading.Lock()
+# clave -> palabra de los términos esperando refresco, y claves del lote en curso
+_pendientes = {}
+_refrescando = set()
+_drenando = False
+
+
+def _vigente(actualizado, ahora):
+    return actualizado + timedelta(seconds=TTL) > ahora
+
+
+def _servible(actualizado, ahora):
+    return actualizado + timedelta(seconds=TTL + SWR) > ahora
+
+
+def _recordar(clave, entrada):
+    lru.set(clave, (entrada.como_resultado(), entrada.actualizado))
+
+
+def _desde_memoria(palabra, clave, ahora, vencidas):
+    """Resultado en memoria si está vigente o se puede servir vencido (y se suma a ``vencidas``)."""
+    en_memoria = lru.get(clave)
+    if en_memoria is None:
+        return None
+    resultado, actualizado = en_memoria
+    if _vigente(actualizado, ahora):
+        return resultado
+    if _servible(actualizado, ahora):
+        vencidas.append(palabra)
+        return resultado
+    return None
+
+
+def _desde_entrada(palabra, clave, entrada, ahora, vencidas):
+    """Como ``_desde_memoria`` para una fila de la tabla."""
+    if entrada is None or not _servible(entrada.actualizado, ahora):
+        return None
+    if not _vigente(entrada.actualizado, ahora):
+        vencidas.append(palabra)
+    _recordar(clave, entrada)
+    return entrada.como_resultado()
+
+
+def _servir_y_refrescar(resultado, vencidas):
+    if vencidas:
+        programar_refresco(vencidas)
+    return resultado
+
+
+def _headers_condicionales(entrada):
+    headers = {}
+    if entrada is not None:
+        if entrada.etag:
+            headers["If-None-Match"] = entrada.etag
+        if entrada.last_modified:
+            headers["If-Modified-Since"] = entrada.last_modified
+    return headers
+
+
+def _datos_entrada(resultado, respuesta, ahora):
+    return {
+        'titulo': resultado['titulo'][:255],
+        'descripcion': resultado['descripcion'],
+        'url': resultado['url'],
+        'status': respuesta.status_code,
+        'etag': respuesta.headers.get('ETag', ''),
+        'last_modified': respuesta.headers.get('Last-Modified', ''),
+        'actualizado': ahora,
+    }
+
+
+def obtener_resultado(palabra):
+    """Resultado {titulo, descripcion, url} para un término, usando la cache."""
+    clave = normalizar_termino(palabra)
+    ahora = timezone.now()
+
+    vencidas = []
+    resultado = _desde_memoria(palabra, clave, ahora, vencidas)
+    if resultado is not None:
+        return _servir_y_refrescar(resultado, vencidas)
+
+    entrada = BusquedaWikipedia.objects.filter(termino=clave).first()
+    resultado = _desde_entrada(palabra, clave, entrada, ahora, vencidas)
+    if resultado is not None:
+        return _servir_y_refrescar(resultado, vencidas)
+
+    return revalidar(palabra, entrada)
+
+
+def revalidar(palabra, entrada=None):
+    """Consulta Wikipedia (condicional si hay entrada) y actualiza la cache."""
+    clave = normalizar_termino(palabra)
+    try:
+        with wikipedia.limite_host():
+            respuesta = wikipedia.descargar(palabra, headers=_headers_condicionales(entrada))
+            if respuesta.status_code == 304 and entrada is not None:
+                respuesta.close()
+                resultado = None
+            else:
+                # El cuerpo se lee en modo stream: el corte puede llegar a mitad de lectura
+                resultado = wikipedia.resultado_desde_respuesta(palabra, respuesta)
+    except requests.RequestException as e:
+        if entrada is not None:
+            return entrada.como_resultado()
+        return wikipedia.resultado_error(palabra, e)
+
+    ahora = timezone.now()
+    if resultado is None:
+        entrada.actualizado = ahora
+        try:
+            entrada.save(update_fields=['actualizado'])
+        except DatabaseError as e:
+            logger.warning("No se pudo renovar '%s' en la cache: %s", clave, e)
+        _recordar(clave, entrada)
+        return entrada.como_resultado()
+
+    if respuesta.status_code not in STATUS_CACHEABLES:
+        return entrada.como_resultado() if entrada is not None else resultado
+
+    try:
+        entrada, _ = BusquedaWikipedia.objects.update_or_create(
+            termino=clave, defaults=_datos_entrada(resultado, respuesta, ahora),
+        )
+    except DatabaseError as e:
+        # No poder cachear no debe impedir mostrar el resultado
+        logger.warning("No se pudo guardar '%s' en la cache: %s", clave, e)
+        return resultado
+    _recordar(clave, entrada)
+    return resultado
+
+
+async def obtener_resultado_async(palabra):
+    """Versión async de ``obtener_resultado`` (ORM async + httpx)."""
+    clave = normalizar_termino(palabra)
+    ahora = timezone.now()
+
+    vencidas = []
+    resultado = _desde_memoria(palabra, clave, ahora, vencidas)
+    if resultado is not None:
+        return _servir_y_refrescar(resultado, vencidas)
+
+    entrada = await BusquedaWikipedia.objects.filter(termino=clave).afirst()
+    resultado = _desde_entrada(palabra, clave, entrada, ahora, vencidas)
+    if resultado is not None:
+        return _servir_y_refrescar(resultado, vencidas)
+
+    return await revalidar_async(palabra, entrada)
+
+
+async def revalidar_async(palabra, entrada=None):
+    clave = normalizar_termino(palabra)
+    try:
+        async with wikipedia.cliente_async.limite():
+            respuesta = await wikipedia.descargar_async(palabra, headers=_headers_condicionales(entrada))
+            if respuesta.status_code == 304 and entrada is not None:
+                await respuesta.aclose()
+                resultado = None
+            else:
+                resultado = await wikipedia.resultado_desde_respuesta_async(palabra, respuesta)
+    except (httpx.HTTPError, requests.RequestException) as e:
+        if entrada is not None:
+            return entrada.como_resultado()
+        return wikipedia.resultado_error(palabra, e)
+
+    ahora = timezone.now()
+    if resultado is None:
+        entrada.actualizado = ahora
+        try:
+            await entrada.asave(update_fields=['actualizado'])
+        except DatabaseError as e:
+            logger.warning("No se pudo renovar '%s' en la cache: %s", clave, e)
+        _recordar(clave, entrada)
+        return entrada.como_resultado()
+
+    if respuesta.status_code not in STATUS_CACHEABLES:
+        return entrada.como_resultado() if entrada is not None else resultado
+
+    try:
+        entrada, _ = await BusquedaWikipedia.objects.aupdate_or_create(
+            termino=clave, defaults=_datos_entrada(resultado, respuesta, ahora),
+        )
+    except DatabaseError as e:
+        logger.warning("No se pudo guardar '%s' en la cache: %s", clave, e)
+        return resultado
+    _recordar(clave, entrada)
+    return resultado
+
+
+def _repartir_en_memoria(palabras, ahora, vencidas):
+    resultados, faltantes = {}, []
+    for palabra in palabras:
+        resultado = _desde_memoria(palabra, normalizar_termino(palabra), ahora, vencidas)
+        if resultado is None:
+            faltantes.append(palabra)
+        else:
+            resultados[palabra] = resultado
+    return resultados, faltantes
+
+
+def _repartir_en_tabla(faltantes, entradas, ahora, resultados, vencidas):
+    """Suma a ``resultados`` las entradas que se pueden servir; devuelve los términos a consultar."""
+    pendientes = []
+    for palabra in faltantes:
+        clave = normalizar_termino(palabra)
+        resultado = _desde_entrada(palabra, clave, entradas.get(clave), ahora, vencidas)
+        if resultado is None:
+            pendientes.append(palabra)
+        else:
+            resultados[palabra] = resultado
+    return pendientes
+
+
+def _entradas_api(lote, respuestas, ahora):
+    """Entradas a guardar para los términos que la API respondió (la API no da ETag)."""
+    nuevas = {}
+    for palabra in lote:
+        if palabra in respuestas:
+            resultado, status = respuestas[palabra]
+            nuevas[normalizar_termino(palabra)] = BusquedaWikipedia(
+                termino=normalizar_termino(palabra),
+                titulo=resultado['titulo'][:255],
+                descripcion=resultado['descripcion'],
+                url=resultado['url'],
+                status=status,
+                actualizado=ahora,
+            )
+    return list(nuevas.values())
+
+
+def _guardar_lote(entradas):
+    try:
+        BusquedaWikipedia.objects.bulk_create(
+            entradas, update_conflicts=True, unique_fields=['termino'], update_fields=CAMPOS_ENTRADA,
+        )
+    except DatabaseError as e:
+        logger.warning("No se pudo guardar un lote de %s términos en la cache: %s", len(entradas), e)
+
+
+def _aplicar_lote(lote, respuestas, entradas, resultados):
+    for entrada in entradas:
+        _recordar(entrada.termino, entrada)
+    for palabra in lote:
+        if palabra in respuestas:
+            resultados[palabra] = respuestas[palabra][0]
+
+
+def _servir_vencidas(lote, entradas, resultados):
+    # La API falló: lo que ya estaba en la tabla se sirve vencido, el resto va al scraper HTML
+    for palabra in lote:
+        entrada = entradas.get(normalizar_termino(palabra))
+        if entrada is not None:
+            resultados[palabra] = entrada.como_resultado()
+
+
+def obtener_resultados(palabras):
+    """{palabra: resultado} para varios términos, usando la cache y la API de MediaWiki.
+
+    Los términos que la API no pudo responder no aparecen en el dict; el
+    llamador los resuelve de a uno con ``obtener_resultado`` (scraper HTML).
+    """
+    ahora = timezone.now()
+    vencidas = []
+    resultados, faltantes = _repartir_en_memoria(palabras, ahora, vencidas)
+    if not faltantes:
+        return _servir_y_refrescar(resultados, vencidas)
+
+    claves = {normalizar_termino(palabra) for palabra in faltantes}
+    entradas = {e.termino: e for e in BusquedaWikipedia.objects.filter(termino__in=claves)}
+    pendientes = _repartir_en_tabla(faltantes, entradas, ahora, resultados, vencidas)
+    if vencidas:
+        programar_refresco(vencidas)
+    _consultar_api(pendientes, entradas, resultados)
+    return resultados
+
+
+def _consultar_api(pendientes, entradas, resultados, ritmo=None):
+    for lote in mediawiki.lotes([p for p in pendientes if mediawiki.admitido(p)]):
+        if ritmo is not None:
+            ritmo.esperar()
+        try:
+            with wikipedia.limite_host():
+                respuestas = mediawiki.consultar(lote)
+        except (requests.RequestException, ValueError) as e:
+            logger.warning("La API de MediaWiki falló para %s términos: %s", len(lote), e)
+            _servir_vencidas(lote, entradas, resultados)
+            continue
+        nuevas = _entradas_api(lote, respuestas, timezone.now())
+        _guardar_lote(nuevas)
+        _aplicar_lote(lote, respuestas, nuevas, resultados)
+
+
+async def obtener_resultados_async(palabras):
+    """Versión async de ``obtener_resultados``."""
+    ahora = timezone.now()
+    vencidas = []
+    resultados, faltantes = _repartir_en_memoria(palabras, ahora, vencidas)
+    if not faltantes:
+        return _servir_y_refrescar(resultados, vencidas)
+
+    claves = {normalizar_termino(palabra) for palabra in faltantes}
+    entradas = {e.termino: e async for e in BusquedaWikipedia.objects.filter(termino__in=claves)}
+    pendientes = _repartir_en_tabla(faltantes, entradas, ahora, resultados, vencidas)
+    if vencidas:
+        programar_refresco(vencidas)
+
+    for lote in mediawiki.lotes([p for p in pendientes if mediawiki.admitido(p)]):
+        try:
+            async with wikipedia.cliente_async.limite():
+                respuestas = await mediawiki.consultar_async(lote)
+        except (httpx.HTTPError, requests.RequestException, ValueError) as e:
+            logger.warning("La API de MediaWiki falló para %s términos: %s", len(lote), e)
+            _servir_vencidas(lote, entradas, resultados)
+            continue
+        nuevas = _entradas_api(lote, respuestas, timezone.now())
+        try:
+            await BusquedaWikipedia.objects.abulk_create(
+                nuevas, update_conflicts=True, unique_fields=['termino'], update_fields=CAMPOS_ENTRADA,
+            )
+        except DatabaseError as e:
+            logger.warning("No se pudo guardar un lote de %s términos en la cache: %s", len(nuevas), e)
+        _aplicar_lote(lote, respuestas, nuevas, resultados)
+    return resultados
+
+
+def refrescar(palabras):
+    """Vuelve a pedir los términos a Wikipedia (estén o no vigentes) y actualiza la cache.
+
+    Cada petición espera su turno en ``ritmo``: es para trabajo de fondo, no
+    para responder una búsqueda.
+    """
+    claves = {normalizar_termino(palabra) for palabra in palabras}
+    entradas = {e.termino: e for e in BusquedaWikipedia.objects.filter(termino__in=claves)}
+    resueltos = {}
+    if BACKEND == 'api':
+        _consultar_api(palabras, entradas, resueltos, ritmo=ritmo)
+    for palabra in palabras:
+        if palabra not in resueltos:
+            ritmo.esperar()
+            resueltos[palabra] = revalidar(palabra, entradas.get(normalizar_termino(palabra)))
+    return resueltos
+
+
+def programar_refresco(palabras):
+    """Encola el refresco en segundo plano; no bloquea. Un término ya encolado no se repite."""
+    global _drenando
+    with _refrescos_lock:
+        for palabra in palabras:
+            clave = normalizar_termino(palabra)
+            if clave not in _refrescando:
+                _pendientes.setdefault(clave, palabra)
+        if _drenando or not _pendientes:
+            return
+        _drenando = True
+    _refrescos.submit(_drenar_refrescos)
+
+
+def _drenar_refrescos():
+    global _drenando
+    try:
+        while True:
+            with _refrescos_lock:
+                _refrescando.clear()
+                if not _pendientes:
+                    _drenando = False
+                    return
+                claves = list(_pendientes)[:mediawiki.MAX_TITULOS]
+                lote = [_pendientes.pop(clave) for clave in claves]
+                _refrescando.update(claves)
+            try:
+                refrescar(lote)
+            except Exception:
+                logger.exception("Falló el refresco en segundo plano de %s términos", len(lote))
+    finally:
+        # El hilo no pasa por el ciclo request/response de Django
+        connections.close_all()
@@ -0,0 +1,89 @@
+"""Versión asíncrona (httpx) del cliente HTTP saliente, para las vistas ASGI.
+
+Comparte con el ``ClienteHTTP`` síncrono del mismo nombre el circuit
+breaker, el presupuesto de reintentos y las métricas: una caída de Wikipedia
+abre el circuito para ambos modos. El ``httpx.AsyncClient`` y el semáforo
+de concurrencia se crean uno por event loop.
+"""
+import asyncio
+import time
+import weakref
+
+import httpx
+
+from .cliente_http import CircuitoAbierto
+
+
+class ClienteHTTPAsync:
+    def __init__(self, base):
+        self.base = base
+        self._por_loop = weakref.WeakKeyDictionary()
+
+    def _estado_loop(self):
+        loop = asyncio.get_running_loop()
+        estado = self._por_loop.get(loop)
+        if estado is None:
+            maximo = self.base.pool_maxsize
+            cliente = httpx.AsyncClient(
+                headers=dict(self.base.session.headers),
+                timeout=self.base.timeout,
+                # Como requests: /wiki/python responde 301 a /wiki/Python
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=maximo, max_keepalive_connections=maximo),
+            )
+            estado = self._por_loop[loop] = (cliente, asyncio.Semaphore(maximo))
+        return estado
+
+    def limite(self):
+        """Semáforo del loop actual: descargas simultáneas como máximo."""
+        return self._estado_loop()[1]
+
+    async def get(self, url, headers=None):
+        """GET en modo stream; el llamador debe cerrar la respuesta (``aclose``).
+
+        Propaga ``httpx.HTTPError`` o ``CircuitoAbierto``.
+        """
+        cliente, _ = self._estado_loop()
+        base = self.base
+        base.presupuesto.depositar()
+        intento = 0
+        while True:
+            if not base.breaker.permitir():
+                base._sumar('rechazadas')
+                raise CircuitoAbierto(f"Circuito abierto hacia {base.nombre}: no se intenta la petición.")
+
+            base._sumar('peticiones')
+            inicio = time.perf_counter()
+            try:
+                respuesta = await cliente.send(cliente.build_request("GET", url, headers=headers), stream=True)
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                error, respuesta = e, None
+            except asyncio.CancelledError:
+                # El cliente cortó: no dice nada del upstream, sólo se libera la prueba del semiabierto
+                base._observar_latencia(time.perf_counter() - inicio)
+                base.breaker.liberar_prueba()
+                raise
+            except BaseException:
+                base._observar_latencia(time.perf_counter() - inicio)
+                base._sumar('errores')
+                base.breaker.registrar_fallo()
+                raise
+            else:
+                error = None
+            base._observar_latencia(time.perf_counter() - inicio)
+
+            if error is None and respuesta.status_code < 500:
+                base.breaker.registrar_exito()
+                return respuesta
+
+            base._sumar('errores')
+            base.breaker.registrar_fallo()
+            if intento < base.reintentos and base.presupuesto.retirar():
+                intento += 1
+                base._sumar('reintentos')
+                if respuesta is not None:
+                    await respuesta.aclose()
+                continue
+            if error is not None:
+                raise error
+            return respuesta
@@ -0,0 +1,246 @@
+"""Cliente HTTP saliente compartido por el proceso.
+
+- Una ``requests.Session`` por cliente con pool keep-alive dimensionado
+  (``pool_maxsize``), así cada búsqueda no paga DNS + TCP + TLS.
+- Circuit breaker: tras ``umbral_fallos`` errores seguidos (timeouts,
+  errores de conexión o 5xx) deja de llamar al upstream durante ``espera``
+  segundos y falla enseguida con ``CircuitoAbierto``; después deja pasar
+  una petición de prueba (semiabierto) y se cierra si sale bien.
+- Presupuesto de reintentos: cada petición suma ``ratio_reintentos`` fichas
+  y cada reintento gasta una, así un upstream caído no multiplica la carga.
+- ``Ritmo``: espaciado fijo entre peticiones para el trabajo de fondo
+  (refresco de la cache), así no compite con las búsquedas por el upstream.
+- Métricas (peticiones, errores, reintentos, latencia, reutilización de
+  conexiones y estado del breaker) vía ``metricas()``.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core import instrumentacion
+
+# Límites superiores (segundos) del histograma de latencias
+BUCKETS_LATENCIA = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class CircuitoAbierto(requests.ConnectionError):
+    """El breaker está abierto: no se intentó la petición."""
+
+
+class CircuitBreaker:
+    CERRADO = 'cerrado'
+    ABIERTO = 'abierto'
+    SEMIABIERTO = 'semiabierto'
+
+    def __init__(self, umbral_fallos=5, espera=30):
+        self.umbral_fallos = umbral_fallos
+        self.espera = espera
+        self.estado = self.CERRADO
+        self.fallos = 0
+        self.abierto_desde = 0.0
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        with self._lock:
+            if self.estado == self.CERRADO:
+                return True
+            if self.estado == self.ABIERTO and time.monotonic() - self.abierto_desde >= self.espera:
+                self.estado = self.SEMIABIERTO
+                self._prueba_en_curso = False
+            if self.estado == self.SEMIABIERTO and not self._prueba_en_curso:
+                self._prueba_en_curso = True
+                return True
+            return False
+
+    def registrar_exito(self):
+        with self._lock:
+            self.estado = self.CERRADO
+            self.fallos = 0
+            self._prueba_en_curso = False
+
+    def liberar_prueba(self):
+        """La petición se abandonó sin resultado (p. ej. cancelada): no cuenta como
+        fallo, pero la prueba del semiabierto queda libre para otra."""
+        with self._lock:
+            self._prueba_en_curso = False
+
+    def registrar_fallo(self):
+        with self._lock:
+            self.fallos += 1
+            if self.estado == self.SEMIABIERTO or self.fallos >= self.umbral_fallos:
+                self.estado = self.ABIERTO
+                self.abierto_desde = time.monotonic()
+                self._prueba_en_curso = False
+
+
+class PresupuestoReintentos:
+    """Token bucket: los reintentos no pueden superar una fracción de las peticiones."""
+
+    def __init__(self, ratio=0.1, maximo=10):
+        self.ratio = ratio
+        self.maximo = maximo
+        self.fichas = float(maximo)
+        self._lock = threading.Lock()
+
+    def depositar(self):
+        with self._lock:
+            self.fichas = min(self.maximo, self.fichas + self.ratio)
+
+    def retirar(self):
+        with self._lock:
+            if self.fichas >= 1:
+                self.fichas -= 1
+                return True
+            return False
+
+
+class Ritmo:
+    """Como máximo ``por_segundo`` turnos por segundo; ``esperar()`` bloquea hasta el siguiente."""
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1 / por_segundo if por_segundo else 0.0
+        self._proximo = 0.0
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._proximo)
+            self._proximo = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+class ClienteHTTP:
+    def __init__(self, nombre, pool_maxsize=10, timeout=8, reintentos=1, umbral_fallos=5,
+                 espera_breaker=30, ratio_reintentos=0.1, headers=None):
+        self.nombre = nombre
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.breaker = CircuitBreaker(umbral_fallos, espera_breaker)
+        self.presupuesto = PresupuestoReintentos(ratio_reintentos)
+        self._semaforo = threading.BoundedSemaphore(pool_maxsize)
+
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+
+        self._lock = threading.Lock()
+        self._contadores = {'peticiones': 0, 'errores': 0, 'reintentos': 0, 'rechazadas': 0}
+        self._latencia_suma = 0.0
+        self._latencia_buckets = [0] * (len(BUCKETS_LATENCIA) + 1)
+
+    @contextmanager
+    def limite(self):
+        """Limita las descargas simultáneas al tamaño del pool de conexiones."""
+        with self._semaforo:
+            yield
+
+    def _sumar(self, contador, n=1):
+        with self._lock:
+            self._contadores[contador] += n
+
+    def _observar_latencia(self, segundos):
+        instrumentacion.registrar('http', segundos)
+        with self._lock:
+            self._latencia_suma += segundos
+            for i, limite in enumerate(BUCKETS_LATENCIA):
+                if segundos <= limite:
+                    self._latencia_buckets[i] += 1
+                    break
+            else:
+                self._latencia_buckets[-1] += 1
+
+    def get(self, url, **kwargs):
+        """GET con breaker y reintentos. Propaga requests.RequestException."""
+        kwargs.setdefault('timeout', self.timeout)
+        self.presupuesto.depositar()
+        intento = 0
+        while True:
+            if not self.breaker.permitir():
+                self._sumar('rechazadas')
+                raise CircuitoAbierto(f"Circuito abierto hacia {self.nombre}: no se intenta la petición.")
+
+            self._sumar('peticiones')
+            inicio = time.perf_counter()
+            try:
+                respuesta = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error, respuesta = e, None
+            except BaseException:
+                # Cualquier otro error (TooManyRedirects, InvalidHeader...) también cierra
+                # la prueba del semiabierto; si no, el breaker rechazaría todo para siempre
+                self._observar_latencia(time.perf_counter() - inicio)
+                self._sumar('errores')
+                self.breaker.registrar_fallo()
+                raise
+            else:
+                error = None
+            self._observar_latencia(time.perf_counter() - inicio)
+
+            if error is None and respuesta.status_code < 500:
+                self.breaker.registrar_exito()
+                return respuesta
+
+            self._sumar('errores')
+            self.breaker.registrar_fallo()
+            if intento < self.reintentos and self.presupuesto.retirar():
+                intento += 1
+                self._sumar('reintentos')
+                if respuesta is not None:
+                    respuesta.close()
+                continue
+            if error is not None:
+                raise error
+            return respuesta
+
+    def _conexiones(self):
+        """(conexiones abiertas, peticiones servidas) según los pools de urllib3."""
+        nuevas = servidas = 0
+        pools = self._adapter.poolmanager.pools
+        for clave in list(pools.keys()):
+            pool = pools.get(clave)
+            if pool is None:
+                continue
+            nuevas += pool.num_connections
+            servidas += pool.num_requests
+        return nuevas, servidas
+
+    def metricas(self):
+        nuevas, servidas = self._conexiones()
+        with self._lock:
+            datos = dict(self._contadores)
+            datos['latencia_suma'] = self._latencia_suma
+            datos['latencia_buckets'] = list(zip(BUCKETS_LATENCIA + (float('inf'),), self._latencia_buckets))
+        datos['conexiones_nuevas'] = nuevas
+        datos['conexiones_reutilizadas'] = max(servidas - nuevas, 0)
+        datos['breaker'] = self.breaker.estado
+        datos['breaker_fallos'] = self.breaker.fallos
+        return datos
+
+
+_clientes = {}
+_clientes_lock = threading.Lock()
+
+
+def obtener_cliente(nombre, **opciones):
+    """Cliente único por nombre dentro del proceso."""
+    with _clientes_lock:
+        if nombre not in _clientes:
+            _clientes[nombre] = ClienteHTTP(nombre, **opciones)
+        return _clientes[nombre]
+
+
+def metricas():
+    """Métricas de todos los clientes creados en este proceso."""
+    with _clientes_lock:
+        clientes = list(_clientes.values())
+    return {cliente.nombre: cliente.metricas() for cliente in clientes}
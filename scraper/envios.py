@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.mail import EmailMessage
+
+from core.envios import registrar
+from .pdf import generar_pdf_resultados
+
+
+@registrar('resultados_wikipedia')
+def mensaje_resultados(trabajo):
+    """Arma el email con el PDF de un resultado de Wikipedia."""
+    datos = trabajo.payload
+    palabra = datos.get('palabra')
+    url = datos.get('url')
+
+    email = EmailMessage(
+        subject=f"Resultados Wikipedia: {palabra or ''}",
+        body=f"A continuación se adjunta el PDF con los resultados para: {palabra or ''}\n\nFuente: {url or ''}",
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=datos['destinatarios'],
+    )
+    pdf_bytes = generar_pdf_resultados(palabra, datos.get('descripcion'), url)
+    email.attach(f"wiki_{(palabra or 'resultados')}.pdf", pdf_bytes, "application/pdf")
+    return email
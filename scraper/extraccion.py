@@ -0,0 +1,153 @@
+"""Extracción incremental del primer párrafo de un artículo de Wikipedia.
+
+En vez de descargar la página completa y armar un árbol con BeautifulSoup,
+el HTML se va pasando por trozos a un ``HTMLParser`` que sólo sigue el
+contenedor principal (``mw-content-text`` / ``mw-parser-output``) y corta
+en cuanto cierra el primer ``<p>`` con texto. En artículos largos eso evita
+bajar y parsear casi todo el documento.
+"""
+import codecs
+from html.parser import HTMLParser
+
+TAMANO_CHUNK = 16 * 1024
+SIN_INFORMACION = "Sin información."
+
+# Atributos que identifican el contenedor del artículo en MediaWiki
+IDS_CONTENEDOR = {"mw-content-text"}
+CLASES_CONTENEDOR = {"mw-parser-output"}
+# Su contenido nunca forma parte del texto visible del párrafo
+TAGS_IGNORADOS = {"style", "script"}
+# Elementos vacíos: no tienen cierre y no deben alterar la profundidad
+TAGS_VACIOS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr",
+}
+
+
+class ExtractorParrafo(HTMLParser):
+    """Parser que se detiene (``terminado``) al encontrar el primer párrafo con texto."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.profundidad = 0
+        self.profundidad_contenedor = None
+        self.en_parrafo = False
+        self.parrafo_en_contenedor = False
+        self.ignorando = 0
+        self.partes = []
+        # Primer párrafo fuera del contenedor: se usa si la página no lo tiene
+        self.respaldo = None
+        self.descripcion = None
+
+    @property
+    def terminado(self):
+        return self.descripcion is not None
+
+    def handle_starttag(self, tag, attrs):
+        if self.terminado:
+            return
+        if tag in TAGS_VACIOS:
+            return
+        self.profundidad += 1
+        if tag in TAGS_IGNORADOS:
+            self.ignorando += 1
+            return
+        if self.profundidad_contenedor is None:
+            attrs = dict(attrs)
+            clases = set((attrs.get("class") or "").split())
+            if attrs.get("id") in IDS_CONTENEDOR or clases & CLASES_CONTENEDOR:
+                self.profundidad_contenedor = self.profundidad
+        if tag == "p" and not self.en_parrafo:
+            self.en_parrafo = True
+            self.parrafo_en_contenedor = self.profundidad_contenedor is not None
+            self.partes = []
+
+    def handle_startendtag(self, tag, attrs):
+        # <br/>, <img/>, etc.: no abren nivel
+        pass
+
+    def handle_endtag(self, tag):
+        if self.terminado or tag in TAGS_VACIOS:
+            return
+        if tag in TAGS_IGNORADOS and self.ignorando:
+            self.ignorando -= 1
+        elif tag == "p" and self.en_parrafo:
+            self.en_parrafo = False
+            texto = "".join(self.partes).strip()
+            if texto:
+                if self.parrafo_en_contenedor:
+                    self.descripcion = texto
+                elif self.respaldo is None:
+                    self.respaldo = texto
+        if self.profundidad_contenedor is not None and self.profundidad <= self.profundidad_contenedor:
+            self.profundidad_contenedor = None
+        self.profundidad = max(self.profundidad - 1, 0)
+
+    def handle_data(self, data):
+        if self.en_parrafo and not self.ignorando and not self.terminado:
+            self.partes.append(data)
+
+    def resultado(self):
+        if self.descripcion is not None:
+            return self.descripcion
+        # Párrafo abierto al cortar el stream (HTML truncado o mal cerrado)
+        texto = "".join(self.partes).strip() if self.en_parrafo else ""
+        return self.respaldo or texto or SIN_INFORMACION
+
+
+class Alimentador:
+    """Decodifica trozos de bytes y los pasa al parser hasta que termina."""
+
+    def __init__(self, encoding="utf-8"):
+        self.decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+        self.parser = ExtractorParrafo()
+
+    def alimentar(self, chunk):
+        """Procesa un trozo; devuelve True cuando ya no hace falta leer más."""
+        self.parser.feed(self.decoder.decode(chunk) if isinstance(chunk, bytes) else chunk)
+        return self.parser.terminado
+
+    def resultado(self):
+        if not self.parser.terminado:
+            self.parser.feed(self.decoder.decode(b"", final=True))
+            self.parser.close()
+        return self.parser.resultado()
+
+
+def extraer_de_chunks(chunks, encoding="utf-8"):
+    """Primer párrafo con texto a partir de un iterable de bytes (o str).
+
+    Deja de consumir ``chunks`` apenas lo encuentra.
+    """
+    alimentador = Alimentador(encoding)
+    for chunk in chunks:
+        if alimentador.alimentar(chunk):
+            break
+    return alimentador.resultado()
+
+
+def extraer_de_respuesta(respuesta, tamano_chunk=TAMANO_CHUNK):
+    """Extrae el párrafo de una respuesta de ``requests`` pedida con ``stream=True``.
+
+    Cierra la respuesta al terminar, aunque no se haya leído completa.
+    """
+    try:
+        return extraer_de_chunks(respuesta.iter_content(chunk_size=tamano_chunk), respuesta.encoding)
+    finally:
+        respuesta.close()
+
+
+async def extraer_de_respuesta_async(respuesta, tamano_chunk=TAMANO_CHUNK):
+    """Igual que ``extraer_de_respuesta`` para una respuesta en stream de ``httpx``."""
+    try:
+        alimentador = Alimentador(respuesta.encoding)
+        async for chunk in respuesta.aiter_bytes(tamano_chunk):
+            if alimentador.alimentar(chunk):
+                break
+        return alimentador.resultado()
+    finally:
+        await respuesta.aclose()
+
+
+def extraer_descripcion(html):
+    """Versión para HTML ya descargado completo."""
+    return extraer_de_chunks([html])
@@ -1,4 +1,8 @@
 from django import forms
 
 class ScraperForm(forms.Form):
-    palabra = forms.CharField(label="Buscar en Wikipedia")
\ No newline at end of file
+    palabra = forms.CharField(
+        label="Buscar en Wikipedia",
+        help_text="Un término por línea.",
+        widget=forms.Textarea(attrs={'rows': 3}),
+    )
\ No newline at end of file
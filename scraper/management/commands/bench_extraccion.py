@@ -0,0 +1,80 @@
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+from django.core.management.base import BaseCommand
+
+from scraper.extraccion import TAMANO_CHUNK, extraer_de_chunks
+
+
+def extraer_bs4(html):
+    """Implementación anterior de buscar: soup completo y get_text() de cada <p>."""
+    soup = BeautifulSoup(html, "html.parser")
+    parrafos = [p.get_text().strip() for p in soup.select("p") if p.get_text().strip()]
+    return parrafos[0] if parrafos else "Sin información."
+
+
+def pagina_sintetica(secciones):
+    """HTML con la estructura de un artículo de Wikipedia (cabecera, infobox, cuerpo largo)."""
+    navegacion = "".join(f'<li><a href="/wiki/Link_{i}">Enlace {i}</a></li>' for i in range(400))
+    infobox = "".join(f"<tr><th>Dato {i}</th><td>Valor {i}</td></tr>" for i in range(40))
+    cuerpo = "".join(
+        f'<h2 id="s{i}">Sección {i}</h2>'
+        + "".join(f"<p>Texto de la sección {i}, párrafo {j}. " + "Lorem ipsum dolor sit amet. " * 20 + "</p>" for j in range(8))
+        for i in range(secciones)
+    )
+    return (
+        '<!DOCTYPE html><html><head><meta charset="UTF-8"><title>Artículo</title>'
+        '<style>.x{color:red}</style><script>var a = "<p>no</p>";</script></head><body>'
+        f'<div id="mw-navigation"><ul>{navegacion}</ul></div>'
+        '<div id="content"><div id="mw-content-text" class="mw-body-content">'
+        '<div class="mw-content-ltr mw-parser-output">'
+        f'<table class="infobox">{infobox}</table><p class="mw-empty-elt"></p>'
+        '<p><b>Python</b> es un lenguaje de programación de alto nivel<sup>[1]</sup>.</p>'
+        f"{cuerpo}</div></div></div></body></html>"
+    )
+
+
+class Command(BaseCommand):
+    help = "Compara la extracción incremental del scraper contra la versión con BeautifulSoup."
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivos', nargs='*', help="Páginas HTML guardadas (por defecto, páginas sintéticas).")
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if options['archivos']:
+            paginas = [(Path(a).name, Path(a).read_bytes()) for a in options['archivos']]
+        else:
+            paginas = [(f"sintetica_{n}_secciones", pagina_sintetica(n).encode()) for n in (5, 50, 400)]
+
+        repeticiones = max(1, options['repeticiones'])
+        for nombre, html in paginas:
+            chunks = [html[i:i + TAMANO_CHUNK] for i in range(0, len(html), TAMANO_CHUNK)]
+
+            consumidos = 0
+
+            def contar():
+                nonlocal consumidos
+                for chunk in chunks:
+                    consumidos += len(chunk)
+                    yield chunk
+
+            inicio = time.perf_counter()
+            for _ in range(repeticiones):
+                esperado = extraer_bs4(html.decode("utf-8", errors="replace"))
+            t_bs4 = (time.perf_counter() - inicio) / repeticiones
+
+            inicio = time.perf_counter()
+            for _ in range(repeticiones):
+                consumidos = 0
+                obtenido = extraer_de_chunks(contar())
+            t_stream = (time.perf_counter() - inicio) / repeticiones
+
+            self.stdout.write(
+                f"{nombre}: {len(html) / 1024:.0f} KB | bs4 {t_bs4 * 1000:.2f} ms | "
+                f"stream {t_stream * 1000:.2f} ms ({consumidos / 1024:.0f} KB leídos) | "
+                f"x{t_bs4 / t_stream:.1f} | {'OK' if obtenido == esperado else 'DIFIERE'}"
+            )
+            if obtenido != esperado:
+                self.stdout.write(f"  bs4:    {esperado[:100]!r}\n  stream: {obtenido[:100]!r}")
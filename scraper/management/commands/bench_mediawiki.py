@@ -0,0 +1,149 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from django.core.management.base import BaseCommand
+
+from scraper import cache, mediawiki, wikipedia
+from scraper.busqueda import _pool
+
+from .bench_extraccion import pagina_sintetica
+
+# TextExtracts con exintro devuelve como máximo 20 introducciones por respuesta
+EXTRACTOS_POR_RESPUESTA = 20
+
+
+def _pagina_api(titulo, i):
+    if titulo.startswith('Inexistente'):
+        return {'ns': 0, 'title': titulo, 'missing': True}
+    return {
+        'pageid': 1000 + i,
+        'ns': 0,
+        'title': titulo,
+        'extract': f"{titulo} es un artículo de prueba del stub de la API.\nSegundo párrafo de la introducción.",
+    }
+
+
+def respuesta_api(params):
+    """Respuesta con la forma de las grabadas de ``action=query&prop=extracts`` (formatversion=2).
+
+    Títulos en minúscula se normalizan (``python`` -> ``Python``), los que
+    empiezan con ``Redir`` redirigen al resto del título y los que empiezan
+    con ``Inexistente`` no existen. Como la API real, corta en 20 extractos y
+    manda el resto con ``excontinue``.
+    """
+    titulos = params.get('titles', '').split('|')
+    normalizados, redirecciones, destinos = [], [], []
+    for titulo in titulos:
+        normalizado = titulo.replace('_', ' ')
+        normalizado = normalizado[:1].upper() + normalizado[1:]
+        if normalizado != titulo:
+            normalizados.append({'fromencoded': False, 'from': titulo, 'to': normalizado})
+        if normalizado.startswith('Redir') and len(normalizado) > 5:
+            destino = normalizado[5:]
+            redirecciones.append({'from': normalizado, 'to': destino})
+            normalizado = destino
+        if normalizado not in destinos:
+            destinos.append(normalizado)
+
+    desde = int(params.get('excontinue', 0))
+    paginas = []
+    for i, titulo in enumerate(destinos):
+        pagina = _pagina_api(titulo, i)
+        if 'extract' in pagina and not desde <= i < desde + EXTRACTOS_POR_RESPUESTA:
+            del pagina['extract']
+        paginas.append(pagina)
+
+    consulta = {'pages': paginas}
+    if normalizados:
+        consulta['normalized'] = normalizados
+    if redirecciones:
+        consulta['redirects'] = redirecciones
+    datos = {'batchcomplete': True, 'query': consulta}
+    if desde + EXTRACTOS_POR_RESPUESTA < len(destinos):
+        datos['continue'] = {'excontinue': desde + EXTRACTOS_POR_RESPUESTA, 'continue': '||'}
+    return datos
+
+
+class StubWikipedia(BaseHTTPRequestHandler):
+    """Wikipedia local: ``/w/api.php`` con respuestas de la API y ``/wiki/<termino>`` con HTML."""
+
+    latencia = 0.0
+    secciones = 50
+    bytes_enviados = 0
+    peticiones = 0
+    _lock = threading.Lock()
+
+    def do_GET(self):
+        time.sleep(self.latencia)
+        partes = urlsplit(self.path)
+        if partes.path == mediawiki.RUTA_API:
+            params = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+            cuerpo, tipo = json.dumps(respuesta_api(params)).encode(), 'application/json; charset=utf-8'
+        else:
+            cuerpo, tipo = pagina_sintetica(self.secciones).encode(), 'text/html; charset=utf-8'
+        with self._lock:
+            StubWikipedia.bytes_enviados += len(cuerpo)
+            StubWikipedia.peticiones += 1
+        self.send_response(200)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def iniciar_stub(handler=StubWikipedia):
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    wikipedia.BASE_URL = f"http://127.0.0.1:{servidor.server_port}"
+    return servidor
+
+
+def _buscar_html(terminos):
+    # Lo que hacía buscar antes del backend de la API: una página por término
+    return list(_pool.map(lambda t: cache.revalidar(t), terminos))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara, contra un stub local, buscar N términos con la API de MediaWiki (lotes de 50) "
+        "y con el scraper HTML (una página por término): peticiones, bytes recibidos y tiempo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--terminos', type=int, default=50)
+        parser.add_argument('--secciones', type=int, default=50, help="Tamaño de las páginas HTML del stub.")
+        parser.add_argument('--latencia-stub', type=float, default=0.0, help="ms de latencia por petición.")
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def handle(self, *args, **options):
+        from core.management.commands.bench_endpoints import base_temporal
+
+        StubWikipedia.latencia = options['latencia_stub'] / 1000
+        StubWikipedia.secciones = options['secciones']
+        terminos = [f"termino {i}" for i in range(options['terminos'])]
+        variantes = {
+            'api (lotes)': lambda: [mediawiki.consultar(lote) for lote in mediawiki.lotes(terminos)],
+            'html (por término)': lambda: _buscar_html(terminos),
+        }
+        with base_temporal():
+            servidor = iniciar_stub()
+            try:
+                for nombre, funcion in variantes.items():
+                    StubWikipedia.bytes_enviados = StubWikipedia.peticiones = 0
+                    inicio = time.perf_counter()
+                    for _ in range(options['repeticiones']):
+                        funcion()
+                    segundos = (time.perf_counter() - inicio) / options['repeticiones']
+                    self.stdout.write(
+                        f"{nombre:20s} {StubWikipedia.peticiones / options['repeticiones']:5.0f} peticiones | "
+                        f"{StubWikipedia.bytes_enviados / options['repeticiones'] / 1024:8.1f} KiB | "
+                        f"{segundos * 1000:8.1f} ms"
+                    )
+            finally:
+                servidor.shutdown()
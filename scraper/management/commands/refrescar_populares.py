@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from scraper import refresco
+from scraper.cache import REFRESCOS_POR_SEGUNDO, TTL
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresca en segundo plano los términos más buscados antes de que venzan en la cache "
+        f"(a lo sumo {REFRESCOS_POR_SEGUNDO} peticiones por segundo a Wikipedia)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--populares', type=int, default=refresco.POPULARES, help="Términos a mantener frescos.")
+        parser.add_argument(
+            '--intervalo', type=float, default=max(60.0, TTL * (1 - refresco.ANTICIPACION) / 4),
+            help="Segundos entre ciclos.",
+        )
+        parser.add_argument('--once', action='store_true', help="Hace un ciclo y termina.")
+
+    def handle(self, *args, **options):
+        while True:
+            inicio = time.monotonic()
+            refrescados = refresco.ciclo(options['populares'])
+            if refrescados or options['verbosity'] > 1:
+                self.stdout.write(f"{refrescados} términos refrescados en {time.monotonic() - inicio:.1f} s.")
+            if options['once']:
+                break
+            time.sleep(options['intervalo'])
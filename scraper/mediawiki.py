@@ -0,0 +1,134 @@
+"""Búsqueda por lotes con la API de MediaWiki (TextExtracts).
+
+Una sola petición ``action=query&prop=extracts&exintro&titles=a|b|c`` trae
+la introducción en texto plano de hasta ``MAX_TITULOS`` términos, con la
+normalización de títulos (``python`` -> ``Python``) y las redirecciones
+resueltas en la misma llamada. Frente a bajar y parsear el HTML de cada
+artículo, son unos pocos KB de JSON por lote.
+
+TextExtracts devuelve como máximo 20 introducciones por respuesta; el resto
+llega siguiendo ``continue`` dentro del mismo lote.
+
+Usa el ``ClienteHTTP`` de ``wikipedia`` (mismo pool, breaker y límite por
+host). Los términos que la API no puede responder (``|`` en el término,
+título inválido, error de red) quedan fuera del resultado y el llamador los
+resuelve con el scraper HTML.
+"""
+import json
+from urllib.parse import urlencode
+
+from django.conf import settings
+
+from . import wikipedia
+from .extraccion import SIN_INFORMACION
+
+MAX_TITULOS = 50
+# Corta la cadena de continuaciones si la API no converge
+MAX_CONTINUACIONES = 5
+RUTA_API = getattr(settings, 'WIKIPEDIA_API_PATH', '/w/api.php')
+NO_EXISTE = "No existe la página en Wikipedia."
+
+
+def url_api():
+    return f"{wikipedia.BASE_URL}{RUTA_API}"
+
+
+def parametros(titulos):
+    return {
+        'action': 'query',
+        'format': 'json',
+        'formatversion': 2,
+        'prop': 'extracts',
+        'exintro': 1,
+        'explaintext': 1,
+        'exlimit': 'max',
+        'redirects': 1,
+        'titles': '|'.join(titulos),
+    }
+
+
+def admitido(termino):
+    """La API separa títulos con ``|``: esos términos van por el scraper HTML."""
+    return bool(termino) and '|' not in termino
+
+
+def lotes(terminos, tamano=MAX_TITULOS):
+    for i in range(0, len(terminos), tamano):
+        yield terminos[i:i + tamano]
+
+
+def _primer_parrafo(extracto):
+    for linea in (extracto or '').splitlines():
+        if linea.strip():
+            return linea.strip()
+    return SIN_INFORMACION
+
+
+def _acumular(paginas, datos):
+    """Suma las páginas de una respuesta (o continuación) a ``paginas`` por título."""
+    consulta = datos.get('query', {})
+    for pagina in consulta.get('pages', []):
+        previa = paginas.setdefault(pagina['title'], pagina)
+        if previa is not pagina and pagina.get('extract'):
+            previa['extract'] = pagina['extract']
+    return consulta
+
+
+def interpretar(terminos, paginas, normalizados, redirecciones):
+    """{termino: (resultado, status)} siguiendo normalización y redirecciones."""
+    resultados = {}
+    for termino in terminos:
+        titulo = normalizados.get(termino, termino)
+        titulo = redirecciones.get(titulo, titulo)
+        pagina = paginas.get(titulo)
+        if pagina is None or pagina.get('invalid'):
+            continue
+        if pagina.get('missing'):
+            descripcion, status = NO_EXISTE, 404
+        else:
+            descripcion, status = _primer_parrafo(pagina.get('extract')), 200
+        resultados[termino] = (
+            {'titulo': termino, 'descripcion': descripcion, 'url': wikipedia.url_termino(titulo)},
+            status,
+        )
+    return resultados
+
+
+def _mapas(consulta, normalizados, redirecciones):
+    for item in consulta.get('normalized', []):
+        normalizados[item['from']] = item['to']
+    for item in consulta.get('redirects', []):
+        redirecciones[item['from']] = item['to']
+
+
+def consultar(terminos):
+    """Resultados de hasta ``MAX_TITULOS`` términos. Propaga requests.RequestException."""
+    params = parametros(terminos)
+    paginas, normalizados, redirecciones = {}, {}, {}
+    for _ in range(MAX_CONTINUACIONES):
+        respuesta = wikipedia.cliente.get(url_api(), params=params)
+        respuesta.raise_for_status()
+        datos = respuesta.json()
+        _mapas(_acumular(paginas, datos), normalizados, redirecciones)
+        if 'continue' not in datos:
+            break
+        params = {**params, **datos['continue']}
+    return interpretar(terminos, paginas, normalizados, redirecciones)
+
+
+async def consultar_async(terminos):
+    """Versión async de ``consultar``. Propaga httpx.HTTPError / CircuitoAbierto."""
+    params = parametros(terminos)
+    paginas, normalizados, redirecciones = {}, {}, {}
+    for _ in range(MAX_CONTINUACIONES):
+        respuesta = await wikipedia.cliente_async.get(f"{url_api()}?{urlencode(params)}")
+        try:
+            respuesta.raise_for_status()
+            datos = json.loads(await respuesta.aread())
+        finally:
+            await respuesta.aclose()
+        _mapas(_acumular(paginas, datos), normalizados, redirecciones)
+        if 'continue' not in datos:
+            break
+        params = {**params, **datos['continue']}
+    return interpretar(terminos, paginas, normalizados, redirecciones)
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusquedaWikipedia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termino', models.CharField(max_length=255, unique=True, verbose_name='Término')),
+                ('titulo', models.CharField(max_length=255, verbose_name='Título')),
+                ('descripcion', models.TextField(verbose_name='Descripción')),
+                ('url', models.URLField(max_length=500, verbose_name='URL')),
+                ('status', models.PositiveSmallIntegerField(verbose_name='Status HTTP')),
+                ('etag', models.CharField(blank=True, max_length=255)),
+                ('last_modified', models.CharField(blank=True, max_length=100)),
+                ('actualizado', models.DateTimeField(verbose_name='Última validación')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Búsqueda en Wikipedia',
+                'verbose_name_plural': 'Búsquedas en Wikipedia',
+                'ordering': ['termino'],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='busquedawikipedia',
+            name='consultas',
+            field=models.PositiveIntegerField(default=0, verbose_name='Consultas'),
+        ),
+        migrations.AddField(
+            model_name='busquedawikipedia',
+            name='ultima_consulta',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Última consulta'),
+        ),
+        migrations.AddIndex(
+            model_name='busquedawikipedia',
+            index=models.Index(fields=['-consultas'], name='scraper_busqueda_populares'),
+        ),
+    ]
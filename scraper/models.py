@@ -1,3 +1,30 @@
 from django.db import models
 
-# Create your models here.
+
+class BusquedaWikipedia(models.Model):
+    """Resultado cacheado de una búsqueda en Wikipedia, por término normalizado."""
+
+    termino = models.CharField("Término", max_length=255, unique=True)
+    titulo = models.CharField("Título", max_length=255)
+    descripcion = models.TextField("Descripción")
+    url = models.URLField("URL", max_length=500)
+    status = models.PositiveSmallIntegerField("Status HTTP")
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=100, blank=True)
+    actualizado = models.DateTimeField("Última validación")
+    # Popularidad: búsquedas acumuladas y la última, para refrescar antes de que venza
+    consultas = models.PositiveIntegerField("Consultas", default=0)
+    ultima_consulta = models.DateTimeField("Última consulta", null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['termino']
+        indexes = [models.Index(fields=['-consultas'], name='scraper_busqueda_populares')]
+        verbose_name = "Búsqueda en Wikipedia"
+        verbose_name_plural = "Búsquedas en Wikipedia"
+
+    def __str__(self):
+        return f"{self.termino} ({self.status})"
+
+    def como_resultado(self):
+        return {"titulo": self.titulo, "descripcion": self.descripcion, "url": self.url}
@@ -0,0 +1,47 @@
+import textwrap
+
+from reportlab.lib.pagesizes import letter
+
+from core.pdf import Plantilla, renderizar
+
+MAX_CARACTERES = 900
+Y_INICIAL = 750
+
+
+def _contenido_resultados(p, datos, salto):
+    y = Y_INICIAL
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(50, y, f"Resultados Wikipedia: {datos['palabra'] or 'Sin título'}")
+    y -= 30
+
+    if datos['descripcion']:
+        lineas = textwrap.wrap(datos['descripcion'][:MAX_CARACTERES], width=90)
+        # Un objeto de texto por página: la fuente se fija una vez, no por línea
+        texto = p.beginText(50, y)
+        texto.setFont("Helvetica", 10)
+        texto.setLeading(14)
+        for linea in lineas:
+            if y < 80:
+                p.drawText(texto)
+                salto()
+                y = Y_INICIAL
+                texto = p.beginText(50, y)
+                texto.setFont("Helvetica", 10)
+                texto.setLeading(14)
+            texto.textLine(linea)
+            y -= 14
+        p.drawText(texto)
+    # agregar la URL al final
+    if y < 120:
+        salto()
+        y = Y_INICIAL
+    p.setFont("Helvetica-Oblique", 9)
+    p.drawString(50, y - 10, f"Fuente: {datos['url'] or 'N/A'}")
+
+
+RESULTADOS = Plantilla('resultados_wikipedia', letter, _contenido_resultados)
+
+
+def generar_pdf_resultados(palabra, descripcion, url):
+    """Genera en memoria el PDF con el resultado de Wikipedia y devuelve los bytes."""
+    return renderizar(RESULTADOS, {'palabra': palabra, 'descripcion': descripcion, 'url': url})
@@ -0,0 +1,89 @@
+"""Popularidad de los términos y refresco anticipado de los más buscados.
+
+Cada búsqueda suma a un contador en memoria (``registrar``) y cada
+``SCRAPER_POPULARIDAD_VOLCADO`` segundos el contador se vuelca a
+``BusquedaWikipedia`` con un UPDATE por cada cantidad distinta, así la
+búsqueda no escribe en la base en cada petición.
+
+``ciclo()`` (``manage.py refrescar_populares``) toma los ``SCRAPER_POPULARES``
+términos más buscados en la ventana y refresca los que ya consumieron
+``SCRAPER_REFRESCO_ANTICIPADO`` de su TTL: se renuevan antes de vencer y una
+búsqueda de un término popular siempre sale de la cache. Las peticiones a
+Wikipedia pasan por ``cache.ritmo``.
+"""
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F
+from django.utils import timezone
+
+from . import cache, mediawiki
+from .models import BusquedaWikipedia
+
+logger = logging.getLogger(__name__)
+
+POPULARES = getattr(settings, 'SCRAPER_POPULARES', 200)
+# Sólo cuentan los términos buscados en los últimos VENTANA segundos
+VENTANA = getattr(settings, 'SCRAPER_POPULARIDAD_VENTANA', 7 * 24 * 3600)
+# Fracción del TTL a partir de la cual una entrada popular se refresca
+ANTICIPACION = getattr(settings, 'SCRAPER_REFRESCO_ANTICIPADO', 0.8)
+VOLCADO = getattr(settings, 'SCRAPER_POPULARIDAD_VOLCADO', 30)
+
+_contador = Counter()
+_lock = threading.Lock()
+_ultimo_volcado = time.monotonic()
+
+
+def registrar(palabras):
+    """Suma una consulta a cada término. Devuelve True si ya corresponde llamar a ``volcar``."""
+    with _lock:
+        _contador.update(cache.normalizar_termino(palabra) for palabra in palabras)
+        return time.monotonic() - _ultimo_volcado >= VOLCADO
+
+
+def volcar():
+    """Pasa el contador en memoria a la tabla. Devuelve cuántos términos actualizó."""
+    global _ultimo_volcado
+    with _lock:
+        conteos = dict(_contador)
+        _contador.clear()
+        _ultimo_volcado = time.monotonic()
+
+    por_cantidad = defaultdict(list)
+    for clave, cantidad in conteos.items():
+        por_cantidad[cantidad].append(clave)
+    ahora = timezone.now()
+    try:
+        for cantidad, claves in por_cantidad.items():
+            BusquedaWikipedia.objects.filter(termino__in=claves).update(
+                consultas=F('consultas') + cantidad, ultima_consulta=ahora,
+            )
+    except DatabaseError as e:
+        logger.warning("No se pudo guardar la popularidad de %s términos: %s", len(conteos), e)
+    return len(conteos)
+
+
+def por_refrescar(limite=POPULARES, ahora=None):
+    """Términos (tal como se buscaron) entre los ``limite`` más populares que conviene refrescar."""
+    ahora = ahora or timezone.now()
+    umbral = ahora - timedelta(seconds=cache.TTL * ANTICIPACION)
+    populares = (
+        BusquedaWikipedia.objects
+        .filter(consultas__gt=0, ultima_consulta__gte=ahora - timedelta(seconds=VENTANA))
+        .order_by('-consultas')
+        .values_list('titulo', 'actualizado')[:limite]
+    )
+    return [titulo for titulo, actualizado in populares if actualizado <= umbral]
+
+
+def ciclo(limite=POPULARES):
+    """Refresca los términos populares por vencer. Devuelve cuántos se pidieron a Wikipedia."""
+    palabras = por_refrescar(limite)
+    for lote in mediawiki.lotes(palabras):
+        cache.refrescar(lote)
+    return len(palabras)
@@ -1,3 +1,354 @@
+import asyncio
+import json
+import threading
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+import requests
 from django.test import TestCase
+from django.utils import timezone
+
+from core import instrumentacion
+
+from . import busqueda, cache, mediawiki, wikipedia
+from .cliente_async import ClienteHTTPAsync
+from .cliente_http import CircuitBreaker, CircuitoAbierto, ClienteHTTP
+from .management.commands.bench_extraccion import pagina_sintetica
+from .management.commands.bench_mediawiki import StubWikipedia, iniciar_stub, respuesta_api
+from .models import BusquedaWikipedia
+
+ETAG = '"v1"'
+
+
+class StubGuionado(StubWikipedia):
+    """Stub de Wikipedia con ETag/304 en las páginas y status forzados.
+
+    ``guion`` es una lista de status que se responden (sin cuerpo) en orden
+    antes de volver al comportamiento normal. ``pedidos`` guarda (ruta, headers).
+    """
+
+    guion = []
+    pedidos = []
+
+    def do_GET(self):
+        with self._lock:
+            StubGuionado.pedidos.append((self.path, dict(self.headers)))
+            status = StubGuionado.guion.pop(0) if StubGuionado.guion else None
+        partes = urlsplit(self.path)
+        if status is not None:
+            self._responder(status, b'')
+        elif partes.path == mediawiki.RUTA_API:
+            params = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+            self._responder(200, json.dumps(respuesta_api(params)).encode(), 'application/json; charset=utf-8')
+        elif partes.path.startswith('/wiki/Inexistente'):
+            self._responder(404, b'<html><body>No existe</body></html>')
+        elif self.headers.get('If-None-Match') == ETAG:
+            self._responder(304, b'')
+        else:
+            self._responder(200, pagina_sintetica(2).encode(), etag=ETAG)
+
+    def _responder(self, status, cuerpo, tipo='text/html; charset=utf-8', etag=None):
+        self.send_response(status)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+class ConStubMixin:
+    """Levanta el stub una vez por clase y apunta ``wikipedia.BASE_URL`` a él."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._base_url = wikipedia.BASE_URL
+        cls.servidor = iniciar_stub(StubGuionado)
+        cls.url = wikipedia.BASE_URL
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        wikipedia.BASE_URL = cls._base_url
+        super().tearDownClass()
+
+    def setUp(self):
+        StubGuionado.guion = []
+        StubGuionado.pedidos = []
+        cache.lru.clear()
+        wikipedia.cliente.breaker.registrar_exito()
+
+    def rutas(self):
+        return [urlsplit(ruta).path for ruta, _ in StubGuionado.pedidos]
+
+
+class CircuitBreakerTests(TestCase):
+
+    def setUp(self):
+        self.ahora = 1000.0
+        reloj = mock.patch('scraper.cliente_http.time.monotonic', side_effect=lambda: self.ahora)
+        reloj.start()
+        self.addCleanup(reloj.stop)
+        self.breaker = CircuitBreaker(umbral_fallos=2, espera=30)
+
+    def test_abre_tras_umbral_de_fallos(self):
+        self.breaker.registrar_fallo()
+        self.assertEqual(self.breaker.estado, CircuitBreaker.CERRADO)
+        self.breaker.registrar_fallo()
+        self.assertEqual(self.breaker.estado, CircuitBreaker.ABIERTO)
+        self.assertFalse(self.breaker.permitir())
+
+    def test_exito_reinicia_la_cuenta(self):
+        self.breaker.registrar_fallo()
+        self.breaker.registrar_exito()
+        self.breaker.registrar_fallo()
+        self.assertEqual(self.breaker.estado, CircuitBreaker.CERRADO)
+
+    def test_semiabierto_deja_pasar_una_sola_prueba(self):
+        self.breaker.registrar_fallo()
+        self.breaker.registrar_fallo()
+        self.ahora += 30
+        self.assertTrue(self.breaker.permitir())
+        self.assertEqual(self.breaker.estado, CircuitBreaker.SEMIABIERTO)
+        self.assertFalse(self.breaker.permitir())
+
+        self.breaker.registrar_exito()
+        self.assertEqual(self.breaker.estado, CircuitBreaker.CERRADO)
+        self.assertTrue(self.breaker.permitir())
+
+    def test_prueba_fallida_vuelve_a_abrir(self):
+        self.breaker.registrar_fallo()
+        self.breaker.registrar_fallo()
+        self.ahora += 30
+        self.assertTrue(self.breaker.permitir())
+        self.breaker.registrar_fallo()
+        self.assertEqual(self.breaker.estado, CircuitBreaker.ABIERTO)
+        self.assertFalse(self.breaker.permitir())
+        self.ahora += 30
+        self.assertTrue(self.breaker.permitir())
+
+    def test_liberar_prueba_no_cuenta_fallo(self):
+        self.breaker.registrar_fallo()
+        self.breaker.liberar_prueba()
+        self.assertEqual((self.breaker.estado, self.breaker.fallos), (CircuitBreaker.CERRADO, 1))
+        self.breaker.registrar_fallo()
+        self.ahora += 30
+        self.assertTrue(self.breaker.permitir())
+        self.breaker.liberar_prueba()
+        self.assertEqual(self.breaker.estado, CircuitBreaker.SEMIABIERTO)
+        self.assertTrue(self.breaker.permitir())
+
+
+class ClienteHTTPTests(ConStubMixin, TestCase):
+
+    def cliente(self, **opciones):
+        return ClienteHTTP('prueba', **{'reintentos': 1, 'umbral_fallos': 3, 'espera_breaker': 30, **opciones})
+
+    def test_reintenta_un_5xx(self):
+        cliente = self.cliente()
+        StubGuionado.guion = [503]
+        respuesta = cliente.get(f'{self.url}/wiki/Python')
+        self.assertEqual(respuesta.status_code, 200)
+        metricas = cliente.metricas()
+        self.assertEqual((metricas['peticiones'], metricas['reintentos'], metricas['errores']), (2, 1, 1))
+        self.assertEqual(metricas['breaker'], CircuitBreaker.CERRADO)
+
+    def test_sin_presupuesto_no_reintenta(self):
+        cliente = self.cliente()
+        cliente.presupuesto.fichas = 0
+        cliente.presupuesto.ratio = 0
+        StubGuionado.guion = [503]
+        self.assertEqual(cliente.get(f'{self.url}/wiki/Python').status_code, 503)
+        self.assertEqual(cliente.metricas()['reintentos'], 0)
+
+    def test_reintentos_acotados(self):
+        cliente = self.cliente(reintentos=2)
+        StubGuionado.guion = [503, 503, 503, 503]
+        self.assertEqual(cliente.get(f'{self.url}/wiki/Python').status_code, 503)
+        self.assertEqual(len(StubGuionado.pedidos), 3)
+
+    def test_breaker_abre_y_falla_rapido(self):
+        cliente = self.cliente(reintentos=0, umbral_fallos=2)
+        StubGuionado.guion = [503, 503]
+        cliente.get(f'{self.url}/wiki/Python')
+        cliente.get(f'{self.url}/wiki/Python')
+        with self.assertRaises(CircuitoAbierto):
+            cliente.get(f'{self.url}/wiki/Python')
+        self.assertEqual(len(StubGuionado.pedidos), 2)
+        self.assertEqual(cliente.metricas()['rechazadas'], 1)
+
+    def test_error_de_conexion_cuenta_como_fallo(self):
+        cliente = self.cliente(reintentos=0, umbral_fallos=1)
+        with self.assertRaises(requests.ConnectionError):
+            cliente.get('http://127.0.0.1:9/wiki/Python', timeout=1)
+        self.assertEqual(cliente.breaker.estado, CircuitBreaker.ABIERTO)
+
+    def test_otro_error_libera_la_prueba(self):
+        cliente = self.cliente(reintentos=0, umbral_fallos=1, espera_breaker=0)
+        cliente.breaker.registrar_fallo()
+        with mock.patch.object(cliente.session, 'get', side_effect=requests.TooManyRedirects('bucle')):
+            with self.assertRaises(requests.TooManyRedirects):
+                cliente.get(f'{self.url}/wiki/Python')
+        self.assertEqual(cliente.get(f'{self.url}/wiki/Python').status_code, 200)
+        self.assertEqual(cliente.breaker.estado, CircuitBreaker.CERRADO)
+
+    def test_cancelar_async_no_abre_el_circuito(self):
+        cliente = self.cliente(reintentos=0, umbral_fallos=1)
+        cliente_async = ClienteHTTPAsync(cliente)
+
+        async def cancelar():
+            with mock.patch('httpx.AsyncClient.send', side_effect=asyncio.CancelledError):
+                with self.assertRaises(asyncio.CancelledError):
+                    await cliente_async.get(f'{self.url}/wiki/Python')
+
+        for _ in range(3):
+            asyncio.run(cancelar())
+        self.assertEqual(cliente.breaker.estado, CircuitBreaker.CERRADO)
+        self.assertEqual(cliente.metricas()['errores'], 0)
+
+    def test_reutiliza_conexiones(self):
+        cliente = self.cliente()
+        for _ in range(3):
+            cliente.get(f'{self.url}/wiki/Python').close()
+        metricas = cliente.metricas()
+        self.assertEqual(metricas['conexiones_nuevas'], 1)
+        self.assertEqual(metricas['conexiones_reutilizadas'], 2)
+
+
+class CacheBusquedaTests(ConStubMixin, TestCase):
+
+    def test_primera_busqueda_descarga_y_guarda(self):
+        resultado = cache.obtener_resultado('Python')
+        self.assertIn('lenguaje de programación', resultado['descripcion'])
+        self.assertEqual(self.rutas(), ['/wiki/Python'])
+        entrada = BusquedaWikipedia.objects.get(termino='python')
+        self.assertEqual((entrada.status, entrada.etag), (200, ETAG))
+
+    def test_repeticion_sale_de_memoria_y_de_la_tabla(self):
+        cache.obtener_resultado('Python')
+        self.assertEqual(cache.obtener_resultado('  PYTHON '), cache.obtener_resultado('python'))
+        cache.lru.clear()
+        with self.assertNumQueries(1):
+            cache.obtener_resultado('Python')
+        self.assertEqual(len(StubGuionado.pedidos), 1)
+
+    def test_vencida_revalida_con_get_condicional(self):
+        cache.obtener_resultado('Python')
+        viejo = timezone.now() - timedelta(seconds=cache.TTL + cache.SWR + 1)
+        BusquedaWikipedia.objects.update(actualizado=viejo)
+        cache.lru.clear()
+
+        resultado = cache.obtener_resultado('Python')
+        self.assertIn('lenguaje de programación', resultado['descripcion'])
+        self.assertEqual(StubGuionado.pedidos[-1][1].get('If-None-Match'), ETAG)
+        self.assertGreater(BusquedaWikipedia.objects.get(termino='python').actualizado, viejo)
+
+    def test_upstream_caido_sirve_la_vencida(self):
+        cache.obtener_resultado('Python')
+        BusquedaWikipedia.objects.update(actualizado=timezone.now() - timedelta(seconds=cache.TTL + cache.SWR + 1))
+        cache.lru.clear()
+        StubGuionado.guion = [503, 503]
+        self.assertIn('lenguaje de programación', cache.obtener_resultado('Python')['descripcion'])
+
+    def test_5xx_sin_entrada_no_se_cachea(self):
+        StubGuionado.guion = [503, 503]
+        self.assertIn('503', cache.obtener_resultado('Python')['descripcion'])
+        self.assertFalse(BusquedaWikipedia.objects.exists())
+
+    def test_pagina_inexistente_se_cachea(self):
+        resultado = cache.obtener_resultado('Inexistente uno')
+        self.assertEqual(resultado['descripcion'], "No existe la página en Wikipedia.")
+        self.assertEqual(BusquedaWikipedia.objects.get().status, 404)
+        cache.obtener_resultado('Inexistente uno')
+        self.assertEqual(len(StubGuionado.pedidos), 1)
+
+
+class LRUTests(TestCase):
+
+    def test_descarta_lo_menos_usado(self):
+        lru = cache.LRU(2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')), (1, None, 3))
+
+    def test_concurrente(self):
+        lru = cache.LRU(50)
+        hilos = [threading.Thread(target=lambda n=n: [lru.set(f'{n}-{i}', i) for i in range(200)]) for n in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(len(lru), 50)
+
+
+class MediaWikiTests(ConStubMixin, TestCase):
+
+    def test_lote_sigue_excontinue(self):
+        terminos = [f"Termino {i}" for i in range(25)]
+        resultados = mediawiki.consultar(terminos)
+        self.assertEqual(self.rutas(), [mediawiki.RUTA_API] * 2)
+        self.assertEqual(set(resultados), set(terminos))
+        for termino, (resultado, status) in resultados.items():
+            self.assertEqual(status, 200)
+            self.assertEqual(resultado['descripcion'], f"{termino} es un artículo de prueba del stub de la API.")
+
+    def test_normalizacion_y_redirecciones(self):
+        resultados = mediawiki.consultar(['python', 'RedirDjango'])
+        self.assertEqual(resultados['python'][0]['url'], f"{self.url}/wiki/Python")
+        self.assertTrue(resultados['python'][0]['descripcion'].startswith('Python es'))
+        self.assertEqual(resultados['RedirDjango'][0]['url'], f"{self.url}/wiki/Django")
+        self.assertTrue(resultados['RedirDjango'][0]['descripcion'].startswith('Django es'))
+
+    def test_pagina_inexistente(self):
+        resultado, status = mediawiki.consultar(['Inexistente dos'])['Inexistente dos']
+        self.assertEqual((resultado['descripcion'], status), (mediawiki.NO_EXISTE, 404))
+
+    def test_lotes_de_50(self):
+        self.assertEqual([len(lote) for lote in mediawiki.lotes(list(range(120)))], [50, 50, 20])
+
+    def test_version_async(self):
+        resultados = asyncio.run(mediawiki.consultar_async(['python', 'RedirDjango', 'Inexistente tres']))
+        self.assertEqual(resultados['python'][0]['url'], f"{self.url}/wiki/Python")
+        self.assertEqual(resultados['RedirDjango'][0]['url'], f"{self.url}/wiki/Django")
+        self.assertEqual(resultados['Inexistente tres'][1], 404)
+
+    def test_obtener_resultados_cachea_el_lote(self):
+        resultados = cache.obtener_resultados(['python', 'Django', 'a|b'])
+        self.assertEqual(set(resultados), {'python', 'Django'})
+        self.assertEqual(self.rutas(), [mediawiki.RUTA_API])
+        self.assertEqual(set(BusquedaWikipedia.objects.values_list('termino', flat=True)), {'python', 'django'})
+
+        cache.lru.clear()
+        self.assertEqual(cache.obtener_resultados(['Python', 'django']).keys(), {'Python', 'django'})
+        self.assertEqual(len(StubGuionado.pedidos), 1)
+
+    def test_api_caida_deja_los_terminos_al_scraper(self):
+        StubGuionado.guion = [503, 503]
+        with self.assertLogs('scraper.cache', 'WARNING'):
+            self.assertEqual(cache.obtener_resultados(['python']), {})
+
+
+class BusquedaParalelaTests(TestCase):
+
+    def test_el_pool_suma_a_la_medicion_de_la_peticion(self):
+        def descarga(resultado):
+            def hacer(*args):
+                instrumentacion.registrar('http', 0.01)
+                return resultado
+            return hacer
+
+        medicion, token = instrumentacion.iniciar()
+        self.addCleanup(instrumentacion.terminar, token)
+        with mock.patch.object(busqueda, 'BACKEND', 'api'), \
+                mock.patch.object(busqueda, 'obtener_resultados', descarga({'uno': {'titulo': 'uno'}})), \
+                mock.patch.object(busqueda, 'obtener_resultado', descarga({'titulo': 'dos'})), \
+                mock.patch.object(busqueda.refresco, 'registrar', return_value=False):
+            resultados = busqueda.buscar_terminos(['uno', 'dos'])
 
-# Create your tests here.
+        self.assertEqual([r['titulo'] for r in resultados], ['uno', 'dos'])
+        self.assertEqual(medicion.cantidades['http'], 2)
@@ -1,10 +1,12 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = "scraper"
 
 urlpatterns = [
-    path("", views.buscar, name="buscar"),
+    path("", views.buscar_async if settings.VISTAS_ASYNC else views.buscar, name="buscar"),
     path("resultados/", views.scraper_resultados, name="resultados"),
-    path("enviar/", views.enviar_resultados, name="enviar"),
+    path("enviar/", views.enviar_resultados_async if settings.VISTAS_ASYNC else views.enviar_resultados, name="enviar"),
+    path("salud/", views.salud_http, name="salud_http"),
 ]
\ No newline at end of file
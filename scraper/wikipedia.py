@@ -0,0 +1,86 @@
+"""Acceso a Wikipedia: descarga de la página de un término y extracción del primer párrafo."""
+from django.conf import settings
+
+from .cliente_async import ClienteHTTPAsync
+from .cliente_http import obtener_cliente
+from .extraccion import extraer_de_respuesta, extraer_de_respuesta_async
+
+BASE_URL = getattr(settings, 'WIKIPEDIA_BASE_URL', 'https://es.wikipedia.org')
+TIMEOUT = getattr(settings, 'WIKIPEDIA_TIMEOUT', 8)
+# Descargas simultáneas como máximo contra un mismo host
+MAX_POR_HOST = getattr(settings, 'SCRAPER_MAX_POR_HOST', 8)
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; MiScraper/1.0; +http://example.com)"
+}
+
+
+# Cliente compartido por el proceso: pool keep-alive, circuit breaker y reintentos acotados
+cliente = obtener_cliente(
+    'wikipedia',
+    pool_maxsize=MAX_POR_HOST,
+    timeout=TIMEOUT,
+    reintentos=getattr(settings, 'WIKIPEDIA_REINTENTOS', 1),
+    umbral_fallos=getattr(settings, 'WIKIPEDIA_BREAKER_FALLOS', 5),
+    espera_breaker=getattr(settings, 'WIKIPEDIA_BREAKER_ESPERA', 30),
+    headers=HEADERS,
+)
+
+cliente_async = ClienteHTTPAsync(cliente)
+
+
+def limite_host():
+    """Limita a MAX_POR_HOST las descargas en curso contra Wikipedia."""
+    return cliente.limite()
+
+
+def url_termino(palabra):
+    # Normalizar para URL: espacios -> '_'
+    palabra_safe = palabra.replace(" ", "_")
+    return f"{BASE_URL}/wiki/{palabra_safe}"
+
+
+def descargar(palabra, headers=None):
+    """GET en modo stream de la página del término. Propaga requests.RequestException.
+
+    El cuerpo no se lee acá: ``resultado_desde_respuesta`` lo consume sólo
+    hasta encontrar el primer párrafo y cierra la respuesta.
+    """
+    return cliente.get(url_termino(palabra), headers=headers, stream=True)
+
+
+def _descripcion_status(status_code):
+    if status_code == 404:
+        return "No existe la página en Wikipedia."
+    return f"Respuesta inesperada: status {status_code}"
+
+
+def resultado_desde_respuesta(palabra, respuesta):
+    """Arma el dict {titulo, descripcion, url} que muestra la vista buscar."""
+    if respuesta.status_code == 200:
+        descripcion = extraer_de_respuesta(respuesta)
+    else:
+        respuesta.close()
+        descripcion = _descripcion_status(respuesta.status_code)
+    return {"titulo": palabra, "descripcion": descripcion, "url": url_termino(palabra)}
+
+
+async def descargar_async(palabra, headers=None):
+    """Como ``descargar`` pero con httpx; la respuesta queda abierta en modo stream."""
+    return await cliente_async.get(url_termino(palabra), headers=headers)
+
+
+async def resultado_desde_respuesta_async(palabra, respuesta):
+    if respuesta.status_code == 200:
+        descripcion = await extraer_de_respuesta_async(respuesta)
+    else:
+        await respuesta.aclose()
+        descripcion = _descripcion_status(respuesta.status_code)
+    return {"titulo": palabra, "descripcion": descripcion, "url": url_termino(palabra)}
+
+
+def resultado_error(palabra, error):
+    return {
+        "titulo": palabra,
+        "descripcion": f"Error al solicitar Wikipedia: {error}",
+        "url": url_termino(palabra),
+    }
@@ -0,0 +1,17 @@
+// Activar tooltips de Bootstrap
+document.addEventListener('DOMContentLoaded', function () {
+  var tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
+  var tooltipList = tooltipTriggerList.map(function (tooltipTriggerEl) {
+    return new bootstrap.Tooltip(tooltipTriggerEl);
+  });
+
+  // Auto-ocultar alertas después de 5 segundos (salvo las .alert-fija, que
+  // se actualizan o piden una acción y tienen que seguir en pantalla)
+  setTimeout(function () {
+    var alerts = document.querySelectorAll('.alert:not(.alert-fija)');
+    alerts.forEach(function (alert) {
+      var bsAlert = new bootstrap.Alert(alert);
+      bsAlert.close();
+    });
+  }, 5000);
+});